@@ -0,0 +1,143 @@
+"""Perfect-play computer opponent for the 3x3 game.
+
+Every reachable position is solved once and stored in a transposition table
+keyed by its canonical form under the 8 board symmetries, so choosing a move
+is at most nine table lookups.
+"""
+import array
+import os
+import random
+
+from game_engine import FULL_MASK, WIN_TABLE
+
+# The 8 symmetries of the board as index permutations: cell i moves to perm[i].
+_ROTATE = (6, 3, 0, 7, 4, 1, 8, 5, 2)
+_MIRROR = (2, 1, 0, 5, 4, 3, 8, 7, 6)
+
+def _compose(p, q):
+    """Permutation applying p, then q."""
+    return tuple(q[p[i]] for i in range(9))
+
+def _symmetries():
+    perms = [tuple(range(9))]
+    for _ in range(3):
+        perms.append(_compose(perms[-1], _ROTATE))
+    perms += [_compose(p, _MIRROR) for p in perms[:4]]
+    return perms
+
+SYMMETRIES = _symmetries()
+
+def _permute_mask(mask, perm):
+    out = 0
+    for i in range(9):
+        if mask >> i & 1:
+            out |= 1 << perm[i]
+    return out
+
+# SYM_TABLE[s][mask] -> mask after symmetry s; makes canonicalisation 16 lookups.
+SYM_TABLE = tuple(tuple(_permute_mask(m, p) for m in range(1 << 9)) for p in SYMMETRIES)
+
+def canonical_key(x_mask, o_mask):
+    """Smallest (o << 9 | x) key over the 8 symmetric images of the position."""
+    return min(t[o_mask] << 9 | t[x_mask] for t in SYM_TABLE)
+
+# Scores are from the point of view of the player to move.
+WIN, DRAW, LOSS = 1, 0, -1
+
+def build_table():
+    """Solves every reachable position. Returns {canonical_key: score}."""
+    table = {}
+
+    def solve(me, them):
+        # Keys always hold X in the low bits; X moves first, so equal piece
+        # counts mean `me` is X.
+        if bin(me).count("1") == bin(them).count("1"):
+            key = canonical_key(me, them)
+        else:
+            key = canonical_key(them, me)
+        score = table.get(key)
+        if score is not None:
+            return score
+        if WIN_TABLE[them]:
+            score = LOSS
+        elif me | them == FULL_MASK:
+            score = DRAW
+        else:
+            score = LOSS
+            free = FULL_MASK & ~(me | them)
+            while free:  # no pruning: every reachable position gets an entry
+                bit = free & -free
+                free ^= bit
+                score = max(score, -solve(them, me | bit))
+        table[key] = score
+        return score
+
+    solve(0, 0)
+    return table
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ai_table.bin")
+
+def save_table(table, path=TABLE_FILE):
+    """Writes the table as sorted uint32 keys followed by one score byte each."""
+    keys = array.array("I", sorted(table))
+    scores = bytes(table[k] + 1 for k in keys)
+    with open(path, "wb") as f:
+        f.write(len(keys).to_bytes(4, "little"))
+        keys.tofile(f)
+        f.write(scores)
+
+def load_table(path=TABLE_FILE):
+    with open(path, "rb") as f:
+        count = int.from_bytes(f.read(4), "little")
+        keys = array.array("I")
+        keys.fromfile(f, count)
+        scores = f.read(count)
+    return {k: s - 1 for k, s in zip(keys, scores)}
+
+def _load_or_build():
+    if os.path.exists(TABLE_FILE):
+        try:
+            return load_table()
+        except (OSError, EOFError, ValueError) as e:
+            print(f"AI: ignoring unreadable {TABLE_FILE}: {e}")
+    return build_table()
+
+TABLE = _load_or_build()
+
+def engine_masks(engine):
+    """(x_mask, o_mask) for a BitboardEngine or a list-board GameEngine."""
+    if hasattr(engine, "x_mask"):
+        return engine.x_mask, engine.o_mask
+    x = o = 0
+    for i, cell in enumerate(engine.board):
+        if cell == 'X':
+            x |= 1 << i
+        elif cell == 'O':
+            o |= 1 << i
+    return x, o
+
+def move_scores(x_mask, o_mask, symbol):
+    """{index: score for `symbol` after playing index} for every free cell."""
+    scores = {}
+    free = FULL_MASK & ~(x_mask | o_mask)
+    for i in range(9):
+        bit = 1 << i
+        if free & bit:
+            if symbol == 'X':
+                key = canonical_key(x_mask | bit, o_mask)
+            else:
+                key = canonical_key(x_mask, o_mask | bit)
+            scores[i] = -TABLE[key]
+    return scores
+
+def best_move(engine, symbol, rng=random):
+    """Returns an optimal cell for `symbol`, picking randomly among equal moves."""
+    scores = move_scores(*engine_masks(engine), symbol)
+    if not scores:
+        return None
+    top = max(scores.values())
+    return rng.choice([i for i, s in scores.items() if s == top])
+
+if __name__ == "__main__":
+    save_table(build_table())
+    print(f"AI: wrote {len(TABLE)} positions to {TABLE_FILE}")
@@ -0,0 +1,78 @@
+"""One Tk timer for every animation in the client, paused while nobody can see them.
+
+Animations register a callback and a period with FrameScheduler.add();
+the scheduler keeps a single root.after() pending, for whichever animation
+is due next. While the main window is minimized, withdrawn or does not
+have focus, nothing is pending at all, so an idle client in the background
+uses no CPU. Animations that pick their frame from the clock (the popup
+videos) simply skip ahead when they resume.
+"""
+import time
+
+class FrameScheduler:
+    def __init__(self, root):
+        self.root = root
+        self.animations = {}  # {key: [period in s, callback, next due (monotonic)]}
+        self.paused = False
+        self.ticks = 0        # timer callbacks run, for the benchmarks
+        self._timer = None
+        self._check = None
+        for event in ("<Map>", "<Unmap>", "<FocusIn>", "<FocusOut>"):
+            root.bind(event, self._on_window_event, add="+")
+
+    def add(self, key, period_ms, callback):
+        """Calls callback() every `period_ms` while the window is active.
+
+        A callback that returns False is removed; add() with the same key replaces it.
+        """
+        self.animations[key] = [period_ms / 1000, callback, time.monotonic()]
+        self._schedule()
+
+    def remove(self, key):
+        self.animations.pop(key, None)
+
+    def _on_window_event(self, event):
+        # Children's <Map>/<Unmap> reach the root's bindings too, and focus moves
+        # between our own windows in pairs; look at the settled state once.
+        if self._check is None:
+            self._check = self.root.after_idle(self._update_paused)
+
+    def _update_paused(self):
+        self._check = None
+        try:
+            focused = self.root.focus_get() is not None
+        except KeyError:  # focus is in a popup Tk cannot name; still ours
+            focused = True
+        paused = not (focused and self.root.winfo_viewable())
+        if paused == self.paused:
+            return
+        self.paused = paused
+        if paused and self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+        elif not paused:
+            self._schedule()
+
+    def _schedule(self):
+        if self.paused or not self.animations:
+            return
+        due = min(entry[2] for entry in self.animations.values())
+        delay = max(1, int((due - time.monotonic()) * 1000))
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+        self._timer = self.root.after(delay, self._tick)
+
+    def _tick(self):
+        self._timer = None
+        self.ticks += 1
+        now = time.monotonic()
+        for key, entry in list(self.animations.items()):
+            period, callback, due = entry
+            if due > now:
+                continue
+            if callback() is False:
+                self.animations.pop(key, None)
+            else:
+                # Keep the cadence, but after a pause start over instead of catching up.
+                entry[2] = due + period if due + period > now else now + period
+        self._schedule()
@@ -0,0 +1,217 @@
+"""Packed asset bundle: the game's sounds and popup videos in one mmapped file.
+
+Layout (little-endian):
+    header  b"TTTA", u16 version, u16 entry count
+    index   per entry: u16 name length, name (utf-8), u64 offset, u64 size, u8 codec
+    data    entries back to back, each starting on a 16-byte boundary
+
+Codecs: RAW entries are handed out as zero-copy memoryview slices of the
+mapping; ZLIB entries are inflated on first access. Videos are not stored
+as .mp4 but as "<name>.frames": the popup frames pre-decoded by
+media_cache (u32 fps x 1000, u32 count, count + 1 u32 offsets, then the
+frames), so playing them from the bundle needs neither cv2 nor PIL.
+
+Build it next to the game files (loose files are used when it is missing):
+    python assets.py build [--audio-rate 22050] [--mono] [--compress] [--no-frames]
+Pre-decoded frames make the bundle ~4x the size of the .mp4 files they
+replace; --no-frames keeps it small at the cost of decoding on first use.
+"""
+import argparse
+import glob
+import io
+import mmap
+import os
+import struct
+import wave
+import zlib
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLE_NAME = "assets.bundle"
+MAGIC = b"TTTA"
+VERSION = 1
+RAW, ZLIB = 0, 1
+ALIGN = 16
+
+_HEADER = struct.Struct("<4sHH")
+_ENTRY = struct.Struct("<QQB")
+_CLIP = struct.Struct("<II")
+
+def asset_path(filename):
+    """Loose asset file, found next to the game code whatever the working directory."""
+    return os.path.join(ASSET_DIR, filename)
+
+class ViewReader:
+    """Minimal read/seek/tell file over a buffer, for parsers such as wave.open()."""
+
+    def __init__(self, view):
+        self.view = memoryview(view)
+        self.pos = 0
+
+    def read(self, n=-1):
+        end = len(self.view) if n is None or n < 0 else min(self.pos + n, len(self.view))
+        data = self.view[self.pos:end].tobytes()
+        self.pos = max(self.pos, end)
+        return data
+
+    def seek(self, pos, whence=0):
+        self.pos = pos + (0, self.pos, len(self.view))[whence]
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+class AssetBundle:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.data = memoryview(self.mapping)
+        magic, version, count = _HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} asset bundle")
+        self.entries = {}  # {name: (offset, size, codec)}
+        pos = _HEADER.size
+        for _ in range(count):
+            (length,) = struct.unpack_from("<H", self.data, pos)
+            name = self.data[pos + 2:pos + 2 + length].tobytes().decode("utf-8")
+            self.entries[name] = _ENTRY.unpack_from(self.data, pos + 2 + length)
+            pos += 2 + length + _ENTRY.size
+        self._inflated = {}
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def names(self):
+        return list(self.entries)
+
+    def view(self, name):
+        """The entry's bytes: a slice of the mapping, or the inflated copy for ZLIB entries."""
+        offset, size, codec = self.entries[name]
+        data = self.data[offset:offset + size]
+        if codec == ZLIB:
+            if name not in self._inflated:
+                self._inflated[name] = memoryview(zlib.decompress(data))
+            return self._inflated[name]
+        return data
+
+    def clip(self, name):
+        """media_cache.Clip for "<name>.frames", or None if the bundle has no such video."""
+        from media_cache import Clip
+        key = os.path.splitext(name)[0] + ".frames"
+        if key not in self.entries:
+            return None
+        data = self.view(key)
+        fps, count = _CLIP.unpack_from(data, 0)
+        offsets = struct.unpack_from(f"<{count + 1}I", data, _CLIP.size)
+        frames = [data[offsets[i]:offsets[i + 1]] for i in range(count)]
+        return Clip(frames, fps / 1000, mapped=True)
+
+_default = None
+
+def default_bundle():
+    """The bundle in ASSET_DIR, opened once; None if it has not been built."""
+    global _default
+    if _default is None:
+        path = asset_path(BUNDLE_NAME)
+        try:
+            _default = AssetBundle(path) if os.path.exists(path) else False
+        except (OSError, ValueError) as e:
+            print(f"Ignoring asset bundle: {e}")
+            _default = False
+    return _default or None
+
+# --- BUILD ---
+def pack_wav(path, audio_rate=None, mono=False):
+    """WAV file bytes, optionally downsampled and/or mixed down to mono (left channel)."""
+    from audio_mixer import resample
+    with wave.open(path) as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        data = w.readframes(w.getnframes())
+    if (not audio_rate or audio_rate >= rate) and not (mono and channels == 2):
+        with open(path, "rb") as f:
+            return f.read()
+    if audio_rate and audio_rate < rate:
+        data = resample(data, channels, rate, audio_rate)
+        rate = audio_rate
+    if mono and channels == 2:
+        samples = memoryview(data).cast("h")[0::2]
+        data, channels = bytes(samples), 1
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(width)
+        w.setframerate(rate)
+        w.writeframes(data)
+    return buf.getvalue()
+
+def pack_clip(path):
+    from media_cache import decode_clip
+    clip = decode_clip(path)
+    if clip is None:
+        raise ValueError(f"cannot decode {path}")
+    table = _CLIP.size + 4 * (len(clip.frames) + 1)
+    offsets = [table]
+    for frame in clip.frames:
+        offsets.append(offsets[-1] + len(frame))
+    return (_CLIP.pack(round(clip.fps * 1000), len(clip.frames))
+            + struct.pack(f"<{len(offsets)}I", *offsets) + b"".join(clip.frames))
+
+def write_bundle(out_path, entries, compress=False):
+    """entries: [(name, bytes)]. .frames and .wav data compress poorly, so only
+    entries that shrink by at least 10% are stored as ZLIB."""
+    index_size = _HEADER.size + sum(2 + len(n.encode("utf-8")) + _ENTRY.size for n, _ in entries)
+    offset = -(-index_size // ALIGN) * ALIGN
+    index, blobs = [], []
+    for name, data in entries:
+        codec = RAW
+        if compress:
+            packed = zlib.compress(data, 6)
+            if len(packed) < 0.9 * len(data):
+                data, codec = packed, ZLIB
+        encoded = name.encode("utf-8")
+        index.append(struct.pack("<H", len(encoded)) + encoded + _ENTRY.pack(offset, len(data), codec))
+        padding = -len(data) % ALIGN
+        blobs.append(data + b"\0" * padding)
+        offset += len(data) + padding
+    head = _HEADER.pack(MAGIC, VERSION, len(entries)) + b"".join(index)
+    with open(out_path, "wb") as f:
+        f.write(head + b"\0" * (-len(head) % ALIGN))
+        for blob in blobs:
+            f.write(blob)
+
+def build(source_dir=ASSET_DIR, out_path=None, audio_rate=None, mono=False, compress=False,
+          frames=True):
+    entries = []
+    for path in sorted(glob.glob(os.path.join(source_dir, "*.wav"))):
+        entries.append((os.path.basename(path), pack_wav(path, audio_rate, mono)))
+    for path in sorted(glob.glob(os.path.join(source_dir, "*.mp4")) if frames else []):
+        name = os.path.splitext(os.path.basename(path))[0] + ".frames"
+        entries.append((name, pack_clip(path)))
+    out_path = out_path or os.path.join(source_dir, BUNDLE_NAME)
+    write_bundle(out_path, entries, compress)
+    return out_path, entries
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the game asset bundle")
+    parser.add_argument("command", choices=["build", "list"])
+    parser.add_argument("--source", default=ASSET_DIR, help="directory with the .wav/.mp4 files")
+    parser.add_argument("--out", default=None, help=f"bundle path (default: <source>/{BUNDLE_NAME})")
+    parser.add_argument("--audio-rate", type=int, default=None,
+                        help="downsample audio to this rate (Hz); the mixer upsamples on load")
+    parser.add_argument("--mono", action="store_true", help="store audio as mono")
+    parser.add_argument("--compress", action="store_true",
+                        help="zlib entries that shrink (inflated into memory on load)")
+    parser.add_argument("--no-frames", action="store_true",
+                        help="leave videos out (popups decode the loose .mp4 files instead)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        out_path, entries = build(args.source, args.out, args.audio_rate, args.mono, args.compress,
+                                  frames=not args.no_frames)
+        print(f"{out_path}: {len(entries)} assets, {os.path.getsize(out_path) / 1e6:.1f} MB")
+    else:
+        bundle = AssetBundle(args.out or os.path.join(args.source, BUNDLE_NAME))
+        for name, (offset, size, codec) in bundle.entries.items():
+            print(f"{name:>16} {size:>10,} bytes @ {offset:<10,} {'zlib' if codec == ZLIB else 'raw'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Client sound effects: WAVs parsed once and mixed on one playback thread.
+
+Every sound is converted to the mixer format (16-bit stereo at RATE) when
+it is first loaded. Large files already in that format are not copied:
+their samples are a memoryview into an mmap of the file. Short effects
+(click.wav) stay resident as bytes.
+
+play() only queues a request, so the Tk thread never waits on audio. The
+playback thread mixes the active voices into CHUNK_FRAMES blocks and
+writes them to one long-lived sink. On Linux the sink is a single `aplay`
+process reading raw PCM from a pipe. Under click spam, repeats of a sound
+within COALESCE_WINDOW are dropped, and so is anything arriving while the
+bounded request queue is full.
+"""
+import mmap
+import operator
+import os
+import platform
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import wave
+from array import array
+from collections import deque
+
+from assets import ViewReader
+
+RATE = 44100
+CHANNELS = 2
+SAMPLE_WIDTH = 2
+FRAME_BYTES = CHANNELS * SAMPLE_WIDTH
+CHUNK_FRAMES = 441           # 10 ms per mixed block
+RESIDENT_LIMIT = 256 * 1024  # bigger mixer-format files are mmapped instead of read
+MAX_VOICES = 8
+QUEUE_SIZE = 32
+COALESCE_WINDOW = 0.03       # seconds; a repeat of the same sound inside it is dropped
+
+class Sound:
+    def __init__(self, name, pcm, mapping=None):
+        self.name = name
+        self.pcm = pcm          # bytes, or a memoryview into `mapping`
+        self.mapping = mapping  # memoryview of the mmapped file or bundle behind `pcm`
+
+    @property
+    def mapped(self):
+        return self.mapping is not None
+
+    @property
+    def duration(self):
+        return len(self.pcm) / (RATE * FRAME_BYTES)
+
+def resample(data, channels, rate, new_rate):
+    """Nearest-sample resampling of 16-bit mono or stereo PCM."""
+    # Pick whole frames (one 'h' or 'i' item each); only copies, so byte order is irrelevant.
+    frames = array('h' if channels == 1 else 'i')
+    frames.frombytes(data)
+    picks = (j * rate // new_rate for j in range(len(frames) * new_rate // rate))
+    return array(frames.typecode, map(frames.__getitem__, picks)).tobytes()
+
+def to_mixer_format(data, channels, width, rate):
+    """Converts 16-bit little-endian PCM to stereo at RATE."""
+    if width != SAMPLE_WIDTH or channels not in (1, 2):
+        raise ValueError(f"unsupported WAV format: {channels} channels, {8 * width}-bit")
+    if rate != RATE:
+        data = resample(data, channels, rate, RATE)
+    if channels == 1:
+        samples = array('h')
+        samples.frombytes(data)
+        stereo = array('h', bytes(2 * len(samples) * SAMPLE_WIDTH))
+        stereo[0::2] = samples
+        stereo[1::2] = samples
+        data = stereo.tobytes()
+    return data
+
+def load_wav(path, name=None, resident_limit=RESIDENT_LIMIT):
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    with open(path, "rb") as f:
+        sound = _read_wav(f, name, resident_limit,
+                          lambda: memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)))
+    return sound
+
+def load_wav_view(view, name):
+    """Sound from WAV data already in memory, e.g. an AssetBundle slice.
+
+    Mixer-format samples are sliced out of `view` without copying.
+    """
+    return _read_wav(ViewReader(view), name, 0, lambda: view)
+
+def _read_wav(f, name, resident_limit, whole_file):
+    w = wave.open(f)
+    if w.getcomptype() != "NONE":
+        raise ValueError(f"{name}: compressed WAV")
+    channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+    size = w.getnframes() * channels * width
+    native = (channels, width, rate) == (CHANNELS, SAMPLE_WIDTH, RATE)
+    if native and size > resident_limit and sys.byteorder == "little":
+        offset = f.tell()  # wave.open() stops at the start of the data chunk
+        view = whole_file()
+        return Sound(name, view[offset:offset + size], view)
+    data = w.readframes(w.getnframes())
+    return Sound(name, to_mixer_format(data, channels, width, rate))
+
+def mix(blocks):
+    """Sums 16-bit blocks of possibly different lengths, clipping to the sample range."""
+    if len(blocks) == 1:
+        return bytes(blocks[0])
+    arrays = sorted((array('h', bytes(b)) for b in blocks), key=len, reverse=True)
+    if sys.byteorder == "big":  # WAV samples are little-endian
+        for a in arrays:
+            a.byteswap()
+    total = list(arrays[0])
+    for a in arrays[1:]:
+        total[:len(a)] = map(operator.add, total, a)
+    mixed = array('h', [32767 if v > 32767 else -32768 if v < -32768 else v for v in total])
+    if sys.byteorder == "big":
+        mixed.byteswap()
+    return mixed.tobytes()
+
+class AplaySink:
+    """Raw PCM into one `aplay` process; write() blocks at playback speed."""
+
+    def __init__(self, buffer_ms=40):
+        self.proc = subprocess.Popen(
+            ["aplay", "-q", "-t", "raw", "-f", "S16_LE", "-r", str(RATE), "-c", str(CHANNELS),
+             f"--buffer-time={buffer_ms * 1000}"],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def write(self, data):
+        self.proc.stdin.write(data)
+        self.proc.stdin.flush()
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait()
+
+class NullSink:
+    """Discards audio at real-time speed (benchmarks, machines without a sink)."""
+
+    def __init__(self):
+        self.next_at = 0.0
+
+    def write(self, data):
+        now = time.perf_counter()
+        self.next_at = max(self.next_at, now) + len(data) / (RATE * FRAME_BYTES)
+        delay = self.next_at - now - 0.02  # keep ~20 ms queued, like a device buffer
+        if delay > 0:
+            time.sleep(delay)
+
+    def close(self):
+        pass
+
+def open_sink():
+    """The best sink for this machine, or None to fall back to per-sound playback."""
+    if platform.system() == "Linux" and shutil.which("aplay"):
+        return AplaySink()
+    return None
+
+class Mixer:
+    def __init__(self, directory="", sink_factory=open_sink, bundle=None):
+        self.directory = directory
+        self.sink_factory = sink_factory
+        self.bundle = bundle  # AssetBundle checked before loose files
+        self.sounds = {}  # {name: Sound}, loaded on first use
+        self.requests = queue.Queue(QUEUE_SIZE)
+        self.latencies = deque(maxlen=256)  # seconds from play() to the first block written
+        self.dropped = 0
+        self._last_request = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.wav")
+
+    def sound(self, name):
+        sound = self.sounds.get(name)
+        if sound is None:
+            if self.bundle is not None and f"{name}.wav" in self.bundle:
+                sound = self.sounds[name] = load_wav_view(self.bundle.view(f"{name}.wav"), name)
+            elif os.path.exists(self.path(name)):
+                sound = self.sounds[name] = load_wav(self.path(name), name)
+        return sound
+
+    def play(self, name):
+        """Queues `name` for playback; returns False if it was dropped."""
+        now = time.perf_counter()
+        if now - self._last_request.get(name, float("-inf")) < COALESCE_WINDOW:
+            self.dropped += 1
+            return False
+        self._last_request[name] = now
+        try:
+            self.requests.put_nowait((name, now))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="audio-mixer")
+                self._thread.start()
+        return True
+
+    def _run(self):
+        try:
+            sink = self.sink_factory()
+        except OSError as e:
+            print(f"Audio output unavailable: {e}")
+            sink = None
+        voices = []  # [Sound, byte position, requested_at until the first block is written]
+        while True:
+            try:
+                # Sleep on the queue while silent; only poll it while mixing.
+                request = self.requests.get(block=not voices)
+                while True:
+                    self._start_voice(voices, sink, *request)
+                    request = self.requests.get_nowait()
+            except queue.Empty:
+                pass
+            if not voices:
+                continue
+            step = CHUNK_FRAMES * FRAME_BYTES
+            block = mix([v[0].pcm[v[1]:v[1] + step] for v in voices])
+            try:
+                sink.write(block)
+            except OSError as e:
+                print(f"Audio output failed: {e}")
+                sink = None
+                voices.clear()
+                continue
+            written = time.perf_counter()
+            for voice in voices:
+                if voice[2] is not None:
+                    self.latencies.append(written - voice[2])
+                    voice[2] = None
+                voice[1] += step
+            voices[:] = [v for v in voices if v[1] < len(v[0].pcm)]
+
+    def _start_voice(self, voices, sink, name, requested_at):
+        try:
+            sound = self.sound(name)
+        except (OSError, ValueError, wave.Error) as e:
+            print(f"Cannot load sound {name}: {e}")
+            return
+        if sound is None:
+            return
+        if sink is None:
+            if os.path.exists(self.path(name)):
+                play_file(self.path(name))
+            return
+        if len(voices) >= MAX_VOICES:
+            same = [v for v in voices if v[0] is sound]
+            voices.remove(same[0] if same else voices[0])
+            self.dropped += 1
+        voices.append([sound, 0, requested_at])
+
+def play_file(path):
+    """Fallback without a PCM sink: hand the file to the platform player (no mixing)."""
+    if platform.system() == "Windows":
+        try:
+            import winsound
+            winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC | winsound.SND_NODEFAULT)
+        except Exception:
+            pass
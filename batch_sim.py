@@ -0,0 +1,141 @@
+"""Vectorised 3x3 simulator: plays a whole batch of games at once with NumPy.
+
+Boards are a (B, 9) int8 array (0 empty, 1 X, 2 O). Each step applies one
+move to every unfinished board, and wins are found for all boards with a
+single matrix product against the win-line masks.
+"""
+import numpy as np
+
+from game_engine import WIN_LINES
+
+EMPTY, X, O = 0, 1, 2
+DRAW = 3
+SYMBOLS = {X: 'X', O: 'O', DRAW: "Draw"}
+
+# WIN_MATRIX[cell, line] == 1 when `cell` is part of win line `line`.
+WIN_MATRIX = np.zeros((9, len(WIN_LINES)), dtype=np.int8)
+for _line, _cells in enumerate(WIN_LINES):
+    WIN_MATRIX[list(_cells), _line] = 1
+LINE_CELLS = np.array(WIN_LINES, dtype=np.int8)
+POWERS = 3 ** np.arange(9, dtype=np.int32)
+
+class BatchEngine:
+    def __init__(self, batch_size, seed=None):
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):
+        self.boards = np.zeros((self.batch_size, 9), dtype=np.int8)
+        self.turn = np.full(self.batch_size, X, dtype=np.int8)
+        self.winner = np.zeros(self.batch_size, dtype=np.int8)      # 0, X, O or DRAW
+        self.win_line = np.full(self.batch_size, -1, dtype=np.int8)  # index into WIN_LINES
+        self.move_count = np.zeros(self.batch_size, dtype=np.int8)
+
+    @property
+    def active(self):
+        return self.winner == 0
+
+    def legal_mask(self):
+        """(B, 9) bool: empty cells on boards that are still being played."""
+        return (self.boards == EMPTY) & self.active[:, None]
+
+    def step(self, moves):
+        """Plays moves[b] on every active board b, then updates winners.
+
+        Moves for finished boards are ignored; an occupied cell on an active
+        board raises ValueError.
+        """
+        rows = np.flatnonzero(self.active)
+        cells = np.asarray(moves)[rows]
+        if np.any(self.boards[rows, cells] != EMPTY):
+            raise ValueError("move to an occupied cell")
+        self.boards[rows, cells] = self.turn[rows]
+        self.move_count[rows] += 1
+        self.check_winner(rows)
+        self.turn[rows] = X + O - self.turn[rows]
+
+    def check_winner(self, rows=None):
+        """Updates winner/win_line for `rows` (default: all boards)."""
+        if rows is None:
+            rows = np.arange(self.batch_size)
+        boards = self.boards[rows]
+        for symbol in (X, O):
+            counts = (boards == symbol).astype(np.int8) @ WIN_MATRIX
+            full = counts == 3
+            won = full.any(axis=1) & (self.winner[rows] == 0)
+            hit = rows[won]
+            self.winner[hit] = symbol
+            self.win_line[hit] = full[won].argmax(axis=1)  # first line, as GameEngine
+        drawn = rows[(self.winner[rows] == 0) & (boards != EMPTY).all(axis=1)]
+        self.winner[drawn] = DRAW
+
+    def result(self, b):
+        """(WinnerSymbol, WinningIndices) or (None, []) for board b, like GameEngine."""
+        w = int(self.winner[b])
+        if w in (X, O):
+            return SYMBOLS[w], LINE_CELLS[self.win_line[b]].tolist()
+        if w == DRAW:
+            return "Draw", []
+        return None, []
+
+    def play(self, policy):
+        """Runs every board to completion. policy(engine) -> (B,) moves."""
+        while self.active.any():
+            self.step(policy(self))
+        return self.stats()
+
+    def stats(self):
+        """Outcome counts and average game length over the batch."""
+        counts = np.bincount(self.winner, minlength=4)
+        finished = self.winner != 0
+        return {
+            "games": self.batch_size,
+            "x_wins": int(counts[X]),
+            "o_wins": int(counts[O]),
+            "draws": int(counts[DRAW]),
+            "avg_moves": float(self.move_count[finished].mean()) if finished.any() else 0.0,
+        }
+
+    def state_index(self):
+        """Base-3 index of every board, for table-driven policies."""
+        return self.boards.astype(np.int32) @ POWERS
+
+def random_policy(engine):
+    """Uniformly random legal cell on each board (0 for finished boards)."""
+    keys = engine.rng.random((engine.batch_size, 9))
+    keys[~engine.legal_mask()] = -1.0
+    return keys.argmax(axis=1)
+
+_PERFECT_MOVES = None
+
+def perfect_policy(engine):
+    """Optimal move per board from ai_player, via a 3^9 lookup array."""
+    global _PERFECT_MOVES
+    if _PERFECT_MOVES is None:
+        _PERFECT_MOVES = _build_perfect_moves()
+    return _PERFECT_MOVES[engine.state_index()]
+
+def _build_perfect_moves():
+    from ai_player import move_scores
+
+    table = np.zeros(3 ** 9, dtype=np.int8)
+    for index in range(3 ** 9):
+        x_mask = o_mask = 0
+        digits = index
+        for cell in range(9):
+            digits, value = divmod(digits, 3)
+            if value == X:
+                x_mask |= 1 << cell
+            elif value == O:
+                o_mask |= 1 << cell
+        x_count, o_count = bin(x_mask).count("1"), bin(o_mask).count("1")
+        if x_count - o_count not in (0, 1) or x_mask | o_mask == 0x1FF:
+            continue
+        symbol = 'X' if x_count == o_count else 'O'
+        try:
+            scores = move_scores(x_mask, o_mask, symbol)
+        except KeyError:  # not reachable in a real game
+            continue
+        table[index] = max(scores, key=scores.get)
+    return table
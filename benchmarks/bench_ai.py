@@ -0,0 +1,81 @@
+"""Build time, memory and move latency of the ai_player transposition table.
+
+Also plays bot games (perfect vs perfect, perfect vs random) on a
+BitboardEngine to report games per second and check the bot never loses.
+
+    python benchmarks/bench_ai.py --games 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ai_player
+from game_engine import BitboardEngine, GameEngine
+
+
+def table_bytes(table):
+    return sys.getsizeof(table) + sum(sys.getsizeof(k) for k in table)
+
+
+def play(engine, players, rng):
+    """players: {'X': fn, 'O': fn}; each fn(engine, symbol, rng) -> index."""
+    engine.reset()
+    while True:
+        idx = players[engine.turn](engine, engine.turn, rng)
+        engine.make_move(idx, engine.turn)
+        winner, _ = engine.check_winner()
+        if winner:
+            return winner
+        engine.switch_turn()
+
+
+def random_move(engine, symbol, rng):
+    return rng.choice([i for i, c in enumerate(engine.board) if c == ""])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=5000)
+    args = parser.parse_args()
+
+    build = min(timeit.repeat(ai_player.build_table, number=1, repeat=5))
+    table = ai_player.build_table()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "table.bin")
+        ai_player.save_table(table, path)
+        size = os.path.getsize(path)
+        load = min(timeit.repeat(lambda: ai_player.load_table(path), number=1, repeat=5))
+        assert ai_player.load_table(path) == table
+    print(f"table: {len(table)} canonical positions | build {build * 1e3:.1f} ms | "
+          f"load {load * 1e3:.2f} ms | {table_bytes(table) / 1024:.1f} KiB in memory | "
+          f"{size} bytes on disk")
+
+    for cls in (GameEngine, BitboardEngine):
+        engine = cls()
+        engine.make_move(4, 'X')
+        n = 20000
+        per_move = timeit.timeit(lambda: ai_player.best_move(engine, 'O'), number=n) / n
+        print(f"best_move on {cls.__name__:>14}: {per_move * 1e6:6.1f} us")
+
+    rng = random.Random(0)
+    perfect = ai_player.best_move
+    for label, players in (("perfect vs perfect", {'X': perfect, 'O': perfect}),
+                           ("perfect vs random", {'X': perfect, 'O': random_move}),
+                           ("random vs perfect", {'X': random_move, 'O': perfect})):
+        engine = BitboardEngine()
+        results = {'X': 0, 'O': 0, 'Draw': 0}
+        start = time.perf_counter()
+        for _ in range(args.games):
+            results[play(engine, players, rng)] += 1
+        elapsed = time.perf_counter() - start
+        print(f"{label:>18}: {args.games / elapsed:8,.0f} games/s  {results}")
+
+
+if __name__ == "__main__":
+    main()
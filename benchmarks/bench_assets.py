@@ -0,0 +1,87 @@
+"""Loose media files vs the mmapped asset bundle: size, load time and memory.
+
+Each variant runs in a fresh interpreter that loads every sound the way
+the mixer does, plus both popup clips. It reports wall time, then reads
+the process's anonymous (private heap) and file-backed resident memory
+from /proc after the load and after touching every sample and frame, as
+playback would. Builds temporary bundles; the loose files are not changed.
+
+    python benchmarks/bench_assets.py
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import assets
+
+PROBE = r"""
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+import assets, audio_mixer, media_cache
+
+def rss():
+    fields = {{}}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("RssAnon", "RssFile")):
+                key, value = line.split(":")
+                fields[key] = int(value.split()[0]) / 1024
+    return fields
+
+names = ["click", "welcome", "win", "lose", "draw"]
+before = rss()
+start = time.perf_counter()
+bundle = assets.AssetBundle({bundle!r}) if {bundle!r} else None
+if bundle is not None:
+    sounds = [audio_mixer.load_wav_view(bundle.view(n + ".wav"), n) for n in names]
+    clips = [bundle.clip(v) for v in ("win", "lose")]
+else:
+    sounds = [audio_mixer.load_wav(assets.asset_path(n + ".wav")) for n in names]
+    clips = [media_cache.decode_clip(assets.asset_path(v + ".mp4")) for v in ("win", "lose")]
+clips = [c for c in clips if c is not None]
+loaded = time.perf_counter() - start
+after_load = rss()
+touched = sum(bytes(s.pcm).count(0) for s in sounds) + sum(
+    len(bytes(f)) for c in clips for f in c.frames)
+after_play = rss()
+print(json.dumps({{"load": loaded, "clips": len(clips),
+                   "anon": after_play["RssAnon"] - before["RssAnon"],
+                   "file_load": after_load["RssFile"] - before["RssFile"],
+                   "file_play": after_play["RssFile"] - before["RssFile"]}}))
+"""
+
+
+def probe(bundle_path):
+    out = subprocess.run([sys.executable, "-c", PROBE.format(root=ROOT, bundle=bundle_path)],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    loose = sum(os.path.getsize(assets.asset_path(f)) for f in os.listdir(ROOT)
+                if f.endswith((".wav", ".mp4")))
+    print(f"{'variant':>34} {'size MB':>8} {'load ms':>8} {'anon MB':>8} "
+          f"{'file MB (load/played)':>22}")
+    r = probe("")
+    print(f"{'loose .wav/.mp4 (decode videos)':>34} {loose / 1e6:8.1f} {r['load'] * 1e3:8.1f} "
+          f"{r['anon']:8.1f} {r['file_load']:10.1f} / {r['file_play']:.1f}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, options in (("bundle", {}),
+                               ("bundle --no-frames", {"frames": False}),
+                               ("bundle --audio-rate 22050 --mono", {"audio_rate": 22050, "mono": True}),
+                               ("bundle --compress", {"compress": True})):
+            path = os.path.join(tmp, "assets.bundle")
+            assets.build(ROOT, path, **options)
+            r = probe(path)
+            note = "" if r["clips"] == 2 else "  (videos not bundled: no clips)"
+            print(f"{label:>34} {os.path.getsize(path) / 1e6:8.1f} {r['load'] * 1e3:8.1f} "
+                  f"{r['anon']:8.1f} {r['file_load']:10.1f} / {r['file_play']:.1f}{note}")
+
+
+if __name__ == "__main__":
+    main()
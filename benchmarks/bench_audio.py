@@ -0,0 +1,84 @@
+"""Click-to-first-sample latency: a process per sound vs the in-process mixer.
+
+"before" is the old play_sound: a new thread running os.system("aplay -q
+click.wav"). Timing stops when the shell returns, so the number includes
+the fork/exec and the file read. Without aplay on the machine it runs
+`true` instead, which gives a lower bound. "after" is audio_mixer.Mixer
+writing to a real-time NullSink (or aplay with --aplay). Timing runs from
+play() to the first mixed block being written, for single clicks and for
+click spam.
+
+    python benchmarks/bench_audio.py --clicks 200
+"""
+import argparse
+import os
+import resource
+import shutil
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audio_mixer
+from audio_mixer import Mixer, NullSink, load_wav
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def old_click_latency(clicks):
+    path = os.path.join(HERE, "click.wav")
+    cmd = f"aplay -q {path}" if shutil.which("aplay") else "true"
+    latencies = []
+    for _ in range(clicks):
+        done = threading.Event()
+        start = time.perf_counter()
+        threading.Thread(target=lambda: (os.system(cmd), done.set()), daemon=True).start()
+        done.wait()
+        latencies.append(time.perf_counter() - start)
+    return cmd.split()[0], latencies
+
+
+def mixer_latency(mixer, clicks, gap):
+    for _ in range(clicks):
+        mixer.play("click")
+        time.sleep(gap)
+    time.sleep(0.2)
+    return list(mixer.latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clicks", type=int, default=100)
+    parser.add_argument("--aplay", action="store_true", help="mix into a real aplay sink")
+    args = parser.parse_args()
+
+    for name in ("click", "welcome", "win", "lose", "draw"):
+        start = time.perf_counter()
+        sound = load_wav(os.path.join(HERE, f"{name}.wav"))
+        print(f"{name:>8}: {sound.duration:5.2f} s, loaded in {(time.perf_counter() - start) * 1e3:6.2f} ms, "
+              f"{'mmapped' if sound.mapped else 'resident'} ({len(sound.pcm) / 1024:.0f} KiB)")
+
+    cmd, before = old_click_latency(min(args.clicks, 50))
+    print(f"before (thread + os.system('{cmd} ...')): p50 {percentile(before, 0.5) * 1e3:.2f} ms "
+          f"p99 {percentile(before, 0.99) * 1e3:.2f} ms")
+
+    sink = audio_mixer.open_sink if args.aplay else NullSink
+    for label, gap in (("one click per 100 ms", 0.1), ("click spam every 5 ms", 0.005)):
+        mixer = Mixer(HERE, sink_factory=sink)
+        mixer.sound("click")  # loaded once, before the first click
+        cpu = resource.getrusage(resource.RUSAGE_SELF).ru_utime
+        after = mixer_latency(mixer, args.clicks, gap)
+        cpu = resource.getrusage(resource.RUSAGE_SELF).ru_utime - cpu
+        print(f"after, {label}: p50 {percentile(after, 0.5) * 1e3:.2f} ms "
+              f"p99 {percentile(after, 0.99) * 1e3:.2f} ms, {len(after)} played, "
+              f"{mixer.dropped} dropped/coalesced, {cpu * 1e3:.0f} ms CPU")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Cost of the server keeping the board: --matches concurrent games in one process.
+
+Starts --matches games through server.start_game() (players are in-process
+FrameWriters that discard their bytes) and reports the memory the server
+keeps per match. Then plays --rounds rounds, one random legal move per
+match per round, through server.play_move() (what handle_message() runs
+for MOVE) and times it against the forward-only path the server used
+before (deliver OPPONENT_MOVE, record it). Games end and restart on the server's own GAME_OVER. Rejected moves
+(a taken cell) are timed last.
+
+    python benchmarks/bench_authority.py --matches 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server
+from codec import FrameWriter
+from game_engine import BitboardEngine
+
+
+def forward_only(mover, opponent, index, outbox):
+    server.deliver(opponent, f"OPPONENT_MOVE:{index}", outbox)
+    server.record_move(mover, opponent, index)
+
+
+def timed_round(moves, play):
+    outbox = set()
+    start = time.perf_counter()
+    for mover, opponent, index in moves:
+        play(mover, opponent, index, outbox)
+        server.flush_outbox(outbox)
+    return time.perf_counter() - start
+
+
+def next_moves(pairs, free, rng):
+    """(mover, opponent, cell) for every match, from the server's board."""
+    moves = []
+    for i, (x, o) in enumerate(pairs):
+        engine = server.engines[x]
+        if not (engine.x_mask | engine.o_mask):
+            free[i] = list(range(9))  # a new game started
+        cell = free[i].pop(rng.randrange(len(free[i])))
+        mover, opponent = (x, o) if engine.turn == 'X' else (o, x)
+        moves.append((mover, opponent, str(cell)))
+    return moves
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    server.VERBOSE = False
+    rng = random.Random(0)
+    pairs = [(f"x{i}", f"o{i}") for i in range(args.matches)]
+    for x, o in pairs:
+        server.clients[x] = FrameWriter(lambda data: None)
+        server.clients[o] = FrameWriter(lambda data: None)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    engines = [BitboardEngine() for _ in range(args.matches)]
+    engine_bytes = tracemalloc.get_traced_memory()[0] - before
+    del engines
+    before = tracemalloc.get_traced_memory()[0]
+    outbox = set()
+    for x, o in pairs:
+        server.start_game(x, o, outbox)
+        server.flush_outbox(outbox)
+    state_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{args.matches:,} matches: board {engine_bytes / args.matches:.0f} B/match, "
+          f"all per-game server state {state_bytes / args.matches:.0f} B/match "
+          f"({state_bytes / 1e6:.0f} MB)")
+
+    free = [list(range(9)) for _ in pairs]
+    checked = forwarded = 0.0
+    games = 0
+    for _ in range(args.rounds):
+        moves = next_moves(pairs, free, rng)
+        # Same moves, old path first: it leaves the server's boards untouched.
+        forwarded += timed_round(moves, forward_only)
+        checked += timed_round(moves, server.play_move)
+        games += sum(1 for x, _ in pairs
+                     if not (server.engines[x].x_mask | server.engines[x].o_mask))
+    total = args.rounds * args.matches
+    print(f"{total:,} moves, {games:,} games finished: "
+          f"forward only {forwarded / total * 1e6:.2f} us/move, "
+          f"checked {checked / total * 1e6:.2f} us/move "
+          f"(+{(checked - forwarded) / total * 1e6:.2f} us) = "
+          f"{total / checked:,.0f} moves/s on one core")
+
+    taken = []
+    for x, o in pairs:
+        engine = server.engines[x]
+        board = engine.x_mask | engine.o_mask
+        if board:  # replay a cell that is already taken, by whoever's turn it is
+            cell = next(i for i in range(9) if board >> i & 1)
+            mover, opponent = (x, o) if engine.turn == 'X' else (o, x)
+            taken.append((mover, opponent, str(cell)))
+    rejected = timed_round(taken, server.play_move)
+    print(f"{len(taken):,} rejected moves: {rejected / max(1, len(taken)) * 1e6:.2f} us/move "
+          f"(MOVE_REJECTED with the board)")
+
+
+if __name__ == "__main__":
+    main()
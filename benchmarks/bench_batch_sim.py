@@ -0,0 +1,96 @@
+"""Games per second of batch_sim.BatchEngine versus batch size.
+
+First checks that BatchEngine agrees with GameEngine.check_winner on every
+reachable 3x3 position, then plays random and perfect-policy batches and
+compares against looping GameEngine objects in Python.
+
+    python benchmarks/bench_batch_sim.py --max-batch 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_sim import BatchEngine, perfect_policy, random_policy
+from game_engine import GameEngine
+
+
+def reachable_positions():
+    """{board tuple: GameEngine result} for every position reachable in play."""
+    found = {}
+
+    def walk(engine, moves):
+        board = tuple(engine.board)
+        if board in found:
+            return
+        result = engine.check_winner()
+        found[board] = result
+        if result[0] is None:
+            for idx in range(9):
+                if engine.board[idx] == "":
+                    child = GameEngine()
+                    for i, m in enumerate(moves + [idx]):
+                        child.make_move(m, 'X' if i % 2 == 0 else 'O')
+                    walk(child, moves + [idx])
+
+    walk(GameEngine(), [])
+    return found
+
+
+def verify():
+    positions = reachable_positions()
+    boards = list(positions)
+    engine = BatchEngine(len(boards))
+    code = {"": 0, "X": 1, "O": 2}
+    engine.boards[:] = np.array([[code[c] for c in b] for b in boards], dtype=np.int8)
+    engine.check_winner()
+    for b, board in enumerate(boards):
+        assert engine.result(b) == positions[board], (board, engine.result(b))
+    return len(boards)
+
+
+def python_games_per_second(games):
+    rng = random.Random(0)
+    engine = GameEngine()
+    start = time.perf_counter()
+    for _ in range(games):
+        engine.reset()
+        free = list(range(9))
+        rng.shuffle(free)
+        for idx in free:
+            engine.make_move(idx, engine.turn)
+            if engine.check_winner()[0]:
+                break
+            engine.switch_turn()
+    return games / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-batch", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"BatchEngine agrees with GameEngine on all {verify()} reachable positions")
+    print(f"python loop (GameEngine): {python_games_per_second(20000):12,.0f} games/s")
+
+    perfect_policy(BatchEngine(1))  # build the lookup array outside the timings
+    batch = 1
+    while batch <= args.max_batch:
+        for name, policy in (("random", random_policy), ("perfect", perfect_policy)):
+            engine = BatchEngine(batch, seed=0)
+            start = time.perf_counter()
+            stats = engine.play(policy)
+            elapsed = time.perf_counter() - start
+            print(f"B={batch:>9,} {name:>7}: {batch / elapsed:12,.0f} games/s  "
+                  f"X {stats['x_wins']:>8,} O {stats['o_wins']:>8,} "
+                  f"draw {stats['draws']:>8,}  avg {stats['avg_moves']:.2f} moves")
+        batch *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Client board and animations: nine Buttons vs one Canvas, per-tick timers vs FrameScheduler.
+
+Per-move redraw: time for update_board() (one move) and highlight_win() +
+reset, each followed by update_idletasks() so Tk's redraw is included, on
+the old 3x3 grid of Buttons and on board_canvas.BoardCanvas.
+
+Idle CPU: process time over --seconds with the status-line rainbow running,
+the old way (its own root.after() every 200 ms, forever) and through
+animation.FrameScheduler, once with the window shown and once withdrawn.
+Needs a display (Xvfb will do).
+
+    python benchmarks/bench_board.py --moves 2000 --seconds 10
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from animation import FrameScheduler
+from board_canvas import BoardCanvas
+from ui_layout import THEME
+
+COLORS = ["#e74c3c", "#e67e22", "#f1c40f", "#2ecc71", "#3498db", "#9b59b6"]
+
+
+def tk_root():
+    try:
+        import tkinter as tk
+        return tk.Tk()
+    except Exception:
+        return None
+
+
+class ButtonBoard:
+    """The board as ui_layout built it before: nine tk.Buttons in a grid."""
+    def __init__(self, parent):
+        import tkinter as tk
+        self.buttons = []
+        for i in range(9):
+            btn = tk.Button(parent, text="", font=("Verdana", 24, "bold"),
+                            width=4, height=2, bg=THEME["btn_bg"], fg="black",
+                            borderwidth=0, command=lambda: None)
+            btn.grid(row=i//3, column=i%3, padx=10, pady=10)
+            self.buttons.append(btn)
+
+    def update_board(self, index, symbol):
+        color = THEME["x_color"] if symbol == "X" else THEME["o_color"]
+        self.buttons[index].config(text=symbol, fg=color)
+
+    def highlight_win(self, indices):
+        for idx in indices:
+            self.buttons[idx].config(bg=THEME["win_bg"], fg="white")
+
+    def reset(self):
+        for btn in self.buttons:
+            btn.config(text="", bg=THEME["btn_bg"], state="normal")
+
+
+def time_board(root, board, moves):
+    """(us per move, us per game end) including Tk's redraw."""
+    root.update()
+    move_time = end_time = 0.0
+    games = 0
+    for i in range(moves):
+        cell = i % 9
+        start = time.perf_counter()
+        board.update_board(cell, "X" if i % 2 == 0 else "O")
+        root.update_idletasks()
+        move_time += time.perf_counter() - start
+        if cell == 8:
+            start = time.perf_counter()
+            board.highlight_win([0, 4, 8])
+            root.update_idletasks()
+            board.reset()
+            root.update_idletasks()
+            end_time += time.perf_counter() - start
+            games += 1
+    return move_time / moves * 1e6, end_time / max(1, games) * 1e6
+
+
+def idle_cpu(root, seconds, start_animation):
+    """Process CPU seconds spent in `seconds` of mainloop with one animation running."""
+    stop = start_animation()
+    root.update()
+    start = time.process_time()
+    root.after(int(seconds * 1000), root.quit)
+    root.mainloop()
+    cpu = time.process_time() - start
+    stop()
+    return cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--moves", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    root = tk_root()
+    if root is None:
+        print("Tk display: no. This benchmark needs one (try xvfb-run).")
+        return
+    import tkinter as tk
+
+    for name, make in (("Buttons", ButtonBoard),
+                       ("Canvas", lambda frame: BoardCanvas(frame, lambda idx: None, THEME))):
+        frame = tk.Frame(root)
+        frame.pack()
+        board = make(frame)
+        if isinstance(board, BoardCanvas):
+            board.pack()
+        move_us, end_us = time_board(root, board, args.moves)
+        print(f"{name:8}: {move_us:7.1f} us/move, {end_us:7.1f} us per highlight + reset")
+        frame.destroy()
+
+    label = tk.Label(root, text="Welcome", font=("Segoe UI", 16, "bold"))
+    label.pack()
+
+    def old_rainbow():
+        cycle = itertools.cycle(COLORS)
+        pending = [None]
+
+        def tick():
+            label.config(fg=next(cycle))
+            pending[0] = root.after(200, tick)
+        tick()
+        return lambda: root.after_cancel(pending[0])
+
+    frames = FrameScheduler(root)
+
+    def scheduled_rainbow():
+        cycle = itertools.cycle(COLORS)
+        frames.add("rainbow", 200, lambda: label.config(fg=next(cycle)))
+        return lambda: frames.remove("rainbow")
+
+    for state in ("shown", "withdrawn"):
+        if state == "withdrawn":
+            root.withdraw()
+        else:
+            root.focus_force()
+        root.update()
+        frames._update_paused()
+        old = idle_cpu(root, args.seconds, old_rainbow)
+        ticks = frames.ticks
+        new = idle_cpu(root, args.seconds, scheduled_rainbow)
+        print(f"{state:9} ({'paused' if frames.paused else 'running'}): "
+              f"per-tick timer {old / args.seconds * 1e3:6.2f} ms CPU/s, "
+              f"FrameScheduler {new / args.seconds * 1e3:6.2f} ms CPU/s "
+              f"({frames.ticks - ticks} ticks)")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Move-forwarding throughput of the asyncio server vs the multi-process cluster.
+
+Starts server.py, logs in pairs of players spread over several load
+processes, has every pair start a game and then play it out move by move
+(the same won game over and over) for a fixed time. Pairs land on arbitrary workers (the kernel
+spreads SO_REUSEPORT accepts), so most cluster games cross the broker.
+
+    python benchmarks/bench_cluster.py --pairs 200 --workers 1 2 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from codec import Decoder, encode
+from server import raise_fd_limit
+
+# X wins along the top row: (mover, cell) for X = 0, O = 1.
+GAME = [(0, 0), (1, 3), (0, 1), (1, 4), (0, 2)]
+
+
+class Player:
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+        self.decoder = Decoder()
+        self.inbox = []
+
+    async def expect(self, prefix):
+        while True:
+            for i, msg in enumerate(self.inbox):
+                if msg.startswith(prefix):
+                    del self.inbox[:i + 1]
+                    return msg
+            data = await self.reader.read(65536)
+            if not data:
+                raise ConnectionError("server closed connection")
+            self.inbox.extend(self.decoder.feed(data))
+
+
+async def login(port, name):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(encode(name))
+    player = Player(reader, writer)
+    await player.expect("LIST")
+    return player
+
+
+async def play_pair(port, tag, duration, start_at):
+    x = await login(port, f"{tag}x")
+    o = await login(port, f"{tag}o")
+    while True:  # the roster reaches other workers asynchronously
+        x.writer.write(encode(f"INVITE:{tag}o"))
+        try:
+            await asyncio.wait_for(o.expect("INVITE_FROM"), 0.5)
+            break
+        except asyncio.TimeoutError:
+            pass
+    o.writer.write(encode(f"ACCEPT:{tag}x"))
+    await x.expect("GAME_START")
+    await o.expect("GAME_START")
+    await asyncio.sleep(max(0.0, start_at - time.time()))
+    moves = 0
+    end = time.time() + duration
+    players = (x, o)
+    while time.time() < end:
+        for mover, cell in GAME:
+            players[mover].writer.write(encode(f"MOVE:{cell}"))
+            await players[1 - mover].expect("OPPONENT_MOVE")
+            moves += 1
+        for player in players:  # the server ends the game and starts the next
+            await player.expect("GAME_OVER")
+    x.writer.close()
+    o.writer.close()
+    return moves
+
+
+def load_process(port, first, count, duration, start_at, results):
+    raise_fd_limit()
+
+    async def run():
+        return await asyncio.gather(*(play_pair(port, f"p{first + i}", duration, start_at)
+                                      for i in range(count)))
+    results.put(sum(asyncio.run(run())))
+
+
+def wait_for_port(port):
+    import socket
+    for _ in range(200):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("server did not start")
+
+
+def run(label, server_args, port, pairs, loaders, duration):
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py"), "--host",
+                             "127.0.0.1", "--port", str(port), "--no-rate-limit"] + server_args,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        results = multiprocessing.Queue()
+        start_at = time.time() + 2.0 + pairs / 200  # leave time to log everyone in
+        per = pairs // loaders
+        procs = [multiprocessing.Process(target=load_process,
+                                         args=(port, i * per, per, duration, start_at, results))
+                 for i in range(loaders)]
+        for p in procs:
+            p.start()
+        total = sum(results.get() for _ in procs)
+        for p in procs:
+            p.join()
+        print(f"{label:>18}: {total / duration:10,.0f} forwarded moves/s "
+              f"({per * loaders} games, {loaders} load procs)")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--loaders", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=5620)
+    args = parser.parse_args()
+    print(f"{os.cpu_count()} CPUs available")
+    run("asyncio", ["--mode", "asyncio"], args.port, args.pairs, args.loaders, args.duration)
+    for i, workers in enumerate(args.workers, 1):
+        run(f"cluster x{workers}", ["--mode", "cluster", "--workers", str(workers)],
+            args.port + i, args.pairs, args.loaders, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Throughput of the message framing layer in codec.py.
+
+Measures encode/decode rates with messages split at random read boundaries,
+then compares one send per message against FrameWriter batching over a
+local socket pair.
+
+    python benchmarks/bench_codec.py --messages 200000
+"""
+import argparse
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codec import Decoder, FrameWriter, encode, encode_batch
+
+SAMPLE = ["MOVE:4", "OPPONENT_MOVE:4", "INVITE:alice", "LIST,alice,bob,carol,dave",
+          "GAME_START:YOU_X:bob", "ACCEPT:alice"]
+
+
+def workload(n):
+    return [SAMPLE[i % len(SAMPLE)] for i in range(n)]
+
+
+def bench_decode(msgs):
+    start = time.perf_counter()
+    wire = encode_batch(msgs)
+    encode_time = time.perf_counter() - start
+
+    rng = random.Random(1)
+    chunks, pos = [], 0
+    while pos < len(wire):
+        step = rng.randint(1, 1024)
+        chunks.append(wire[pos:pos + step])
+        pos += step
+
+    decoder = Decoder()
+    out = 0
+    start = time.perf_counter()
+    for chunk in chunks:
+        out += len(decoder.feed(chunk))
+    decode_time = time.perf_counter() - start
+    assert out == len(msgs)
+    print(f"encode: {len(msgs) / encode_time:12,.0f} msg/s")
+    print(f"decode: {len(msgs) / decode_time:12,.0f} msg/s  ({len(chunks)} partial reads)")
+
+
+def drain(sock, expected, done):
+    decoder = Decoder()
+    got = 0
+    while got < expected:
+        data = sock.recv(65536)
+        if not data:
+            break
+        got += len(decoder.feed(data))
+    done.append(got)
+
+
+def bench_socket(msgs, batch):
+    a, b = socket.socketpair()
+    done = []
+    reader = threading.Thread(target=drain, args=(b, len(msgs), done))
+    reader.start()
+    start = time.perf_counter()
+    if batch == 1:
+        for m in msgs:
+            a.sendall(encode(m))
+    else:
+        writer = FrameWriter(a.sendall)
+        for i, m in enumerate(msgs, 1):
+            writer.write(m)
+            if i % batch == 0:
+                writer.flush()
+        writer.flush()
+    reader.join()
+    elapsed = time.perf_counter() - start
+    a.close()
+    b.close()
+    assert done == [len(msgs)]
+    label = "unbatched" if batch == 1 else f"batch={batch}"
+    print(f"socket {label:>10}: {len(msgs) / elapsed:12,.0f} msg/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200_000)
+    args = parser.parse_args()
+    msgs = workload(args.messages)
+    bench_decode(msgs)
+    for batch in (1, 8, 64):
+        bench_socket(msgs, batch)
+
+
+if __name__ == "__main__":
+    main()
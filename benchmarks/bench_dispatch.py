@@ -0,0 +1,171 @@
+"""Client under a burst of server messages: one root.after() per event vs dispatch.EventQueue.
+
+A receiver thread feeds --messages server lines (mostly full LIST rosters
+of --players names, with JOIN/LEAVE, RATING and OPPONENT_MOVE mixed in)
+through net_client's parser as fast as it can, the way GameClient does
+after a recv(). The old client scheduled root.after(0, ...) per event and
+rebuilt the Listbox for every LIST; the new one queues into an EventQueue
+and drains it once per Tk callback. Reported: Tk callbacks run, handler
+calls, time until the last event is on screen, and the longest stretch
+the Tk loop went without running a 10 ms heartbeat (what a user feels as
+a frozen window). The handlers are ui_layout.GameUI's own lobby methods
+on a real Listbox.
+
+Without a display only the queue itself is measured (put/drain cost and
+how much it coalesces).
+
+    python benchmarks/bench_dispatch.py --messages 10000 --players 200
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codec import encode
+from dispatch import EventQueue
+from net_client import _Session
+
+
+def burst(count, players, rng):
+    """Encoded server lines: what a busy lobby can send one client back to back."""
+    names = [f"player{i}" for i in range(players)]
+    lines = []
+    for i in range(count):
+        r = rng.random()
+        if r < 0.7:
+            lines.append("LIST," + ",".join(rng.sample(names, players // 2)))
+        elif r < 0.8:
+            lines.append(f"JOIN,{rng.choice(names)}")
+        elif r < 0.9:
+            lines.append(f"LEAVE,{rng.choice(names)}")
+        elif r < 0.95:
+            lines.append(f"RATING:{1500 + i % 100}")
+        else:
+            lines.append(f"OPPONENT_MOVE:{i % 9}:{i}")
+    data = b"".join(encode(line) for line in lines)
+    return [data[i:i + 4096] for i in range(0, len(data), 4096)]  # as recv(4096) returns it
+
+
+def feed(chunks, on_event):
+    session = _Session(False)
+    for chunk in chunks:
+        for event, payload in session.feed(chunk):
+            on_event(event, payload)
+
+
+def queue_only(chunks, total):
+    events = EventQueue()
+    start = time.perf_counter()
+    feed(chunks, events.put)
+    put = time.perf_counter() - start
+    start = time.perf_counter()
+    handled = len(events.drain())
+    drain = time.perf_counter() - start
+    print(f"parse + put: {put / total * 1e6:.2f} us/message; one drain: {drain * 1e3:.2f} ms; "
+          f"{total:,} events -> {handled:,} handled ({events.coalesced:,} coalesced)")
+
+
+class Lobby:
+    """The parts of GameUI the events touch, with its own methods."""
+    def __init__(self, root):
+        import tkinter as tk
+        from ui_layout import GameUI
+        self.listbox = tk.Listbox(root, width=30, height=8)
+        self.listbox.pack()
+        self.listed_players = []
+        self.status_label = tk.Label(root, text="")
+        self.status_label.pack()
+        self.update_list = GameUI.update_list.__get__(self)
+        self.add_players = GameUI.add_players.__get__(self)
+        self.remove_players = GameUI.remove_players.__get__(self)
+
+    def handle(self, event, payload):
+        if event == "list":
+            self.update_list(payload)
+        elif event == "join":
+            self.add_players(payload)
+        elif event == "leave":
+            self.remove_players(payload)
+        elif event == "rating":
+            self.status_label.config(text=f"Rating {payload}")
+        elif event == "opponent_move":
+            self.status_label.config(text=f"Move {payload}")
+
+
+def with_tk(root, chunks, total, batched):
+    """(s until the last event was handled, longest heartbeat gap in s, callbacks, handler calls)."""
+    lobby = Lobby(root)
+    events = EventQueue()
+    stats = {"left": total, "callbacks": 0, "calls": 0, "done": None, "gap": 0.0}
+
+    def handle(event, payload):
+        stats["calls"] += 1
+        lobby.handle(event, payload)
+
+    def one(event, payload):
+        stats["callbacks"] += 1
+        handle(event, payload)
+        stats["left"] -= 1
+
+    def drain():
+        stats["callbacks"] += 1
+        for event, payload in events.drain():
+            handle(event, payload)
+        # Every event is either handled or coalesced away, exactly once.
+        stats["left"] = total - stats["calls"] - events.coalesced
+
+    def on_event(event, payload):  # receiver thread
+        if not batched:
+            root.after(0, lambda: one(event, payload))
+        elif events.put(event, payload):
+            root.after(0, drain)
+
+    last = [time.perf_counter()]
+
+    def heartbeat():
+        now = time.perf_counter()
+        stats["gap"] = max(stats["gap"], now - last[0])
+        last[0] = now
+        if stats["left"] <= 0 and stats["done"] is None:
+            stats["done"] = now
+            root.after(50, root.quit)
+        root.after(10, heartbeat)
+
+    root.update()
+    start = last[0] = time.perf_counter()
+    root.after(10, heartbeat)
+    threading.Thread(target=feed, args=(chunks, on_event), daemon=True).start()
+    root.mainloop()
+    lobby.listbox.destroy()
+    lobby.status_label.destroy()
+    return stats["done"] - start, stats["gap"], stats["callbacks"], stats["calls"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--players", type=int, default=200)
+    args = parser.parse_args()
+
+    chunks = burst(args.messages, args.players, random.Random(0))
+    queue_only(chunks, args.messages)
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception:
+        print("Tk display: no (UI latency needs one; try xvfb-run)")
+        return
+    for name, batched in (("after() per event", False), ("EventQueue", True)):
+        done, gap, callbacks, calls = with_tk(root, chunks, args.messages, batched)
+        print(f"{name:18}: all handled after {done * 1e3:8.1f} ms, "
+              f"longest UI stall {gap * 1e3:7.1f} ms, "
+              f"{callbacks:,} Tk callbacks, {calls:,} handler calls")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
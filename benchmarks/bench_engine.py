@@ -0,0 +1,139 @@
+"""Microbenchmarks for the game engines in game_engine.py.
+
+Checks that every engine agrees with the original full-scan 3x3 check on
+all reachable positions, times make_move/check_winner over random full
+games, then compares incremental and full-rescan win detection on larger
+boards.
+
+    python benchmarks/bench_engine.py --games 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_engine import DIRECTIONS, BitboardEngine, GameEngine
+
+ENGINES = {
+    "list": GameEngine,
+    "counters": lambda: GameEngine(line_counters=True),
+    "bitboard": BitboardEngine,
+}
+
+WINS_3X3 = [(0,1,2), (3,4,5), (6,7,8), (0,3,6), (1,4,7), (2,5,8), (0,4,8), (2,4,6)]
+
+
+def reference_check(board):
+    """The original GameEngine.check_winner: scans all eight lines."""
+    for a, b, c in WINS_3X3:
+        if board[a] == board[b] == board[c] and board[a] != "":
+            return board[a], [a, b, c]
+    if "" not in board:
+        return "Draw", []
+    return None, []
+
+
+def full_scan(board, n, k):
+    """Rescans every cell and direction; what a naive N x N engine would do."""
+    for idx, sym in enumerate(board):
+        if not sym:
+            continue
+        row, col = divmod(idx, n)
+        for dr, dc in DIRECTIONS:
+            r, c, run = row, col, 0
+            while 0 <= r < n and 0 <= c < n and board[r * n + c] == sym and run < k:
+                r += dr
+                c += dc
+                run += 1
+            if run == k:
+                return sym
+    return None
+
+
+def verify(engine_cls):
+    """Walks every reachable position and compares against reference_check."""
+    seen = 0
+
+    def walk(moves):
+        nonlocal seen
+        board, other = [""] * 9, engine_cls()
+        for i, idx in enumerate(moves):
+            sym = 'X' if i % 2 == 0 else 'O'
+            board[idx] = sym
+            assert other.make_move(idx, sym)
+        result = reference_check(board)
+        assert other.check_winner() == result, (moves, result)
+        assert other.board == board
+        seen += 1
+        if result[0] is None:
+            for idx in range(9):
+                if idx not in moves:
+                    walk(moves + [idx])
+
+    walk([])
+    return seen
+
+
+def play_games(engine_cls, orders):
+    engine = engine_cls()
+    for order in orders:
+        engine.reset()
+        for idx in order:
+            engine.make_move(idx, engine.turn)
+            if engine.check_winner()[0]:
+                break
+            engine.switch_turn()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=20000)
+    args = parser.parse_args()
+
+    for name, cls in ENGINES.items():
+        print(f"{name}: agrees with the original check on {verify(cls)} move sequences")
+
+    rng = random.Random(0)
+    orders = [rng.sample(range(9), 9) for _ in range(args.games)]
+    for name, cls in ENGINES.items():
+        engine = cls()
+        engine.make_move(0, 'X'); engine.make_move(4, 'O'); engine.make_move(8, 'X')
+        per_check = min(timeit.repeat(engine.check_winner, number=100_000, repeat=3)) / 100_000
+        start = time.perf_counter()
+        play_games(cls, orders)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>9}: check_winner {per_check * 1e9:6.0f} ns | "
+              f"{args.games / elapsed:10,.0f} random games/s")
+
+    print("\nN x N scaling (k = min(N, 5)), per move incl. win check:")
+    for n in (3, 7, 11, 15, 19):
+        k = min(n, 5)
+        order = rng.sample(range(n * n), n * n)
+        engine = GameEngine(n, k)
+        start = time.perf_counter()
+        for _ in range(50):
+            engine.reset()
+            for idx in order:
+                engine.make_move(idx, engine.turn)
+                if engine.check_winner()[0]:
+                    break
+                engine.switch_turn()
+        played = 50 * len(engine.moves)
+        incremental = (time.perf_counter() - start) / played
+
+        board = [""] * (n * n)
+        start = time.perf_counter()
+        for i, idx in enumerate(order[:len(engine.moves)]):
+            board[idx] = 'X' if i % 2 == 0 else 'O'
+            full_scan(board, n, k)
+        rescan = (time.perf_counter() - start) / len(engine.moves)
+        print(f"{n:>4}x{n:<3} incremental {incremental * 1e6:7.2f} us | "
+              f"full rescan {rescan * 1e6:9.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Flood protection: legitimate players' move latency while --flooders clients spam the server.
+
+First times server.process_batch() in-process with and without a
+ratelimit.RateLimiter, i.e. what the limits cost when nobody floods.
+
+Then starts server.py (once with its limits, once with --no-rate-limit)
+and has --pairs pairs play games with --think seconds between moves,
+measuring how long each OPPONENT_MOVE takes to arrive. Halfway through,
+--flooders clients log in and send INVITEs to the players (and junk) as
+fast as the connection takes them. Reported per phase: p50/p99 move
+latency, how many INVITE_FROMs the players got and how many flooders the
+server closed.
+
+    python benchmarks/bench_flood.py --pairs 20 --flooders 10
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import server
+from bench_server_modes import wait_for_port
+from codec import Decoder, FrameWriter, encode
+from ratelimit import RateLimiter
+
+# X wins along the top row: (mover, cell) for X = 0, O = 1.
+GAME = [(0, 0), (1, 3), (0, 1), (1, 4), (0, 2)]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def in_process(n=200_000):
+    server.VERBOSE = False
+    for name in ("alice", "bob"):
+        server.register_client(name, FrameWriter(lambda data: None))
+    outbox = set()
+    msgs = ["ROSTER:0:1"]
+    limiter = RateLimiter({"*": (1e9, 1e9), "ROSTER": (1e9, 1e9)})  # never runs dry
+    plain = timeit.timeit(lambda: server.process_batch("alice", msgs, outbox, 0.0), number=n)
+    limited = timeit.timeit(lambda: server.process_batch("alice", msgs, outbox, 0.0, limiter),
+                            number=n)
+    allow = timeit.timeit(lambda: limiter.allow("ROSTER", 1.0), number=n)
+    print(f"in-process: process_batch {plain / n * 1e6:.2f} us/message, "
+          f"with RateLimiter {limited / n * 1e6:.2f} us/message "
+          f"(allow() alone {allow / n * 1e9:.0f} ns)")
+
+
+class Client:
+    def __init__(self, name):
+        self.name = name
+        self.inbox = asyncio.Queue()
+        self.invites = 0
+        self.closed = False
+        self.reader = self.writer = None
+
+    async def connect(self, port):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.writer.write(encode(self.name))
+        self.task = asyncio.create_task(self.read())
+
+    async def read(self):
+        decoder = Decoder()
+        try:
+            while True:
+                data = await self.reader.read(65536)
+                if not data:
+                    break
+                for msg in decoder.feed(data):
+                    if msg.startswith("INVITE_FROM:"):
+                        self.invites += 1
+                    elif msg == "PING":
+                        self.writer.write(encode("PONG"))
+                    else:
+                        self.inbox.put_nowait(msg)
+        except OSError:
+            pass
+        self.closed = True
+
+    async def expect(self, prefix):
+        while not (await self.inbox.get()).startswith(prefix):
+            pass
+
+
+async def play(x, o, think, until, samples):
+    """Plays games until `until`; appends (send time, latency) per move to `samples`."""
+    players = (x, o)
+    while time.monotonic() < until:
+        for mover, cell in GAME:
+            sent = time.monotonic()
+            players[mover].writer.write(encode(f"MOVE:{cell}"))
+            await players[1 - mover].expect("OPPONENT_MOVE:")
+            samples.append((sent, time.monotonic() - sent))
+            await asyncio.sleep(think)
+        for player in players:  # the server ends the game and starts the next
+            await player.expect("GAME_OVER:")
+
+
+async def flood(flooder, targets, until):
+    junk = b"".join(encode(f"INVITE:{t}") for t in targets) + encode("ROSTER:0:100") * 50
+    while time.monotonic() < until and not flooder.closed:
+        flooder.writer.write(junk)
+        try:
+            await flooder.writer.drain()
+        except OSError:
+            break
+
+
+async def scenario(port, pairs, flooders, think, seconds):
+    players = [(Client(f"x{i}"), Client(f"o{i}")) for i in range(pairs)]
+    for x, o in players:
+        await x.connect(port)
+        await o.connect(port)
+    for x, o in players:
+        await x.expect("LIST")
+        await o.expect("LIST")
+        x.writer.write(encode(f"INVITE:{o.name}"))
+    for x, o in players:
+        while not o.invites:
+            await asyncio.sleep(0.01)
+        o.invites = 0  # from here on, only the flooders' invites count
+        o.writer.write(encode(f"ACCEPT:{x.name}"))
+    for x, o in players:
+        await x.expect("GAME_START:")
+        await o.expect("GAME_START:")
+
+    start = time.monotonic()
+    flood_at, until = start + seconds, start + 2 * seconds
+    samples = []
+    games = [asyncio.create_task(play(x, o, think, until, samples)) for x, o in players]
+    await asyncio.sleep(seconds)
+    bad = [Client(f"flood{i}") for i in range(flooders)]
+    for flooder in bad:
+        await flooder.connect(port)
+    targets = [p.name for pair in players for p in pair]
+    floods = [asyncio.create_task(flood(f, targets, until)) for f in bad]
+    await asyncio.gather(*games, *floods)
+
+    before = [lat for sent, lat in samples if sent < flood_at]
+    during = [lat for sent, lat in samples if sent >= flood_at]
+    invites = sum(p.invites for pair in players for p in pair)
+    closed = sum(f.closed for f in bad)
+    for client in [p for pair in players for p in pair] + bad:
+        client.writer.close()
+        client.task.cancel()
+    return before, during, invites, closed
+
+
+def live(port, limited, pairs, flooders, think, seconds):
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py"), "--mode", "asyncio",
+                             "--host", "127.0.0.1", "--port", str(port), "--quiet"]
+                            + ([] if limited else ["--no-rate-limit"]),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_for_port(port))
+        before, during, invites, closed = asyncio.run(
+            scenario(port, pairs, flooders, think, seconds))
+        label = "limits" if limited else "no limits"
+        print(f"{label:>9}: move latency p50/p99 before the flood "
+              f"{percentile(before, 0.5) * 1e3:.2f}/{percentile(before, 0.99) * 1e3:.2f} ms, "
+              f"during {percentile(during, 0.5) * 1e3:.2f}/{percentile(during, 0.99) * 1e3:.2f} ms "
+              f"({len(during)} moves); {invites:,} INVITE_FROM to the players; "
+              f"{closed}/{flooders} flooders closed")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=20)
+    parser.add_argument("--flooders", type=int, default=10)
+    parser.add_argument("--think", type=float, default=0.1, help="seconds between moves")
+    parser.add_argument("--seconds", type=float, default=5.0, help="length of each phase")
+    parser.add_argument("--port", type=int, default=5597)
+    args = parser.parse_args()
+
+    in_process()
+    for limited in (True, False):
+        live(args.port, limited, args.pairs, args.flooders, args.think, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
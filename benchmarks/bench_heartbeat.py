@@ -0,0 +1,305 @@
+"""Heartbeats and idle reaping: timer-wheel sweeps, and dead peers among --connections.
+
+First, in-process: the cost of one housekeeping sweep over --connections
+idle deadlines with heartbeat.TimerWheel (buckets that came due only)
+against scanning every connection, with --active of them reading each
+tick.
+
+Then starts server.py with a short --ping-interval and logs in
+--connections clients as pairs in a game. In --dead of the pairs O goes
+silent: it still reads (so the benchmark sees when the server closes it)
+but never answers PING, which is all the server can tell of a crashed
+peer. Reported: how long after their last message the silent clients were
+closed, how many live partners got OPPONENT_LEFT, and that no client which
+answered PONG was closed.
+
+Last, on a fresh server, --stalled clients stop reading (but keep sending
+PONG) while other clients log in and out with long names, so presence
+updates back up on the stalled sockets. Reported: how long into the churn
+the server closed the stalled readers (kernel buffers fill first, then
+server.OUTBOX_LIMIT, then server.SLOW_READER_LIMIT), that a silent client
+was still reaped, and the longest a reading client waited for presence
+meanwhile. If housekeeping ever waited on a stalled socket, the gap grows
+and nothing is closed.
+
+    python benchmarks/bench_heartbeat.py --connections 10000 --dead 0.2
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import socket
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_server_modes import wait_for_port
+from codec import Decoder, encode
+from heartbeat import PONG_TIMEOUT, TimerWheel
+from server import SLOW_READER_LIMIT, raise_fd_limit
+
+TICK = 0.1  # housekeeping interval (presence.PRESENCE_WINDOW)
+CHURN = 100  # clients per log in / log out round
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def sweeps(count, active, interval, seconds=60.0):
+    """(wheel, scan) average seconds per sweep over `seconds` of simulated housekeeping."""
+    rng = random.Random(0)
+    wheel = TimerWheel(now=0.0)
+    deadlines = {}
+    for key in range(count):
+        first = rng.uniform(0, interval)  # connections logged in over the last interval
+        wheel.schedule(key, first)
+        deadlines[key] = first
+    wheel_time = scan_time = 0.0
+    ticks = int(seconds / TICK)
+    for i in range(1, ticks + 1):
+        now = i * TICK
+        for key in rng.sample(range(count), int(count * active)):
+            wheel.touch(key, now + interval)
+            deadlines[key] = now + interval
+        start = time.perf_counter()
+        for key in wheel.expired(now):
+            wheel.schedule(key, now + interval)  # pinged, and it answers
+        wheel_time += time.perf_counter() - start
+        start = time.perf_counter()
+        for key, deadline in deadlines.items():
+            if deadline <= now:
+                deadlines[key] = now + interval
+        scan_time += time.perf_counter() - start
+    return wheel_time / ticks, scan_time / ticks
+
+
+class Client:
+    def __init__(self, name):
+        self.name = name
+        self.silent = False
+        self.last_sent = None
+        self.closed_at = None
+        self.events = {}  # {message kind: monotonic time first seen}
+        self.left = {}    # {username: monotonic time its LEAVE arrived}
+        self.received = 0
+        self.last_presence = None
+        self.presence_gap = 0.0  # longest wait between presence updates
+        self.reader = self.writer = None
+
+    async def connect(self, port, rcvbuf=None):
+        sock = socket.socket()
+        if rcvbuf:  # before connecting, so the advertised window stays small
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", port))
+        self.reader, self.writer = await asyncio.open_connection(sock=sock)
+        self.send(self.name)
+
+    def send(self, msg):
+        self.writer.write(encode(msg))
+        self.last_sent = time.monotonic()
+
+    async def wait_for(self, kind):
+        while kind not in self.events:
+            await asyncio.sleep(0.05)
+
+    async def run(self):
+        decoder = Decoder()
+        while True:
+            try:
+                data = await self.reader.read(65536)
+            except OSError:
+                data = b""
+            if not data:
+                self.closed_at = time.monotonic()
+                return
+            self.received += len(data)
+            for msg in decoder.feed(data):
+                if msg == "PING":
+                    if not self.silent:
+                        self.send("PONG")
+                    continue
+                kind = msg.partition(":")[0].partition(",")[0]
+                now = time.monotonic()
+                self.events.setdefault(kind, now)
+                if kind == "JOIN" or kind == "LEAVE":
+                    if self.last_presence is not None:
+                        self.presence_gap = max(self.presence_gap, now - self.last_presence)
+                    self.last_presence = now
+                    if kind == "LEAVE":
+                        for name in msg.split(",")[1:]:
+                            self.left[name] = now
+
+
+async def reaping(port, count, dead, interval):
+    pairs = [(Client(f"x{i}"), Client(f"o{i}")) for i in range(count // 2)]
+    clients = [c for pair in pairs for c in pair]
+    limit = asyncio.Semaphore(200)
+
+    async def connect(client):
+        async with limit:
+            await client.connect(port)
+
+    await asyncio.gather(*(connect(c) for c in clients))
+    readers = [asyncio.create_task(c.run()) for c in clients]
+    await asyncio.gather(*(c.wait_for("LIST") for c in clients))
+    for x, o in pairs:
+        x.send(f"INVITE:{o.name}")
+    await asyncio.gather(*(o.wait_for("INVITE_FROM") for _, o in pairs))
+    for x, o in pairs:
+        o.send(f"ACCEPT:{x.name}")
+    await asyncio.gather(*(c.wait_for("GAME_START") for c in clients))
+
+    silent = [o for _, o in pairs[:int(len(pairs) * dead)]]
+    for o in silent:
+        o.silent = True
+    start = time.monotonic()
+    limit_s = interval + PONG_TIMEOUT + 10
+    while time.monotonic() - start < limit_s and any(o.closed_at is None for o in silent):
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(1.0)  # OPPONENT_LEFT reaches the partners
+
+    reaped = [o.closed_at - o.last_sent for o in silent if o.closed_at is not None]
+    partners = [x for x, o in pairs if o.silent]
+    left = sum(1 for x in partners if "OPPONENT_LEFT" in x.events)
+    live_closed = sum(1 for c in clients if not c.silent and c.closed_at is not None)
+    for c in clients:
+        c.writer.close()
+    for task in readers:
+        task.cancel()
+    return len(silent), reaped, len(partners), left, live_closed
+
+
+async def churn(port, stop):
+    """Logs CHURN long-named clients in and out until `stop`: a JOIN and a LEAVE each round."""
+    round_ = 0
+    while not stop.is_set():
+        names = [f"churn{round_}_{i}_".ljust(60, "x") for i in range(CHURN)]
+        conns = await asyncio.gather(*(asyncio.open_connection("127.0.0.1", port)
+                                       for _ in names))
+        for (_, writer), name in zip(conns, names):
+            writer.write(encode(name))
+        await asyncio.sleep(0.05)
+        for _, writer in conns:
+            writer.close()
+        await asyncio.sleep(0.05)
+        round_ += 1
+
+
+async def stalling(port, stalled, interval):
+    watcher, silent = Client("watcher"), Client("silent")
+    stuck = [Client(f"stalled{i}") for i in range(stalled)]
+    await watcher.connect(port)
+    await silent.connect(port)
+    for c in stuck:
+        await c.connect(port, rcvbuf=4096)
+    readers = {c: asyncio.create_task(c.run()) for c in [watcher, silent] + stuck}
+    await asyncio.gather(*(c.wait_for("LIST") for c in readers))
+    for c in stuck:
+        readers[c].cancel()  # stops reading; still answers below, so heartbeats keep it
+
+    stop = asyncio.Event()
+
+    async def keepalive():
+        while not stop.is_set():
+            for c in stuck:
+                if c.name not in watcher.left:
+                    c.send("PONG")
+            await asyncio.sleep(interval / 2)
+
+    start = time.monotonic()
+    silent.silent = True
+    watcher.presence_gap = 0.0
+    tasks = [asyncio.create_task(churn(port, stop)), asyncio.create_task(keepalive())]
+    names = [c.name for c in stuck] + [silent.name]
+    limit_s = max(interval + PONG_TIMEOUT, SLOW_READER_LIMIT) + 60  # + filling the sockets
+    while (time.monotonic() - start < limit_s
+           and any(name not in watcher.left for name in names)):
+        await asyncio.sleep(0.1)
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    closed = [watcher.left[c.name] - start for c in stuck if c.name in watcher.left]
+    reaped = silent.closed_at - silent.last_sent if silent.closed_at is not None else None
+    gap = watcher.presence_gap
+    for c in readers:
+        c.writer.close()
+    for task in readers.values():
+        task.cancel()
+    return watcher.received, closed, reaped, gap, watcher.closed_at is not None
+
+
+def start_server(mode, port, interval):
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py"), "--mode", mode,
+                             "--host", "127.0.0.1", "--port", str(port), "--quiet",
+                             "--ping-interval", str(interval), "--resume-grace", "0"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return proc
+
+
+def stalled_readers(mode, port, stalled, interval):
+    proc = start_server(mode, port, interval)
+    try:
+        asyncio.run(wait_for_port(port))
+        received, closed, reaped, gap, watcher_closed = asyncio.run(
+            stalling(port, stalled, interval))
+        reaped = f"{reaped:.1f} s" if reaped is not None else "never"
+        print(f"{mode:>8}, {stalled} stalled readers: closed {len(closed)} after "
+              f"p50 {percentile(closed, 0.5):.1f} s, max {max(closed, default=0):.1f} s of churn "
+              f"(filling the socket + slow-reader limit {SLOW_READER_LIMIT:g} s); "
+              f"silent client closed {reaped} after its last message; "
+              f"reading client got {received:,} bytes, longest presence gap {gap:.2f} s, "
+              f"closed: {watcher_closed}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def live(mode, port, count, dead, interval):
+    proc = start_server(mode, port, interval)
+    try:
+        asyncio.run(wait_for_port(port))
+        silent, reaped, partners, left, live_closed = asyncio.run(
+            reaping(port, count, dead, interval))
+        print(f"{mode:>8}, {count} connections, {silent} silent: closed {len(reaped)} "
+              f"after p50 {percentile(reaped, 0.5):.1f} s, max {max(reaped, default=0):.1f} s "
+              f"(ping {interval:g} s + pong timeout {PONG_TIMEOUT:g} s); "
+              f"OPPONENT_LEFT to {left}/{partners} partners; "
+              f"answering clients closed: {live_closed}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--dead", type=float, default=0.2,
+                        help="fraction of the pairs whose O player stops answering")
+    parser.add_argument("--active", type=float, default=0.01,
+                        help="fraction of connections reading per housekeeping tick")
+    parser.add_argument("--ping-interval", type=float, default=2.0)
+    parser.add_argument("--stalled", type=int, default=10,
+                        help="clients that stop reading in the last phase")
+    parser.add_argument("--modes", default="asyncio,threaded")
+    parser.add_argument("--port", type=int, default=5598)
+    args = parser.parse_args()
+
+    for count in (args.connections, args.connections * 10):
+        wheel, scan = sweeps(count, args.active, 15.0)
+        print(f"in-process, {count:,} connections: timer wheel {wheel * 1e6:.0f} us/sweep, "
+              f"scan all {scan * 1e6:.0f} us/sweep")
+    raise_fd_limit()
+    for mode in args.modes.split(","):
+        live(mode, args.port, args.connections, args.dead, args.ping_interval)
+    for mode in args.modes.split(","):
+        stalled_readers(mode, args.port, args.stalled, args.ping_interval)
+
+
+if __name__ == "__main__":
+    main()
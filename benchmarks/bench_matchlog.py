@@ -0,0 +1,81 @@
+"""Cost of recording games with matchlog.MatchLog, and of looking them up.
+
+Records --games full games from --players players the way the server
+does (move() per move, finish() per game) and reports the game-loop
+cost per call, which never includes disk I/O. It then measures how
+quickly the background writer drains with group fsync, the log and
+index sizes, and lookup latency by match id (REPLAY) and by username
+(HISTORY) after reopening the log.
+
+    python benchmarks/bench_matchlog.py --games 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matchlog import MatchLog
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--players", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    names = [f"player{i}" for i in range(args.players)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "matches.log")
+        log = MatchLog(path)
+        calls = []
+        start = time.perf_counter()
+        for _ in range(args.games):
+            x, o = rng.sample(names, 2)
+            cells = rng.sample(range(9), 9)
+            for ply, cell in enumerate(cells[:rng.randint(5, 9)]):
+                t = time.perf_counter()
+                log.move(x, o, 'X' if ply % 2 == 0 else 'O', cell)
+                calls.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            log.finish(x, rng.choice(('X', 'O', "Draw")))
+            calls.append(time.perf_counter() - t)
+        recorded = time.perf_counter() - start
+        log.close()
+        drained = time.perf_counter() - start
+        size, idx_size = os.path.getsize(path), os.path.getsize(path + ".idx")
+        print(f"recorded {args.games:,} games ({len(calls):,} calls) in {recorded:.2f} s: "
+              f"per call p50 {percentile(calls, 0.5) * 1e6:.1f} us "
+              f"p99 {percentile(calls, 0.99) * 1e6:.1f} us")
+        print(f"writer drained everything {drained - recorded:.2f} s later | "
+              f"log {size / 1e6:.1f} MB ({size / args.games:.0f} B/game), index {idx_size / 1e6:.1f} MB")
+
+        start = time.perf_counter()
+        log = MatchLog(path)  # checks the tail and loads the username index
+        opened = time.perf_counter() - start
+        ids = [rng.randrange(args.games) for _ in range(20000)]
+        start = time.perf_counter()
+        for match_id in ids:
+            assert log.lookup(match_id).match_id == match_id
+        by_id = (time.perf_counter() - start) / len(ids)
+        users = rng.sample(names, 500)
+        start = time.perf_counter()
+        for name in users:
+            log.history(name, 20)
+        by_user = (time.perf_counter() - start) / len(users)
+        log.close()
+        print(f"reopen {opened * 1e3:.1f} ms | "
+              f"REPLAY lookup {by_id * 1e6:.1f} us | HISTORY (20 newest) {by_user * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
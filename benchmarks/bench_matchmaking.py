@@ -0,0 +1,84 @@
+"""Pairings per second of matchmaking.MatchQueue with a large queue.
+
+Fills the queue with players whose ratings are spread far apart (so most
+of them wait), then measures join/pair throughput and the cost of one
+widening tick. A linear scan over every waiting player is timed for
+comparison.
+
+    python benchmarks/bench_matchmaking.py --players 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matchmaking import MatchQueue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def linear_find(waiting, rating, window):
+    """What a scan of every queued player costs per pairing."""
+    for username, other in waiting.items():
+        if abs(other - rating) <= window:
+            return username
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=50_000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    # Every rating is unique and 10 points apart, so a 50 point window and
+    # 50 point buckets leave most players waiting: a full queue.
+    clock = FakeClock()
+    queue = MatchQueue(bucket_width=50, base_window=5, clock=clock)
+    ratings = list(range(0, args.players * 10 * 20, 200))[:args.players]
+    rng.shuffle(ratings)
+    start = time.perf_counter()
+    for i, rating in enumerate(ratings):
+        queue.join(f"w{i}", rating)
+    fill = time.perf_counter() - start
+    print(f"filled queue with {len(queue):,} waiting players "
+          f"({args.players / fill:,.0f} joins/s)")
+
+    # Newcomers who each pair with someone already waiting.
+    newcomers = [rng.choice(ratings) for _ in range(20_000)]
+    start = time.perf_counter()
+    paired = 0
+    for i, rating in enumerate(newcomers):
+        if queue.join(f"n{i}", rating) is not None:
+            paired += 1
+    elapsed = time.perf_counter() - start
+    print(f"bucketed: {paired:,} pairings, {paired / elapsed:12,.0f} pairings/s "
+          f"(queue {len(queue):,})")
+
+    waiting = {f"w{i}": r for i, r in enumerate(ratings[:args.players])}
+    sample = newcomers[:2000]
+    start = time.perf_counter()
+    for rating in sample:
+        linear_find(waiting, rating, 5)
+    elapsed = time.perf_counter() - start
+    print(f"  linear: {len(sample) / elapsed:12,.0f} lookups/s over {len(waiting):,} players")
+
+    clock.now += 8  # everyone's window has widened to base + 200 points
+    start = time.perf_counter()
+    pairs = queue.tick()
+    elapsed = time.perf_counter() - start
+    print(f"tick after 8 s: {len(pairs):,} pairs in {elapsed * 1e3:.1f} ms "
+          f"(queue {len(queue):,}, {len(queue.buckets):,} buckets)")
+
+
+if __name__ == "__main__":
+    main()
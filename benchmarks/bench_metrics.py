@@ -0,0 +1,65 @@
+"""Per-message cost of the server's metrics instrumentation.
+
+Times the MOVE forwarding path in-process (no sockets) with and without
+the metrics bookkeeping done by server.process_batch, plus the individual
+recording primitives. The players take turns through a won game and
+start the next, so every MOVE is a legal one that gets forwarded.
+
+    python benchmarks/bench_metrics.py
+"""
+import itertools
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server
+from codec import FrameWriter
+from metrics import Histogram
+
+# X (alice) wins along the top row, then the pair plays on.
+GAME = [("alice", 0), ("bob", 3), ("alice", 1), ("bob", 4), ("alice", 2)]
+
+
+def setup_game():
+    server.VERBOSE = False
+    for name in ("alice", "bob"):
+        server.register_client(name, FrameWriter(server.metrics.counted(lambda data: None)))
+    server.start_game("alice", "bob", set())
+
+
+def main():
+    setup_game()
+    outbox = set()
+    moves = itertools.cycle([(name, [f"MOVE:{cell}"]) for name, cell in GAME])
+    n = 200_000
+
+    def bare():
+        name, msgs = next(moves)
+        for msg in msgs:
+            server.handle_message(name, msg, outbox)
+        server.flush_outbox(outbox)
+
+    def instrumented():
+        name, msgs = next(moves)
+        server.process_batch(name, msgs, outbox, time.perf_counter())
+
+    base = min(timeit.repeat(bare, number=n, repeat=5)) / n
+    full = min(timeit.repeat(instrumented, number=n, repeat=5)) / n
+    print(f"MOVE forward, bare:         {base * 1e6:6.2f} us/msg")
+    print(f"MOVE forward, instrumented: {full * 1e6:6.2f} us/msg "
+          f"(+{(full - base) * 1e6:.2f} us)")
+
+    counter = server.metrics.messages_in
+    hist = Histogram("x", "x")
+    for label, stmt in (("Counter increment", lambda: counter.__setitem__("MOVE", counter["MOVE"] + 1)),
+                        ("Histogram.observe", lambda: hist.observe(0.000042)),
+                        ("perf_counter()", time.perf_counter)):
+        per = min(timeit.repeat(stmt, number=n, repeat=5)) / n
+        print(f"{label:>18}: {per * 1e9:6.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
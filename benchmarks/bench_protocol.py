@@ -0,0 +1,111 @@
+"""Text protocol vs binproto: bytes on the wire, encode and parse rates.
+
+Uses a game-heavy message mix in each direction. "encode" is what the
+sender does per message (codec.encode, or binproto.to_binary from the same
+text); "parse" is framing plus turning the bytes into what the receiver
+acts on: (event, payload) for the client, text messages for the server.
+Then the server's move path alone: OPPONENT_MOVE as the server sends it
+(binproto.opponent_move() packs binary frames from the numbers) and MOVE
+as it reads it.
+
+    python benchmarks/bench_protocol.py --messages 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import binproto
+from codec import Decoder, encode
+from net_client import parse_binary_message, parse_server_message
+
+PLAYERS = [f"player{i}" for i in range(200)]
+TO_CLIENT = ["OPPONENT_MOVE:4:1", "OPPONENT_MOVE:0:2", "OPPONENT_MOVE:8:3", "WATCH_MOVE:X:2",
+             "INVITE_FROM:player17", "GAME_START:YOU_X:player42", "RATING:1216",
+             "JOIN,player3,player150", "LEAVE,player150", "GAME_OVER:X:0,4,8"]
+TO_SERVER = ["MOVE:4", "MOVE:0", "MOVE:8", "MOVE:2", "INVITE:player17", "ACCEPT:player42",
+             "QUEUE", "QUEUE_CANCEL"]
+
+
+def workload(sample, n):
+    return [sample[i % len(sample)] for i in range(n)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def compare(label, msgs, server_names, parse_text, parse_binary):
+    text_wire, text_encode = timed(lambda: [encode(m) for m in msgs])
+    binary_wire, binary_encode = timed(lambda: [binproto.to_binary(m, server_names) for m in msgs])
+    text_bytes, binary_bytes = b"".join(text_wire), b"".join(binary_wire)
+    chunks = [text_bytes[i:i + 4096] for i in range(0, len(text_bytes), 4096)]
+    text_out, text_parse = timed(lambda: parse_text(chunks))
+    chunks = [binary_bytes[i:i + 4096] for i in range(0, len(binary_bytes), 4096)]
+    binary_out, binary_parse = timed(lambda: parse_binary(chunks))
+    assert len(text_out) == len(binary_out) == len(msgs)
+    n = len(msgs)
+    print(f"{label}")
+    print(f"  {'':>6} {'bytes/msg':>10} {'encode msg/s':>14} {'parse msg/s':>14}")
+    print(f"  {'text':>6} {len(text_bytes) / n:10.1f} {n / text_encode:14,.0f} {n / text_parse:14,.0f}")
+    print(f"  {'binary':>6} {len(binary_bytes) / n:10.1f} {n / binary_encode:14,.0f} "
+          f"{n / binary_parse:14,.0f}")
+
+
+def moves(n, client_names, server_text, server_binary):
+    """The server's own move path: OPPONENT_MOVE built from numbers, MOVE parsed."""
+    sends = [(i % 9, i) for i in range(n)]
+    _, text_encode = timed(lambda: [encode(f"OPPONENT_MOVE:{cell}:{seq}") for cell, seq in sends])
+    _, binary_encode = timed(lambda: [binproto.opponent_move(cell, seq) for cell, seq in sends])
+    msgs = workload(TO_SERVER[:4], n)
+    text_bytes = b"".join(encode(m) for m in msgs)
+    binary_bytes = b"".join(binproto.to_binary(m, client_names) for m in msgs)
+    chunks = [text_bytes[i:i + 4096] for i in range(0, len(text_bytes), 4096)]
+    _, text_parse = timed(lambda: server_text(chunks))
+    chunks = [binary_bytes[i:i + 4096] for i in range(0, len(binary_bytes), 4096)]
+    _, binary_parse = timed(lambda: server_binary(chunks))
+    print("server move path (OPPONENT_MOVE out, MOVE in)")
+    print(f"  {'':>6} {'encode msg/s':>14} {'parse msg/s':>14}")
+    print(f"  {'text':>6} {n / text_encode:14,.0f} {n / text_parse:14,.0f}")
+    print(f"  {'binary':>6} {n / binary_encode:14,.0f} {n / binary_parse:14,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200_000)
+    args = parser.parse_args()
+
+    server_names = binproto.NameTable()
+    client_names = binproto.NameTable()
+    for name in PLAYERS:  # both sides know every player, as after LIST
+        client_names.learn(server_names.assign(name), name)
+
+    def client_text(chunks):
+        decoder = Decoder()
+        return [parse_server_message(m) for chunk in chunks for m in decoder.feed(chunk)]
+
+    def client_binary(chunks):
+        decoder = binproto.Decoder()
+        return [parse_binary_message(f, client_names) for chunk in chunks for f in decoder.feed(chunk)]
+
+    def server_text(chunks):
+        decoder = Decoder()
+        return [m for chunk in chunks for m in decoder.feed(chunk)]
+
+    def server_binary(chunks):
+        decoder = binproto.MessageDecoder(server_names)
+        return [m for chunk in chunks for m in decoder.feed(chunk)]
+
+    compare("server -> client (client parses to events)", workload(TO_CLIENT, args.messages),
+            server_names, client_text, client_binary)
+    compare("client -> server (server parses to text messages)",
+            workload(TO_SERVER, args.messages), client_names, server_text, server_binary)
+    moves(args.messages, client_names, server_text, server_binary)
+
+
+if __name__ == "__main__":
+    main()
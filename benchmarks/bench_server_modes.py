@@ -0,0 +1,108 @@
+"""Compares the threaded and asyncio server modes.
+
+Starts server.py in each mode, opens many idle connections against it and
+reports the server's resident memory and thread count, then times a small
+wave of logins.
+
+    python benchmarks/bench_server_modes.py --connections 10000
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from codec import encode
+from server import raise_fd_limit
+
+
+def proc_status(pid):
+    """Returns (rss_mb, threads) read from /proc (Linux only)."""
+    rss, threads = 0.0, 0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1]) / 1024
+            elif line.startswith("Threads:"):
+                threads = int(line.split()[1])
+    return rss, threads
+
+
+async def wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, w = await asyncio.open_connection("127.0.0.1", port)
+            w.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.05)
+    raise RuntimeError("server did not start")
+
+
+async def open_idle(port, count):
+    conns = []
+    for i in range(0, count, 500):
+        batch = [asyncio.open_connection("127.0.0.1", port)
+                 for _ in range(min(500, count - i))]
+        conns.extend(await asyncio.gather(*batch))
+    return conns
+
+
+async def login_wave(port, count):
+    start = time.perf_counter()
+    conns = []
+    for i in range(count):
+        r, w = await asyncio.open_connection("127.0.0.1", port)
+        w.write(encode(f"bench{i}"))
+        await r.read(65536)  # first roster
+        conns.append((r, w))
+    elapsed = time.perf_counter() - start
+    for _, w in conns:
+        w.close()
+    return elapsed
+
+
+async def run_mode(mode, port, connections, logins):
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py"),
+                             "--mode", mode, "--host", "127.0.0.1", "--port", str(port)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        await wait_for_port(port)
+        base_rss, _ = proc_status(proc.pid)
+        start = time.perf_counter()
+        conns = await open_idle(port, connections)
+        await asyncio.sleep(1.0)  # let the server spawn threads / register readers
+        setup = time.perf_counter() - start
+        rss, threads = proc_status(proc.pid)
+        for _, w in conns:
+            w.close()
+        await asyncio.sleep(0.5)
+        login_time = await login_wave(port, logins)
+        print(f"{mode:>9}: {connections} idle conns in {setup:6.2f}s | "
+              f"RSS {base_rss:6.1f} -> {rss:7.1f} MB "
+              f"({(rss - base_rss) * 1024 / max(connections, 1):5.1f} KB/conn) | "
+              f"threads {threads:5d} | {logins} logins {logins / login_time:7.0f}/s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--port", type=int, default=5601)
+    parser.add_argument("--modes", nargs="+", default=["threaded", "asyncio"])
+    args = parser.parse_args()
+    raise_fd_limit()
+    for offset, mode in enumerate(args.modes):
+        asyncio.run(run_mode(mode, args.port + offset, args.connections, args.logins))
+
+
+if __name__ == "__main__":
+    main()
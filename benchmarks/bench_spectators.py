@@ -0,0 +1,203 @@
+"""Spectator fan-out: one match watched by --spectators connections.
+
+First times spectate.Spectators.move() in-process against --spectators
+FrameWriters (one shared encode per move) and the per-watcher
+encode-and-send it replaces. Then starts server.py, has two players play
+--games games while the spectators WATCH, and reports per move how long the
+opponent waited for OPPONENT_MOVE and how long until every reading
+spectator had WATCH_MOVE. --slow makes that fraction of the spectators
+stop reading, to show they do not hold up the players.
+
+    python benchmarks/bench_spectators.py --spectators 1000 --slow 0.1
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_server_modes import wait_for_port
+from codec import Decoder, FrameWriter, encode
+from server import raise_fd_limit
+from spectate import Spectators
+
+# X wins along the top row: (mover, cell) for X = 0, O = 1.
+GAME = [(0, 0), (1, 3), (0, 1), (1, 4), (0, 2)]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def in_process(count, moves=2000):
+    watchers = [FrameWriter(lambda data: None) for _ in range(count)]
+    spectators = Spectators()
+    spectators.pair("x", "o", 'X')
+    spectators.pair("o", "x", 'O')
+    for i, frames in enumerate(watchers):
+        spectators.watch(f"w{i}", frames, "x")
+    start = time.perf_counter()
+    for i in range(moves):
+        spectators.move("x", 'X' if i % 2 == 0 else 'O', i % 9)
+        spectators.flush()
+    shared = (time.perf_counter() - start) / moves
+    start = time.perf_counter()
+    for i in range(moves):
+        for frames in watchers:
+            frames.write(f"WATCH_MOVE:{'X' if i % 2 == 0 else 'O'}:{i % 9}")
+            frames.flush()
+    naive = (time.perf_counter() - start) / moves
+    print(f"in-process, {count} watchers: shared encode {shared * 1e6:.0f} us/move, "
+          f"encode per watcher {naive * 1e6:.0f} us/move")
+
+
+async def login(port, name, rcvbuf=None):
+    if rcvbuf:  # a small receive buffer fills quickly once the reader stops
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", port))
+        reader, writer = await asyncio.open_connection(sock=sock)
+    else:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(encode(name))
+    return reader, writer
+
+
+async def read_messages(reader, on_message):
+    decoder = Decoder()
+    while True:
+        data = await reader.read(65536)
+        if not data:
+            return
+        for msg in decoder.feed(data):
+            on_message(msg)
+
+
+async def watch_all(port, count, slow_count, moves, ready):
+    """Spectator side: returns, per move, when the last reading spectator got it."""
+    arrivals = [0.0] * moves
+    finished = asyncio.Event()
+    remaining = [count - slow_count]
+    def reader_for():
+        seen = [0]
+        def on_message(msg):
+            if msg.startswith("WATCH_MOVE:") and seen[0] < moves:
+                arrivals[seen[0]] = max(arrivals[seen[0]], time.monotonic())
+                seen[0] += 1
+                if seen[0] == moves:
+                    remaining[0] -= 1
+                    if not remaining[0]:
+                        finished.set()
+        return on_message
+    conns, tasks = [], []
+    for i in range(count):
+        is_slow = i < slow_count
+        reader, writer = await login(port, f"watch{i}", 4096 if is_slow else None)
+        writer.write(encode("WATCH:x"))
+        conns.append(writer)
+        if not is_slow:
+            tasks.append(asyncio.create_task(read_messages(reader, reader_for())))
+    await asyncio.sleep(1.0)
+    ready.set()
+    await asyncio.wait_for(finished.wait(), 60 + moves)
+    for task in tasks:
+        task.cancel()
+    for writer in conns:
+        writer.close()
+    return arrivals
+
+
+def spectator_process(port, count, slow_count, moves, ready, results):
+    raise_fd_limit()
+    results.put(asyncio.run(watch_all(port, count, slow_count, moves, ready)))
+
+
+async def play(port, games, think, start_watchers, ready):
+    """Player side: returns the send time of every move and the opponent's wait for it."""
+    players = [await login(port, "x"), await login(port, "o")]
+    inboxes = [asyncio.Queue(), asyncio.Queue()]
+    tasks = [asyncio.create_task(read_messages(reader, inbox.put_nowait))
+             for (reader, _), inbox in zip(players, inboxes)]
+    await asyncio.sleep(0.3)
+    players[0][1].write(encode("INVITE:o"))
+    while not (await inboxes[1].get()).startswith("INVITE_FROM:"):
+        pass
+    players[1][1].write(encode("ACCEPT:x"))
+    for inbox in inboxes:
+        while not (await inbox.get()).startswith("GAME_START:"):
+            pass
+    start_watchers()  # WATCH only works once x is in a game
+    while not ready.is_set():
+        await asyncio.sleep(0.05)
+    sent, waits = [], []
+    for _ in range(games):
+        for mover, cell in GAME:
+            sent.append(time.monotonic())
+            players[mover][1].write(encode(f"MOVE:{cell}"))
+            while not (await inboxes[1 - mover].get()).startswith("OPPONENT_MOVE:"):
+                pass
+            waits.append(time.monotonic() - sent[-1])
+            await asyncio.sleep(think)
+        for inbox in inboxes:  # the server ends the game and starts the next
+            while not (await inbox.get()).startswith("GAME_OVER:"):
+                pass
+    for task in tasks:
+        task.cancel()
+    for _, writer in players:
+        writer.close()
+    return sent, waits
+
+
+def live(mode, port, count, slow, games, think):
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py"), "--mode", mode,
+                             "--host", "127.0.0.1", "--port", str(port), "--quiet"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_for_port(port))
+        slow_count = int(count * slow)
+        moves = games * len(GAME)
+        ready, results = multiprocessing.Event(), multiprocessing.Queue()
+        watchers = multiprocessing.Process(target=spectator_process,
+                                           args=(port, count, slow_count, moves, ready, results))
+        sent, waits = asyncio.run(play(port, games, think, watchers.start, ready))
+        arrivals = results.get(timeout=120)
+        watchers.join()
+        fan_out = [done - start for start, done in zip(sent, arrivals)]
+        print(f"{mode:>8}, {count} spectators ({slow_count} not reading): "
+              f"opponent p50 {percentile(waits, 0.5) * 1e3:.2f} ms "
+              f"p99 {percentile(waits, 0.99) * 1e3:.2f} ms | "
+              f"last reading spectator p50 {percentile(fan_out, 0.5) * 1e3:.2f} ms "
+              f"p99 {percentile(fan_out, 0.99) * 1e3:.2f} ms")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spectators", type=int, default=1000)
+    parser.add_argument("--slow", type=float, default=0.0,
+                        help="fraction of spectators that never read")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--think", type=float, default=0.1,
+                        help="seconds between moves (fan-out to many sockets takes a while)")
+    parser.add_argument("--modes", default="asyncio,threaded")
+    parser.add_argument("--port", type=int, default=5599)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    in_process(args.spectators)
+    for mode in args.modes.split(","):
+        live(mode, args.port, args.spectators, args.slow, args.games, args.think)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Client startup cost, measured with `python -X importtime` in fresh interpreters.
+
+Compares the protocol library alone (net_client), the GUI client as shipped
+(run_client, which no longer loads OpenCV or PIL until a video popup), and
+the client plus the eager cv2/PIL.ImageTk imports it used to do at load.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ("net_client", "import net_client"),
+    ("run_client", "import run_client"),
+    ("run_client + cv2/PIL (old eager imports)",
+     "import run_client, cv2, PIL.Image, PIL.ImageTk"),
+]
+
+
+def import_times(code):
+    """Returns ({module: cumulative us}, wall seconds) for one fresh interpreter.
+
+    Nested imports keep their leading spaces in the module name.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        cumulative[name[1:].rstrip()] = int(cum)  # keeps the nesting indent
+    return cumulative, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    leaked = subprocess.run(
+        [sys.executable, "-c", "import sys, run_client; "
+         "print(sorted({'cv2', 'PIL', 'numpy', 'ai_player'} & set(sys.modules)))"],
+        cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    print(f"heavy modules loaded by 'import run_client': {leaked}")
+
+    for label, code in CASES:
+        imports, walls = [], []
+        try:
+            for _ in range(args.runs):
+                cumulative, wall = import_times(code)
+                # Top-level imports are the only entries at zero indentation.
+                imports.append(sum(us for name, us in cumulative.items() if name == name.lstrip()))
+                walls.append(wall)
+        except RuntimeError as e:
+            print(f"{label:>42}: skipped ({e})")
+            continue
+        print(f"{label:>42}: imports {min(imports) / 1e3:7.1f} ms | "
+              f"interpreter start to exit {min(walls) * 1e3:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
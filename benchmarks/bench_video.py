@@ -0,0 +1,100 @@
+"""CPU cost of a game-over popup video: per-frame decoding vs the decoded cache.
+
+"before" is the old create_popup loop: cv2.VideoCapture.read, cvtColor,
+resize to 320x240, Image.fromarray and ImageTk.PhotoImage on every 30 ms
+tick. "after" is media_cache: one decode pass, then a PhotoImage update
+per frame at the clip's own rate. The Tk steps are included only when a
+display is available; without one the numbers cover the Python/OpenCV side.
+
+    python benchmarks/bench_video.py --seconds 10
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+from PIL import Image
+
+from media_cache import FRAME_SIZE, MediaCache
+
+
+def tk_root():
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+        return root
+    except Exception:
+        return None
+
+
+def old_popup(path, seconds, root):
+    """CPU seconds for `seconds` of playback the old way (one frame per 30 ms tick)."""
+    if root is not None:
+        from PIL import ImageTk
+    cap = cv2.VideoCapture(path)
+    start = time.process_time()
+    for _ in range(int(seconds * 1000 / 30)):
+        ok, frame = cap.read()
+        if not ok:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = cap.read()
+        frame = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), FRAME_SIZE)
+        img = Image.fromarray(frame)
+        if root is not None:
+            ImageTk.PhotoImage(image=img)
+    cpu = time.process_time() - start
+    cap.release()
+    return cpu
+
+
+def new_popup(clip, seconds, root):
+    """CPU seconds for `seconds` of playback from a cached clip."""
+    frames = int(seconds * clip.fps)
+    start = time.process_time()
+    if root is not None:
+        import tkinter as tk
+        photo = tk.PhotoImage(format="gif", data=clip.frames[0])
+        for i in range(frames):
+            photo.configure(data=clip.frames[i % len(clip)])
+    else:
+        for i in range(frames):
+            clip.frames[i % len(clip)]
+    return time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0,
+                        help="length of popup playback to simulate")
+    parser.add_argument("--videos", nargs="*", default=["win.mp4", "lose.mp4"])
+    args = parser.parse_args()
+
+    root = tk_root()
+    print("Tk display:", "yes (PhotoImage costs included)" if root is not None
+          else "no (Tk image steps skipped)")
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cache = MediaCache()
+    for name in args.videos:
+        path = os.path.join(here, name)
+        start = time.process_time()
+        cache.load(path)
+        decode = time.process_time() - start
+        clip = cache.get(path)
+        if clip is None:
+            print(f"{name}: could not decode")
+            continue
+        before = old_popup(path, args.seconds, root)
+        after = new_popup(clip, args.seconds, root)
+        print(f"{name}: {len(clip)} frames @ {clip.fps:g} fps, cached {clip.nbytes / 1e6:.1f} MB, "
+              f"one-off decode {decode:.2f} s CPU")
+        print(f"  {args.seconds:g} s popup: before {before:.2f} s CPU "
+              f"({100 * before / args.seconds:.0f}% of a core) | "
+              f"after {after:.3f} s CPU ({100 * after / args.seconds:.1f}% of a core)")
+
+
+if __name__ == "__main__":
+    main()
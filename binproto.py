@@ -0,0 +1,326 @@
+"""Compact binary protocol, chosen by the client at login.
+
+A client that logs in with "BIN1:<username>" instead of the bare username
+gets the text line "PROTO:BIN1" back, and from then on both sides send
+binary frames. Clients that send only the username keep the text protocol.
+A session is resumed the same way: "BIN1:RESUME:<token>:<seq>" (sessions.py).
+
+Frame: u8 length of the rest (255: a u32 length follows), u8 opcode, payload.
+Integers are little-endian. Players are u32 ids handed out by the server:
+LIST, JOIN and ROSTER pair each id with its name (u8 length, utf-8), every
+other message carries only the id. Messages with no opcode of their own
+travel as TEXT (the text message, utf-8), so everything in the text
+protocol still works.
+
+    client -> server                  server -> client
+    01 INVITE id                      20 LIST (id, name)...
+    02 ACCEPT id                      21 JOIN (id, name)...
+    03 MOVE cell                      22 LEAVE id...
+    04 QUEUE                          23 INVITE_FROM id
+    05 QUEUE_CANCEL                   24 GAME_START 0=X/1=O, id
+    06 RESULT 0=X/1=O/2=Draw          25 OPPONENT_MOVE cell, u32 seq
+    07 ROSTER u32 offset, u32 limit,  26 OPPONENT_LEFT
+       prefix                         27 QUEUED i32
+    08 WATCH id                       28 RATING i32
+    09 UNWATCH                        29 ERROR text
+    00 TEXT text (both ways)          2A ROSTER u32 total, u32 offset, (id, name)...
+                                      2B WATCHING id x, id o, cells
+                                      2C WATCH_MOVE 0=X/1=O, cell
+                                      2D GAME_OVER 0=X/1=O/2=Draw, cell...
+                                      2E MOVE_REJECTED cells
+
+RESULT is what clients sent before the server kept the board; it is ignored.
+
+The server's game logic works on text, so binary connections are translated
+at the edge, except on the move path: OPPONENT_MOVE is packed straight from
+the numbers (opponent_move()) and a MOVE frame finds its text with one dict
+lookup. What binproto saves is bytes on the wire, not CPU: in pure Python
+text framing (bytes.split) still parses faster than binary frames, and
+translating the other messages costs more than encoding them as text
+(benchmarks/bench_protocol.py).
+"""
+import struct
+import threading
+
+from codec import FrameError, FrameWriter, MAX_FRAME
+
+LOGIN_PREFIX = "BIN1:"
+ACK = "PROTO:BIN1"
+
+TEXT = 0x00
+INVITE, ACCEPT, MOVE, QUEUE, QUEUE_CANCEL, RESULT, ROSTER_REQUEST, WATCH, UNWATCH = range(0x01, 0x0A)
+(LIST, JOIN, LEAVE, INVITE_FROM, GAME_START, OPPONENT_MOVE, OPPONENT_LEFT, QUEUED, RATING,
+ ERROR, ROSTER, WATCHING, WATCH_MOVE, GAME_OVER, MOVE_REJECTED) = range(0x20, 0x2F)
+
+SYMBOLS = ('X', 'O')
+RESULTS = ('X', 'O', "Draw")
+
+_ID = struct.Struct("<I")
+_INT = struct.Struct("<i")
+_PAIR = struct.Struct("<II")
+_OPPONENT_MOVE = struct.Struct("<BBBI")  # a whole OPPONENT_MOVE frame: length, opcode, cell, seq
+
+class NameTable:
+    """Player ids for one process. The server assigns them; clients learn them from LIST/JOIN.
+
+    Ids are never reused, so a stale id can only miss, never name the wrong player.
+    """
+
+    def __init__(self):
+        self.ids = {}    # {name: id}
+        self.names = {}  # {id: name}
+        self._next = 1
+        self._lock = threading.Lock()
+
+    def assign(self, name):
+        player_id = self.ids.get(name)
+        if player_id is None:
+            with self._lock:
+                player_id = self.ids.get(name)
+                if player_id is None:
+                    player_id = self.ids[name] = self._next
+                    self.names[player_id] = name
+                    self._next += 1
+        return player_id
+
+    def learn(self, player_id, name):
+        self.ids[name] = player_id
+        self.names[player_id] = name
+
+    def forget(self, name):
+        player_id = self.ids.pop(name, None)
+        if player_id is not None:
+            self.names.pop(player_id, None)
+
+def frame(op, payload=b""):
+    length = len(payload) + 1
+    if length < 255:
+        return bytes((length, op)) + payload
+    return b"\xff" + _ID.pack(length) + bytes((op,)) + payload
+
+def _named(names, table):
+    out = bytearray()
+    for name in names:
+        encoded = name.encode("utf-8")[:255]
+        out += _ID.pack(table.assign(name)) + bytes((len(encoded),)) + encoded
+    return bytes(out)
+
+def read_names(f, table, pos=0):
+    """Names from (id, name) pairs, which `table` learns as it goes (client side)."""
+    names = []
+    ids, by_id, size = table.ids, table.names, len(f)
+    while pos + 5 <= size:
+        end = pos + 5 + f[pos + 4]
+        name = f[pos + 5:end].decode("utf-8", "replace")
+        player_id = int.from_bytes(f[pos:pos + 4], "little")
+        ids[name] = player_id
+        by_id[player_id] = name
+        names.append(name)
+        pos = end
+    return names
+
+def read_ids(f, pos=0):
+    return struct.unpack_from(f"<{(len(f) - pos) // 4}I", f, pos)
+
+def read_id(payload, pos=0):
+    return _ID.unpack_from(payload, pos)[0]
+
+def read_int(payload, pos=0):
+    return _INT.unpack_from(payload, pos)[0]
+
+# --- text -> binary ---
+def _id_of(table, name):
+    player_id = table.ids.get(name)
+    if player_id is None:
+        raise KeyError(name)  # a player the peer was never told about: send as TEXT
+    return _ID.pack(player_id)
+
+def _cell(rest):
+    cell = int(rest)
+    if not 0 <= cell < 256:
+        raise ValueError(rest)
+    return bytes((cell,))
+
+def _game_start(rest, table):
+    role, _, opponent = rest.partition(":")
+    return bytes((0 if role == "YOU_X" else 1,)) + _id_of(table, opponent)
+
+def _roster(rest, table):
+    total, offset, *page = rest.split(",")
+    return _PAIR.pack(int(total), int(offset)) + _named([n for n in page if n], table)
+
+def _roster_request(rest, table):
+    offset, limit, *prefix = rest.split(":", 2)
+    return _PAIR.pack(int(offset), int(limit)) + (prefix[0] if prefix else "").encode("utf-8")
+
+def _watching(rest, table):
+    x_player, o_player, cells = rest.split(":")
+    return _id_of(table, x_player) + _id_of(table, o_player) + cells.encode("ascii")
+
+def _opponent_move(rest, table):
+    cell, _, seq = rest.partition(":")
+    return _cell(cell) + _ID.pack(int(seq))
+
+def opponent_move(cell, seq):
+    """The OPPONENT_MOVE frame straight from the numbers, for the server's hottest message."""
+    return _OPPONENT_MOVE.pack(_OPPONENT_MOVE.size - 1, OPPONENT_MOVE, cell, seq)
+
+def _watch_move(rest, table):
+    symbol, _, cell = rest.partition(":")
+    return bytes((SYMBOLS.index(symbol),)) + _cell(cell)
+
+def _game_over(rest, table):
+    result, _, line = rest.partition(":")
+    return bytes([RESULTS.index(result)] + [int(i) for i in line.split(",") if i])
+
+# {kind: (opcode, payload encoder(rest, table))}, for "KIND:rest" and "KIND,rest" messages
+_ENCODERS = {
+    "INVITE": (INVITE, lambda rest, t: _id_of(t, rest)),
+    "ACCEPT": (ACCEPT, lambda rest, t: _id_of(t, rest)),
+    "MOVE": (MOVE, lambda rest, t: _cell(rest)),
+    "QUEUE": (QUEUE, None),
+    "QUEUE_CANCEL": (QUEUE_CANCEL, None),
+    "RESULT": (RESULT, lambda rest, t: bytes((RESULTS.index(rest),))),
+    "ROSTER_REQUEST": (ROSTER_REQUEST, _roster_request),
+    "WATCH": (WATCH, lambda rest, t: _id_of(t, rest)),
+    "UNWATCH": (UNWATCH, None),
+    "LIST": (LIST, lambda rest, t: _named([n for n in rest.split(",") if n], t)),
+    "JOIN": (JOIN, lambda rest, t: _named([n for n in rest.split(",") if n], t)),
+    "LEAVE": (LEAVE, lambda rest, t: b"".join(_ID.pack(t.ids[n]) for n in rest.split(",")
+                                             if n in t.ids)),
+    "INVITE_FROM": (INVITE_FROM, lambda rest, t: _id_of(t, rest)),
+    "GAME_START": (GAME_START, _game_start),
+    "OPPONENT_MOVE": (OPPONENT_MOVE, _opponent_move),
+    "OPPONENT_LEFT": (OPPONENT_LEFT, None),
+    "QUEUED": (QUEUED, lambda rest, t: _INT.pack(int(rest))),
+    "RATING": (RATING, lambda rest, t: _INT.pack(int(rest))),
+    "ERROR": (ERROR, lambda rest, t: rest.encode("utf-8")),
+    "ROSTER": (ROSTER, _roster),
+    "WATCHING": (WATCHING, _watching),
+    "WATCH_MOVE": (WATCH_MOVE, _watch_move),
+    "GAME_OVER": (GAME_OVER, _game_over),
+    "MOVE_REJECTED": (MOVE_REJECTED, lambda rest, t: rest.encode("ascii")),
+}
+
+def to_binary(msg, table):
+    """The frame for text message `msg`. Anything without a compact form goes as TEXT.
+
+    The server's table assigns ids to names in LIST/JOIN/ROSTER; elsewhere a
+    name the table does not know also falls back to TEXT.
+    """
+    kind, sep, rest = msg.partition(":")
+    if "," in kind:
+        kind, sep, rest = msg.partition(",")
+    if kind == "ROSTER" and sep == ":":
+        kind = "ROSTER_REQUEST"  # ROSTER:<offset>:<limit> from a client, ROSTER,... from the server
+    entry = _ENCODERS.get(kind)
+    if entry is not None:
+        op, encoder = entry
+        if encoder is None:
+            if not sep:
+                return frame(op)
+        else:
+            try:
+                return frame(op, encoder(rest, table))
+            except (KeyError, ValueError, struct.error):
+                pass
+    return frame(TEXT, msg.encode("utf-8"))
+
+# --- binary -> text (server side: handle_message() works on text) ---
+# Frames are handled whole: f[0] is the opcode, the payload starts at f[1].
+def _name(table, f, pos=1):
+    return table.names.get(_ID.unpack_from(f, pos)[0], "")
+
+_DECODERS = {
+    INVITE: lambda f, t: f"INVITE:{_name(t, f)}",
+    ACCEPT: lambda f, t: f"ACCEPT:{_name(t, f)}",
+    MOVE: lambda f, t: f"MOVE:{f[1]}",
+    QUEUE: lambda f, t: "QUEUE",
+    QUEUE_CANCEL: lambda f, t: "QUEUE_CANCEL",
+    RESULT: lambda f, t: f"RESULT:{RESULTS[f[1]]}",
+    ROSTER_REQUEST: lambda f, t: "ROSTER:{}:{}".format(*_PAIR.unpack_from(f, 1)) + (
+        ":" + f[9:].decode("utf-8") if len(f) > 9 else ""),
+    WATCH: lambda f, t: f"WATCH:{_name(t, f)}",
+    UNWATCH: lambda f, t: "UNWATCH",
+    TEXT: lambda f, t: f[1:].decode("utf-8", "replace"),
+}
+
+# Frames that always read the same (every MOVE, and the opcodes without a payload):
+# a dict lookup of the frame itself instead of a decoder call and string formatting.
+_FIXED_TEXT = {bytes((MOVE, cell)): f"MOVE:{cell}" for cell in range(256)}
+_FIXED_TEXT.update({bytes((QUEUE,)): "QUEUE", bytes((QUEUE_CANCEL,)): "QUEUE_CANCEL",
+                    bytes((UNWATCH,)): "UNWATCH"})
+
+def to_text(f, table):
+    """The text message for a client frame; "" for frames that cannot be read."""
+    decoder = _DECODERS.get(f[0])
+    try:
+        return decoder(f, table) if decoder is not None else ""
+    except (IndexError, ValueError, struct.error):
+        return ""
+
+class Decoder:
+    """Incremental binary decoder: feed it raw reads, get back frames (opcode byte + payload)."""
+    __slots__ = ("_buffer", "max_frame")
+
+    def __init__(self, max_frame=MAX_FRAME):
+        self._buffer = b""
+        self.max_frame = max_frame
+
+    def feed(self, data):
+        buffer = self._buffer + data if self._buffer else data
+        frames = []
+        append = frames.append
+        pos, size = 0, len(buffer)
+        while pos < size:
+            length = buffer[pos]
+            end = pos + 1 + length
+            if length == 255 or not length or end > size:
+                if not length:
+                    raise FrameError("empty frame")
+                if length < 255 or size - pos < 5:
+                    break  # incomplete
+                length = _ID.unpack_from(buffer, pos + 1)[0]
+                if length > self.max_frame:
+                    raise FrameError(f"frame exceeds {self.max_frame} bytes")
+                end = pos + 5 + length
+                if end > size:
+                    break
+                append(buffer[pos + 5:end])
+            else:
+                append(buffer[pos + 1:end])
+            pos = end
+        self._buffer = buffer[pos:]
+        return frames
+
+    def pending(self):
+        return len(self._buffer)
+
+class MessageDecoder(Decoder):
+    """Server side: feed() returns text messages, like codec.Decoder."""
+    __slots__ = ("table",)
+
+    def __init__(self, table, max_frame=MAX_FRAME):
+        super().__init__(max_frame)
+        self.table = table
+
+    def feed(self, data):
+        table, fixed = self.table, _FIXED_TEXT.get
+        messages = []
+        for f in super().feed(data):
+            msg = fixed(f) or to_text(f, table)
+            if msg:
+                messages.append(msg)
+        return messages
+
+class BinaryFrameWriter(FrameWriter):
+    """FrameWriter for a binary connection: text messages are translated as they are queued."""
+    __slots__ = ("table",)
+    binary = True
+
+    def __init__(self, send, table, send_nowait=None, buffered=None):
+        super().__init__(send, send_nowait, buffered)
+        self.table = table
+
+    def write(self, msg):
+        self.write_encoded(to_binary(msg, self.table))
@@ -0,0 +1,60 @@
+"""The game board as one Canvas instead of nine Buttons.
+
+Each cell is a rectangle and a text item. update_board(), highlight_win()
+and reset() compare against what each cell already shows and only
+reconfigure the items that change, so Tk redraws just those cells'
+regions; a move repaints one cell, not the board.
+"""
+import tkinter as tk
+
+class BoardCanvas(tk.Canvas):
+    def __init__(self, parent, on_click, theme, size=3, cell=100, gap=10,
+                 font=("Verdana", 24, "bold")):
+        side = size * cell + (size + 1) * gap
+        super().__init__(parent, width=side, height=side, bg=theme["bg"],
+                         highlightthickness=0, borderwidth=0)
+        self.theme = theme
+        self.size = size
+        self.cell = cell
+        self.gap = gap
+        self.on_click = on_click
+        self.rects = []
+        self.texts = []
+        self.shown = []  # per cell: (text, fg, bg) as drawn
+        for index in range(size * size):
+            row, col = divmod(index, size)
+            x = gap + col * (cell + gap)
+            y = gap + row * (cell + gap)
+            self.rects.append(self.create_rectangle(x, y, x + cell, y + cell,
+                                                    fill=theme["btn_bg"], width=0))
+            self.texts.append(self.create_text(x + cell / 2, y + cell / 2, text="",
+                                               fill="black", font=font))
+            self.shown.append(("", "black", theme["btn_bg"]))
+        self.bind("<Button-1>", self._clicked)
+
+    def _clicked(self, event):
+        step = self.cell + self.gap
+        col, x = divmod(event.x - self.gap, step)
+        row, y = divmod(event.y - self.gap, step)
+        if 0 <= row < self.size and 0 <= col < self.size and x < self.cell and y < self.cell:
+            self.on_click(int(row * self.size + col))
+
+    def set_cell(self, index, text, fg, bg):
+        old_text, old_fg, old_bg = self.shown[index]
+        if old_bg != bg:
+            self.itemconfigure(self.rects[index], fill=bg)
+        if old_text != text or old_fg != fg:
+            self.itemconfigure(self.texts[index], text=text, fill=fg)
+        self.shown[index] = (text, fg, bg)
+
+    def update_board(self, index, symbol):
+        color = self.theme["x_color"] if symbol == "X" else self.theme["o_color"]
+        self.set_cell(index, symbol, color, self.shown[index][2])
+
+    def highlight_win(self, indices):
+        for index in indices:
+            self.set_cell(index, self.shown[index][0], "white", self.theme["win_bg"])
+
+    def reset(self):
+        for index in range(len(self.shown)):
+            self.set_cell(index, "", "black", self.theme["btn_bg"])
@@ -0,0 +1,292 @@
+"""Multi-process server: N asyncio workers share the game port, one broker links them.
+
+Each worker runs the normal asyncio server from server.py for the players
+connected to it. The broker owns the global roster and relays messages
+between workers over a Unix socket, so a player on one worker can see,
+invite and play against a player on another. Each worker keeps its own
+copy of a split game's board: it checks its player's moves and follows
+the other side's from the OPPONENT_MOVE messages routed to it.
+
+Broker protocol (newline framed, see codec.py), worker -> broker:
+    CLAIM:<name>            reserve a username   -> CLAIMED:<name> / TAKEN:<name>
+    RELEASE:<name>          username logged out
+    ROUTE:<name>:<msg>      deliver <msg> to <name>, wherever it is
+    PAIR:<name>:<opponent>[:<symbol>]  record <name>'s opponent (and X/O) on its worker
+    UNPAIR:<name>           clear <name>'s opponent on its worker
+    WATCH:<spectator>:<player>, UNWATCH:<spectator>:<player>
+                            passed to <player>'s worker, which feeds the
+                            spectator its game with ROUTE messages
+broker -> workers:
+    JOINED:<name> / LEFT:<name>   roster changes, sent to every worker
+    DELIVER:<name>:<msg>, PAIR:<name>:<opponent>[:<symbol>], UNPAIR:<name>,
+    WATCH:<spectator>:<player>, UNWATCH:<spectator>:<player>
+"""
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+import time
+
+import server
+from codec import Decoder, FrameWriter
+
+class Broker:
+    def __init__(self):
+        self.owners = {}     # {username: FrameWriter of the worker it is on}
+        self.workers = set()
+
+    async def handle_worker(self, reader, writer):
+        frames = FrameWriter(writer.write)
+        decoder = Decoder()
+        outbox = set()
+        self.workers.add(frames)
+        for name in self.owners:
+            frames.write(f"JOINED:{name}")
+        frames.flush()
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data: break
+                for msg in decoder.feed(data):
+                    self.handle_message(frames, msg, outbox)
+                server.flush_outbox(outbox)
+        except ConnectionError:
+            pass  # worker killed; its players are released below
+        finally:
+            self.workers.discard(frames)
+            for name in [n for n, owner in self.owners.items() if owner is frames]:
+                del self.owners[name]
+                self.broadcast(f"LEFT:{name}", outbox)
+            server.flush_outbox(outbox)
+            writer.close()
+
+    def handle_message(self, frames, msg, outbox):
+        kind, _, rest = msg.partition(":")
+        if kind == "ROUTE" or kind == "PAIR":
+            name, _, payload = rest.partition(":")
+            owner = self.owners.get(name)
+            if owner is not None:
+                owner.write(f"DELIVER:{name}:{payload}" if kind == "ROUTE" else msg)
+                outbox.add(owner)
+        elif kind == "UNPAIR" or kind == "WATCH" or kind == "UNWATCH":
+            owner = self.owners.get(rest.rpartition(":")[2])  # UNPAIR:<name>, WATCH:<spectator>:<player>
+            if owner is not None:
+                owner.write(msg)
+                outbox.add(owner)
+        elif kind == "CLAIM":
+            if rest in self.owners:
+                frames.write(f"TAKEN:{rest}")
+                outbox.add(frames)
+            else:
+                self.owners[rest] = frames
+                frames.write(f"CLAIMED:{rest}")
+                outbox.add(frames)
+                self.broadcast(f"JOINED:{rest}", outbox)
+        elif kind == "RELEASE":
+            if self.owners.get(rest) is frames:
+                del self.owners[rest]
+                self.broadcast(f"LEFT:{rest}", outbox)
+
+    def broadcast(self, msg, outbox):
+        for worker in self.workers:
+            worker.write(msg)
+            outbox.add(worker)
+
+class RouteFeed:
+    """Stands in for a spectator's FrameWriter when the spectator is on another worker.
+
+    The shared move bytes get a ROUTE prefix and go out on the broker link,
+    which never blocks; the spectator's worker delivers them like any other
+    routed message, so remote spectators are not held to MAX_BACKLOG.
+    """
+    __slots__ = ("link", "prefix")
+    binary = False  # relayed as text; the spectator's own worker re-encodes it
+
+    def __init__(self, link, name):
+        self.link = link
+        self.prefix = f"ROUTE:{name}:".encode("utf-8")
+
+    def write_encoded(self, data):
+        self.link.writer.write_encoded(self.prefix + data)
+
+    def flush_nowait(self):
+        self.link.writer.flush()  # StreamWriter.write: never blocks
+        return 0
+
+    def backlog(self):
+        return 0
+
+class BrokerLink:
+    """A worker's connection to the broker; installed as server.broker."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = FrameWriter(writer.write)
+        self.roster = {}   # {username: None}, ordered like the single-process LIST
+        self._claims = {}  # {username: Future[bool]}
+
+    async def claim(self, name):
+        """True if `name` was free on every worker and is now ours."""
+        future = asyncio.get_running_loop().create_future()
+        self._claims[name] = future
+        self.writer.send(f"CLAIM:{name}")
+        return await future
+
+    def release(self, name, outbox):
+        self.writer.write(f"RELEASE:{name}")
+        outbox.add(self.writer)
+
+    def route(self, name, msg, outbox):
+        self.writer.write(f"ROUTE:{name}:{msg}")
+        outbox.add(self.writer)
+
+    def pair(self, name, opponent, outbox, symbol=None):
+        self.writer.write(f"PAIR:{name}:{opponent}" + (f":{symbol}" if symbol else ""))
+        outbox.add(self.writer)
+
+    def unpair(self, name, outbox):
+        self.writer.write(f"UNPAIR:{name}")
+        outbox.add(self.writer)
+
+    def watch(self, spectator, player, outbox):
+        self.writer.write(f"WATCH:{spectator}:{player}")
+        outbox.add(self.writer)
+
+    def unwatch(self, spectator, player, outbox):
+        self.writer.write(f"UNWATCH:{spectator}:{player}")
+        outbox.add(self.writer)
+
+    def feed(self, spectator):
+        return RouteFeed(self, spectator)
+
+    async def run(self):
+        decoder = Decoder()
+        outbox = set()
+        while True:
+            data = await self.reader.read(65536)
+            if not data:
+                raise ConnectionError("lost connection to broker")
+            for msg in decoder.feed(data):
+                self.handle_message(msg, outbox)
+            server.flush_outbox(outbox)
+            server.spectators.flush()
+
+    def handle_message(self, msg, outbox):
+        kind, _, rest = msg.partition(":")
+        if kind == "DELIVER":
+            name, _, payload = rest.partition(":")
+            server.deliver(name, payload, outbox)
+            if payload.startswith("INVITE_FROM:") and name in server.clients:
+                # The sender's worker filtered it; ACCEPT is checked here.
+                server.invites.delivered(payload.split(":")[1], name, time.monotonic())
+            elif payload.startswith("OPPONENT_MOVE:") and name in server.client_games:
+                server.follow_move(name, server.client_games[name], payload.split(":")[1], outbox)
+        elif kind == "PAIR":
+            name, _, rest = rest.partition(":")
+            opponent, _, symbol = rest.partition(":")
+            if name in server.clients:
+                server.set_opponent(name, opponent, outbox, symbol or None)
+        elif kind == "UNPAIR":
+            server.clear_opponent(rest, outbox)
+        elif kind == "WATCH":
+            spectator, _, player = rest.partition(":")
+            server.watch_game(spectator, player, outbox)
+        elif kind == "UNWATCH":
+            server.spectators.unwatch(rest.partition(":")[0])
+        elif kind == "JOINED":
+            self.roster[rest] = None
+            server.presence.joined(rest)
+        elif kind == "LEFT":
+            self.roster.pop(rest, None)
+            server.presence.left(rest)
+        elif kind in ("CLAIMED", "TAKEN"):
+            future = self._claims.pop(rest, None)
+            if future is not None and not future.done():
+                future.set_result(kind == "CLAIMED")
+
+# --- PROCESSES ---
+def listening_socket(host, port, reuse_port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(socket.SOMAXCONN)
+    sock.setblocking(False)
+    return sock
+
+async def worker_main(host, port, broker_path, sock):
+    reader, writer = await asyncio.open_unix_connection(broker_path)
+    server.broker = BrokerLink(reader, writer)
+    if sock is None:  # SO_REUSEPORT: every worker binds its own socket
+        sock = listening_socket(host, port, reuse_port=True)
+    game_server = await asyncio.start_server(server.handle_client_async, sock=sock)
+    housekeeper = asyncio.create_task(server.housekeeping_task())  # keep a reference
+    async with game_server:
+        await server.broker.run()
+
+def run_worker(host, port, broker_path, sock, metrics_port, profile_interval,
+               match_log_path, index, workers, settings):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # the parent handles Ctrl+C
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    server.raise_fd_limit()
+    server.configure(**settings)
+    server.enable_metrics(metrics_port, profile_interval)
+    server.enable_match_log(match_log_path, index, workers)
+    asyncio.run(worker_main(host, port, broker_path, sock))
+
+async def broker_main(broker_sock, procs):
+    broker = Broker()
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    broker_server = await asyncio.start_unix_server(broker.handle_worker, sock=broker_sock)
+    async with broker_server:
+        await stop.wait()
+        for proc in procs:
+            proc.terminate()
+        # Let each worker's handler see EOF and finish before the loop closes.
+        for _ in range(50):
+            if not broker.workers:
+                break
+            await asyncio.sleep(0.02)
+
+def start_cluster(host=server.HOST, port=server.PORT, workers=None,
+                  metrics_port=None, profile_interval=None, match_log_path=None,
+                  settings=None):
+    """Runs `workers` processes sharing the port; `settings` are server.configure() arguments."""
+    workers = workers or os.cpu_count() or 1
+    server.raise_fd_limit()
+    broker_path = os.path.join(tempfile.mkdtemp(prefix="tictactoe-"), "broker.sock")
+    # Bind the broker socket before forking so workers can connect straight away;
+    # the broker's event loop only starts in this process after the fork.
+    broker_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    broker_sock.bind(broker_path)
+    broker_sock.listen(workers)
+    reuse_port = hasattr(socket, "SO_REUSEPORT")
+    # Without SO_REUSEPORT the workers accept from one socket inherited via fork.
+    shared = None if reuse_port else listening_socket(host, port, reuse_port=False)
+    context = multiprocessing.get_context("fork")
+    procs = []
+    for i in range(workers):
+        worker_metrics_port = metrics_port + i if metrics_port else None
+        proc = context.Process(target=run_worker,
+                               args=(host, port, broker_path, shared,
+                                     worker_metrics_port, profile_interval,
+                                     match_log_path, i, workers, settings or {}),
+                               daemon=True)
+        proc.start()
+        procs.append(proc)
+    print(f"--- Server Running on {host}:{port} (cluster, {workers} workers) ---")
+
+    try:
+        asyncio.run(broker_main(broker_sock, procs))
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.join()
+        os.unlink(broker_path)
+        os.rmdir(os.path.dirname(broker_path))
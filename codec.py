@@ -0,0 +1,145 @@
+"""Message framing shared by server.py and run_client.py.
+
+Every protocol message is UTF-8 text terminated by a newline, so messages
+that TCP coalesces or splits across recv() calls can be put back together.
+"""
+import threading
+
+DELIMITER = b"\n"
+MAX_FRAME = 64 * 1024  # longest message we accept before giving up on a peer
+
+
+class FrameError(ValueError):
+    """Raised when a peer sends a frame longer than the decoder allows."""
+
+
+def encode(msg):
+    """Returns the wire bytes for one message."""
+    return msg.encode('utf-8') + DELIMITER
+
+
+def encode_batch(msgs):
+    """Returns the wire bytes for several messages, ready for one send call."""
+    return b"".join(m.encode('utf-8') + DELIMITER for m in msgs)
+
+
+class Decoder:
+    """Incremental decoder: feed it raw reads, get back complete messages."""
+    __slots__ = ("_buffer", "max_frame")
+
+    def __init__(self, max_frame=MAX_FRAME):
+        self._buffer = b""
+        self.max_frame = max_frame
+
+    def feed(self, data):
+        """Returns the list of messages completed by `data` (possibly empty)."""
+        buffer = self._buffer + data if self._buffer else data
+        if DELIMITER not in buffer:
+            if len(buffer) > self.max_frame:
+                raise FrameError(f"frame exceeds {self.max_frame} bytes")
+            self._buffer = buffer
+            return []
+        *frames, self._buffer = buffer.split(DELIMITER)
+        if len(self._buffer) > self.max_frame:
+            raise FrameError(f"frame exceeds {self.max_frame} bytes")
+        return [f.decode('utf-8') for f in frames]
+
+    def pending(self):
+        """Number of buffered bytes that do not yet form a whole message."""
+        return len(self._buffer)
+
+
+class FrameWriter:
+    """Queues outgoing messages and sends everything queued in one call.
+
+    `send` is the underlying write function, e.g. ``socket.sendall`` or
+    ``StreamWriter.write``. Queuing takes a short lock of its own and sends
+    take another, so frames from different threads never interleave and
+    write() never waits behind a send that is blocked on a full socket.
+
+    flush_nowait() is for traffic that must never block the caller
+    (spectator fan-out): `send_nowait(data)` returns how many bytes the
+    connection took right now (default: `send`, for transports that buffer
+    by themselves) and the rest waits for the next flush. `buffered()`
+    reports bytes the transport itself still holds, if it has a buffer.
+    """
+    __slots__ = ("_send", "_send_nowait", "_buffered", "_pending", "_queued", "_unsent",
+                 "_sending", "_lock", "_send_lock")
+    binary = False  # binproto.BinaryFrameWriter: frames from write_encoded() must be binary
+
+    def __init__(self, send, send_nowait=None, buffered=None):
+        self._send = send
+        self._send_nowait = send_nowait
+        self._buffered = buffered
+        self._pending = []
+        self._queued = 0    # bytes in _pending
+        self._unsent = b""  # tail of a flush_nowait() the connection did not take
+        self._sending = 0   # bytes a flush() is sending right now (maybe blocked)
+        self._lock = threading.Lock()       # _pending and _queued
+        self._send_lock = threading.Lock()  # _unsent, _sending and the sends themselves
+
+    def write(self, msg):
+        """Queues `msg`; nothing goes on the wire until flush()."""
+        data = encode(msg)
+        with self._lock:
+            self._pending.append(data)
+            self._queued += len(data)
+
+    def write_encoded(self, data):
+        """Queues frames that are already encoded, e.g. bytes shared by many writers."""
+        with self._lock:
+            self._pending.append(data)
+            self._queued += len(data)
+
+    def _take(self):
+        """Everything waiting, oldest first; call it holding _send_lock."""
+        with self._lock:
+            pending = b"".join(self._pending)
+            self._pending.clear()
+            self._queued = 0
+        data = self._unsent + pending if self._unsent else pending
+        self._unsent = b""
+        return data
+
+    def flush(self):
+        """Sends all queued messages with a single write."""
+        with self._send_lock:
+            data = self._take()
+            if not data:
+                return
+            self._sending = len(data)
+            try:
+                self._send(data)
+            finally:
+                self._sending = 0
+
+    def flush_nowait(self):
+        """Sends as much as the connection takes without blocking; returns the bytes left over.
+
+        If another thread is in the middle of a send, nothing is sent and
+        everything waiting counts as left over.
+        """
+        if not self._send_lock.acquire(blocking=False):
+            return self.backlog() or 1
+        try:
+            data = self._take()
+            if not data:
+                return 0
+            if self._send_nowait is None:
+                self._send(data)
+                return 0
+            sent = self._send_nowait(data)
+            self._unsent = data[sent:]
+            return len(self._unsent)
+        finally:
+            self._send_lock.release()
+
+    def backlog(self):
+        """Bytes queued, being sent, or left unsent by flush_nowait() or the transport."""
+        return (self._queued + len(self._unsent) + self._sending
+                + (self._buffered() if self._buffered is not None else 0))
+
+    def send(self, msg):
+        """Queues `msg` and flushes immediately."""
+        self.write(msg)
+        self.flush()
@@ -0,0 +1,80 @@
+"""Hands server events from the network thread to the Tk thread, a batch at a time.
+
+put() is called on the receiver thread for every event; it returns True
+when the queue was empty, i.e. when the Tk side needs one root.after() to
+come and drain() it. Everything that arrived by then is handled in that
+one callback. Events that only describe the latest state are coalesced
+while they wait:
+    list           a full roster: replaces any waiting list, join or leave
+    join, leave    folded into a waiting list (the roster is one entry then)
+    queued, rating, opponent_away, opponent_back
+                   only the newest of each kind (away/back as one) is kept
+Everything else (moves, game start and end, invites, errors) is delivered
+once each, in the order it arrived.
+"""
+import threading
+
+# Latest-wins events; kinds sharing a key replace each other.
+LATEST_ONLY = {"queued": "queued", "rating": "rating",
+               "opponent_away": "away", "opponent_back": "away"}
+ROSTER = ("list", "join", "leave")
+
+class EventQueue:
+    def __init__(self):
+        self.pending = []     # [event, payload] in arrival order; event None once superseded
+        self.latest = {}      # {LATEST_ONLY key: its waiting entry}
+        self.roster = []      # waiting roster entries; just the list, once there is one
+        self.received = 0
+        self.coalesced = 0    # events dropped or merged before reaching Tk
+        self._lock = threading.Lock()
+
+    def put(self, event, payload):
+        """Queues one event; True if the caller should schedule a drain()."""
+        with self._lock:
+            self.received += 1
+            wake = not self.pending
+            entry = [event, payload]
+            if event in ROSTER:
+                entry = self._roster(entry)
+            elif event in LATEST_ONLY:
+                key = LATEST_ONLY[event]
+                old = self.latest.get(key)
+                if old is not None:
+                    self._drop(old)
+                self.latest[key] = entry
+            if entry is not None:
+                self.pending.append(entry)
+            return wake
+
+    def _roster(self, entry):
+        event, payload = entry
+        if event == "list":
+            for old in self.roster:
+                self._drop(old)
+            entry[1] = list(payload)  # later joins and leaves edit it in place
+            self.roster = [entry]
+            return entry
+        if self.roster and self.roster[0][0] == "list":
+            players = self.roster[0][1]
+            if event == "join":
+                listed = set(players)
+                players.extend(p for p in dict.fromkeys(payload) if p not in listed)
+            else:
+                gone = set(payload)
+                players[:] = [p for p in players if p not in gone]
+            self.coalesced += 1
+            return None
+        self.roster.append(entry)
+        return entry
+
+    def _drop(self, entry):
+        entry[0] = None
+        self.coalesced += 1
+
+    def drain(self):
+        """(event, payload) pairs waiting, oldest first; empties the queue."""
+        with self._lock:
+            pending, self.pending = self.pending, []
+            self.latest.clear()
+            self.roster = []
+        return [(event, payload) for event, payload in pending if event is not None]
@@ -1,38 +1,198 @@
+# Directions a winning line can run in, as (row step, col step):
+# rows, cols, main diagonal, anti-diagonal.
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+_RAY_CACHE = {}
+
+def _rays(n, k):
+    """Per cell, per direction: (cells walking back, cells walking forward),
+    each at most k-1 long. Shared by every engine with the same n and k."""
+    key = (n, k)
+    if key not in _RAY_CACHE:
+        table = []
+        for index in range(n * n):
+            row, col = divmod(index, n)
+            per_dir = []
+            for dr, dc in DIRECTIONS:
+                pair = []
+                for sign in (-1, 1):
+                    ray = []
+                    r, c = row + sign * dr, col + sign * dc
+                    while 0 <= r < n and 0 <= c < n and len(ray) < k - 1:
+                        ray.append(r * n + c)
+                        r += sign * dr
+                        c += sign * dc
+                    pair.append(tuple(ray))
+                per_dir.append(tuple(pair))
+            table.append(tuple(per_dir))
+        _RAY_CACHE[key] = tuple(table)
+    return _RAY_CACHE[key]
+
 class GameEngine:
-    def __init__(self):
-        self.board = [""] * 9
-        self.turn = 'X'
-        self.winner = None
+    def __init__(self, size=3, win_length=None, line_counters=False):
+        """`size` x `size` board, `win_length` in a row wins (default: size).
+
+        With `line_counters` (only used when win_length == size) each row,
+        column and diagonal keeps a per-player count, so a win is a single
+        counter compare instead of a walk along the line.
+        """
+        self.size = size
+        self.win_length = win_length or size
+        if not 1 <= self.win_length <= size:
+            raise ValueError(f"win_length must be between 1 and {size}")
+        self.line_counters = line_counters and self.win_length == size
+        self._rays = _rays(size, self.win_length)
+        self.reset()
 
     def reset(self):
-        self.board = [""] * 9
+        self.board = [""] * (self.size * self.size)
         self.turn = 'X'
         self.winner = None
+        self.moves = []  # [(index, symbol)] in play order
+        if self.line_counters:
+            # Lines 0..n-1 are rows, n..2n-1 cols, 2n main diagonal, 2n+1 anti.
+            self.line_counts = {'X': [0] * (2 * self.size + 2),
+                                'O': [0] * (2 * self.size + 2)}
 
     def make_move(self, index, symbol):
         """Returns True if move is valid, False otherwise."""
         if self.board[index] == "" and self.winner is None:
             self.board[index] = symbol
+            self.moves.append((index, symbol))
+            if self.line_counters:
+                counts = self.line_counts[symbol]
+                for line in self._lines_of(index):
+                    counts[line] += 1
             return True
         return False
 
     def switch_turn(self):
         self.turn = 'O' if self.turn == 'X' else 'X'
 
+    def check_winner(self):
+        """Returns (WinnerSymbol, WinningIndices) or (None, [])
+
+        Only the lines through the last move are examined; a win anywhere
+        else would already have ended the game.
+        """
+        if not self.moves:
+            return None, []
+        index, symbol = self.moves[-1]
+        line = self._counted_line(index, symbol) if self.line_counters \
+            else self._line_through(index, symbol)
+        if line:
+            self.winner = symbol
+            return symbol, line
+
+        if len(self.moves) == len(self.board):
+            return "Draw", []
+
+        return None, []
+
+    def _line_through(self, index, symbol):
+        """Indices of a run of >= win_length `symbol`s through `index`, or None."""
+        board = self.board
+        for back, forward in self._rays[index]:
+            run = [index]
+            for ray in (back, forward):
+                for i in ray:
+                    if board[i] != symbol:
+                        break
+                    run.append(i)
+            if len(run) >= self.win_length:
+                return sorted(run)
+        return None
+
+    def _lines_of(self, index):
+        """Ids of the full-length lines through `index` (see reset)."""
+        n = self.size
+        row, col = divmod(index, n)
+        lines = [row, n + col]
+        if row == col:
+            lines.append(2 * n)
+        if row + col == n - 1:
+            lines.append(2 * n + 1)
+        return lines
+
+    def _counted_line(self, index, symbol):
+        """Same as _line_through for full-length lines, using line_counts."""
+        n = self.size
+        counts = self.line_counts[symbol]
+        for line in self._lines_of(index):
+            if counts[line] == n:
+                if line < n:
+                    return [line * n + c for c in range(n)]
+                if line < 2 * n:
+                    return [r * n + line - n for r in range(n)]
+                if line == 2 * n:
+                    return [r * n + r for r in range(n)]
+                return [r * n + n - 1 - r for r in range(n)]
+        return None
+
+# --- BITBOARD ENGINE ---
+# Cell i is bit (1 << i). Same API as GameEngine, but each player's cells are
+# an int mask so win and draw checks are table lookups instead of scans.
+WIN_LINES = (
+    (0,1,2), (3,4,5), (6,7,8), # Rows
+    (0,3,6), (1,4,7), (2,5,8), # Cols
+    (0,4,8), (2,4,6)           # Diagonals
+)
+WIN_MASKS = tuple((1 << a) | (1 << b) | (1 << c) for a, b, c in WIN_LINES)
+FULL_MASK = (1 << 9) - 1
+
+def _first_win(mask):
+    for line, win in zip(WIN_LINES, WIN_MASKS):
+        if mask & win == win:
+            return list(line)
+    return None
+
+# WIN_TABLE[mask] -> winning indices for a player holding `mask`, or None.
+WIN_TABLE = tuple(_first_win(m) for m in range(1 << 9))
+
+class BitboardEngine:
+    __slots__ = ("x_mask", "o_mask", "turn", "winner")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.x_mask = 0
+        self.o_mask = 0
+        self.turn = 'X'
+        self.winner = None
+
+    @property
+    def board(self):
+        """List-of-strings view matching GameEngine.board (read-only)."""
+        return ['X' if self.x_mask >> i & 1 else 'O' if self.o_mask >> i & 1 else ""
+                for i in range(9)]
+
+    def make_move(self, index, symbol):
+        """Returns True if move is valid, False otherwise."""
+        bit = 1 << index
+        if (self.x_mask | self.o_mask) & bit or self.winner is not None:
+            return False
+        if symbol == 'X':
+            self.x_mask |= bit
+        else:
+            self.o_mask |= bit
+        return True
+
+    def switch_turn(self):
+        self.turn = 'O' if self.turn == 'X' else 'X'
+
     def check_winner(self):
         """Returns (WinnerSymbol, WinningIndices) or (None, [])"""
-        wins = [
-            (0,1,2), (3,4,5), (6,7,8), # Rows
-            (0,3,6), (1,4,7), (2,5,8), # Cols
-            (0,4,8), (2,4,6)           # Diagonals
-        ]
-        
-        for a,b,c in wins:
-            if self.board[a] == self.board[b] == self.board[c] and self.board[a] != "":
-                self.winner = self.board[a]
-                return self.winner, [a,b,c]
-        
-        if "" not in self.board:
+        line = WIN_TABLE[self.x_mask]
+        if line:
+            self.winner = 'X'
+            return 'X', list(line)
+        line = WIN_TABLE[self.o_mask]
+        if line:
+            self.winner = 'O'
+            return 'O', list(line)
+
+        if self.x_mask | self.o_mask == FULL_MASK:
             return "Draw", []
-            
+
         return None, []
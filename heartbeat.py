@@ -0,0 +1,156 @@
+"""Heartbeats: find connections whose peer is gone without having closed them.
+
+A crashed client or a dropped network leaves a half-open connection that
+recv() waits on until the kernel gives up, often hours later; until then
+its thread, its clients entry and its username stay taken. So every
+connection has an idle deadline:
+    before login   LOGIN_TIMEOUT after it was accepted
+    logged in      PING_INTERVAL after the last bytes from the client; the
+                   server then sends PING and the client answers PONG
+    pinged         PONG_TIMEOUT later, still silent: the connection is closed
+Closing it ends the connection's read loop the way a real disconnect does,
+so its seat is held and given up (OPPONENT_LEFT) exactly as it is today.
+
+The deadlines live in a hashed timer wheel: one bucket per RESOLUTION
+seconds, a sweep looks only at the buckets whose time has come. Any read
+moves the connection's deadline later with a plain dict write (touch());
+the wheel notices when the old bucket comes up and files the connection
+again under its new deadline. A sweep therefore costs the connections
+that expire or were active, not every connection there is.
+"""
+import math
+import threading
+import time
+
+PING_INTERVAL = 15.0  # seconds of silence before PING
+PONG_TIMEOUT = 10.0   # seconds after PING before the connection is closed
+LOGIN_TIMEOUT = 10.0  # seconds to send the login line
+RESOLUTION = 0.5      # seconds per wheel bucket
+WHEEL_SLOTS = 128     # buckets; deadlines further out wrap around and are re-filed
+
+class TimerWheel:
+    def __init__(self, resolution=RESOLUTION, slots=WHEEL_SLOTS, now=None):
+        self.resolution = resolution
+        self.slots = [set() for _ in range(slots)]
+        self.deadlines = {}  # {key: monotonic deadline}; a key no longer here is stale in its bucket
+        self.tick = self._tick_of(time.monotonic() if now is None else now)  # last bucket swept
+        self.refiled = 0     # keys seen by a sweep before their (moved) deadline
+        self._lock = threading.Lock()
+
+    def _tick_of(self, when):
+        return int(when // self.resolution)
+
+    def _file(self, key, deadline):
+        tick = max(self.tick + 1, math.ceil(deadline / self.resolution))
+        self.slots[tick % len(self.slots)].add(key)
+
+    def schedule(self, key, deadline):
+        """Sets `key`'s deadline, earlier or later than before."""
+        with self._lock:
+            self.deadlines[key] = deadline
+            self._file(key, deadline)
+
+    def touch(self, key, deadline):
+        """Moves a scheduled `key`'s deadline later; cheap enough to call on every read.
+
+        Under the lock: a key expired() just took must not come back without a bucket.
+        """
+        with self._lock:
+            if key in self.deadlines:
+                self.deadlines[key] = deadline
+
+    def cancel(self, key):
+        with self._lock:
+            self.deadlines.pop(key, None)
+
+    def expired(self, now=None):
+        """Keys whose deadline has passed, now unscheduled.
+
+        Only the buckets that came due since the last call are looked at.
+        """
+        now = time.monotonic() if now is None else now
+        target = self._tick_of(now)
+        due = []
+        with self._lock:
+            # A sweep that is late by a whole turn of the wheel visits each bucket once.
+            first = max(self.tick + 1, target - len(self.slots) + 1)
+            self.tick = target
+            for tick in range(first, target + 1):
+                slot = self.slots[tick % len(self.slots)]
+                if not slot:
+                    continue
+                keys = list(slot)
+                slot.clear()
+                for key in keys:
+                    deadline = self.deadlines.get(key)
+                    if deadline is None:
+                        continue
+                    if deadline <= now:
+                        del self.deadlines[key]
+                        due.append(key)
+                    else:
+                        self._file(key, deadline)
+                        self.refiled += 1
+        return due
+
+    def __len__(self):
+        return len(self.deadlines)
+
+class Heartbeats:
+    """Idle deadlines for every connection; sweep() pings the quiet ones and closes the dead."""
+
+    def __init__(self, interval=PING_INTERVAL, timeout=PONG_TIMEOUT, login_timeout=LOGIN_TIMEOUT):
+        self.interval = interval
+        self.timeout = timeout
+        self.login_timeout = login_timeout
+        self.wheel = TimerWheel()
+        self.connections = {}  # {key: [ping() or None before login, close(), pinged]}
+        self.pings = 0
+        self.reaped = 0
+
+    def add(self, key, close):
+        """A new connection; `close()` must make its read loop end (from any thread)."""
+        if self.interval <= 0:
+            return
+        self.connections[key] = [None, close, False]
+        self.wheel.schedule(key, time.monotonic() + self.login_timeout)
+
+    def logged_in(self, key, ping):
+        """From now on `ping()` (queue PING without blocking) is tried before closing."""
+        conn = self.connections.get(key)
+        if conn is not None:
+            conn[0] = ping
+            # schedule(), not touch(): the interval may be shorter than the login timeout.
+            self.wheel.schedule(key, time.monotonic() + self.interval)
+
+    def touch(self, key):
+        """The client sent something: it is alive."""
+        conn = self.connections.get(key)
+        if conn is not None and conn[0] is not None:
+            conn[2] = False
+            self.wheel.touch(key, time.monotonic() + self.interval)
+
+    def remove(self, key):
+        if self.connections.pop(key, None) is not None:
+            self.wheel.cancel(key)
+
+    def sweep(self, now=None):
+        """Pings connections that went quiet, closes those that did not answer; returns how many."""
+        now = time.monotonic() if now is None else now
+        closed = 0
+        for key in self.wheel.expired(now):
+            conn = self.connections.get(key)
+            if conn is None:
+                continue
+            ping, close, pinged = conn
+            if ping is None or pinged:
+                self.connections.pop(key, None)
+                closed += 1
+                close()
+            else:
+                conn[2] = True
+                self.pings += 1
+                self.wheel.schedule(key, now + self.timeout)
+                ping()
+        self.reaped += closed
+        return closed
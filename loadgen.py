@@ -0,0 +1,312 @@
+"""Headless load generator: thousands of bot clients playing against server.py.
+
+Bots log in, get paired (INVITE/ACCEPT or the QUEUE matchmaker), and play
+random full games with MOVE messages until the run ends. Idle bots just sit
+in the lobby receiving presence updates. The report covers connection setup
+rate, message rate, move forwarding latency percentiles and error counts.
+
+    python loadgen.py --clients 2000 --ramp-up 5 --duration 30 \\
+        --mix invite=0.6,queue=0.3,idle=0.1 --server-mode asyncio
+
+Move latency is measured from the sender's write to the opponent's read,
+so it is only sampled when both bots of a game live in the same load
+process (always true for invite games).
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from codec import Decoder, encode
+from game_engine import GameEngine
+
+RECV_TIMEOUT = 10.0  # seconds a bot waits for an expected message
+
+class BotError(Exception):
+    """A protocol step failed; counted per kind in the report."""
+
+class Bot:
+    def __init__(self, name, stats, registry):
+        self.name = name
+        self.stats = stats
+        self.registry = registry  # {name: Bot} for bots in this process
+        self.decoder = Decoder()
+        self.inbox = []
+        self.sent_at = None
+        self.reader = self.writer = None
+
+    async def connect(self, host, port):
+        start = time.monotonic()
+        try:
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+        except OSError as e:
+            raise BotError("connect") from e
+        self.send(self.name)
+        await self.expect("LIST", "ERROR")
+        self.stats["connects"].append((start, time.monotonic()))
+        self.registry[self.name] = self
+
+    def send(self, msg):
+        self.writer.write(encode(msg))
+        self.stats["sent"] += 1
+
+    async def expect(self, *prefixes, timeout=RECV_TIMEOUT):
+        """Returns the next message starting with one of `prefixes`, skipping others."""
+        deadline = time.monotonic() + timeout
+        while True:
+            while self.inbox:
+                msg = self.inbox.pop(0)
+                if msg.startswith("ERROR"):
+                    raise BotError(msg)
+                if msg == "PING":  # idle bots would be closed as dead otherwise
+                    self.send("PONG")
+                    continue
+                if msg.startswith(prefixes):
+                    return msg
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise BotError(f"timeout waiting for {prefixes[0]}")
+            try:
+                data = await asyncio.wait_for(self.reader.read(65536), remaining)
+            except asyncio.TimeoutError:
+                raise BotError(f"timeout waiting for {prefixes[0]}") from None
+            except OSError as e:
+                raise BotError("connection error") from e
+            if not data:
+                raise BotError("server closed connection")
+            msgs = self.decoder.feed(data)
+            self.stats["received"] += len(msgs)
+            self.inbox.extend(msgs)
+
+    async def play_games(self, symbol, opponent, deadline, rng):
+        """Plays back-to-back games against `opponent` until `deadline`."""
+        engine = GameEngine()
+        while True:
+            if engine.turn == symbol:
+                if time.monotonic() > deadline and not engine.moves:
+                    self.close()  # stop between games; the opponent sees OPPONENT_LEFT
+                    return
+                idx = rng.choice([i for i, c in enumerate(engine.board) if c == ""])
+                engine.make_move(idx, symbol)
+                self.sent_at = time.perf_counter()
+                self.send(f"MOVE:{idx}")
+            else:
+                msg = await self.expect("OPPONENT_MOVE", "OPPONENT_LEFT", "OPPONENT_AWAY")
+                if not msg.startswith("OPPONENT_MOVE"):  # AWAY: the server holds its seat
+                    if time.monotonic() > deadline:
+                        return
+                    raise BotError("opponent left")
+                peer = self.registry.get(opponent)
+                if peer is not None and peer.sent_at is not None:
+                    self.stats["latencies"].append(time.perf_counter() - peer.sent_at)
+                engine.make_move(int(msg.split(":")[1]), engine.turn)
+            winner, _ = engine.check_winner()
+            if winner:
+                await self.expect("GAME_OVER")  # the server's board agrees
+                if symbol == 'X':
+                    self.stats["games"] += 1
+                engine.reset()
+            else:
+                engine.switch_turn()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+async def run_invite_pair(x, o, deadline, rng):
+    while True:  # o may not have reached the server's roster yet
+        x.send(f"INVITE:{o.name}")
+        try:
+            await o.expect("INVITE_FROM", timeout=1.0)
+            break
+        except BotError:
+            if time.monotonic() > deadline:
+                return
+    o.send(f"ACCEPT:{x.name}")
+    await x.expect("GAME_START")
+    await o.expect("GAME_START")
+    await asyncio.gather(x.play_games('X', o.name, deadline, rng),
+                         o.play_games('O', x.name, deadline, rng))
+
+async def run_queue_bot(bot, deadline, rng):
+    bot.send("QUEUE")
+    try:
+        msg = await bot.expect("GAME_START", timeout=max(1.0, deadline - time.monotonic()))
+    except BotError:
+        if time.monotonic() >= deadline:
+            return  # still queued when the run ended (odd player out)
+        raise
+    _, role, opponent = msg.split(":", 2)
+    await bot.play_games('X' if role == "YOU_X" else 'O', opponent, deadline, rng)
+
+async def run_idle_bot(bot, deadline):
+    while time.monotonic() < deadline:
+        try:
+            await bot.expect("\0", timeout=deadline - time.monotonic())  # never matches
+        except BotError as e:
+            if "timeout" not in str(e):
+                raise
+
+async def guarded(stats, coro):
+    try:
+        await coro
+    except BotError as e:
+        kind = str(e).split(":")[0]
+        stats["errors"][kind] = stats["errors"].get(kind, 0) + 1
+
+def new_stats():
+    return {"connects": [], "latencies": [], "sent": 0, "received": 0,
+            "games": 0, "errors": {}}
+
+async def run_process(index, host, port, plan, ramp_up, duration, seed):
+    """plan: list of 'invite' (a pair), 'queue' or 'idle' entries for this process."""
+    stats = new_stats()
+    registry = {}
+    rng = random.Random(seed)
+    start = time.monotonic()
+    deadline = start + ramp_up + duration
+    bots = []
+
+    async def launch(slot, kind):
+        await asyncio.sleep(ramp_up * slot / max(len(plan), 1))
+        names = [f"lg{index}_{slot}{s}" for s in ("x", "o")] if kind == "invite" \
+            else [f"lg{index}_{slot}"]
+        members = [Bot(n, stats, registry) for n in names]
+        bots.extend(members)
+        for bot in members:
+            await bot.connect(host, port)
+        if kind == "invite":
+            await run_invite_pair(members[0], members[1], deadline, rng)
+        elif kind == "queue":
+            await run_queue_bot(members[0], deadline, rng)
+        else:
+            await run_idle_bot(members[0], deadline)
+
+    await asyncio.gather(*(guarded(stats, launch(i, kind)) for i, kind in enumerate(plan)))
+    stats["elapsed"] = time.monotonic() - start
+    for bot in bots:
+        bot.close()
+    return stats
+
+def process_main(index, host, port, plan, ramp_up, duration, seed, results):
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError):
+        pass
+    results.put(asyncio.run(run_process(index, host, port, plan, ramp_up, duration, seed)))
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, _, share = part.partition("=")
+        if kind not in ("invite", "queue", "idle"):
+            raise argparse.ArgumentTypeError(f"unknown bot kind {kind!r}")
+        mix[kind] = float(share)
+    total = sum(mix.values())
+    return {k: v / total for k, v in mix.items()}
+
+def build_plans(clients, mix, procs):
+    """Splits `clients` bots by `mix` into per-process plans (invite bots come in pairs)."""
+    plans = [[] for _ in range(procs)]
+    counts = {kind: int(round(clients * share)) for kind, share in mix.items()}
+    slot = 0
+    for kind, count in counts.items():
+        for _ in range(count // 2 if kind == "invite" else count):
+            plans[slot % procs].append(kind)
+            slot += 1
+    for plan in plans:
+        random.Random(len(plan)).shuffle(plan)
+    return plans
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def report(all_stats):
+    connects = [c for s in all_stats for c in s["connects"]]
+    connect = [end - start for start, end in connects]
+    span = (max(e for _, e in connects) - min(s for s, _ in connects)) if connects else 1.0
+    latencies = [t for s in all_stats for t in s["latencies"]]
+    elapsed = max(s["elapsed"] for s in all_stats)
+    messages = sum(s["sent"] + s["received"] for s in all_stats)
+    errors = {}
+    for s in all_stats:
+        for kind, n in s["errors"].items():
+            errors[kind] = errors.get(kind, 0) + n
+    print(f"connections:   {len(connect):,} ({len(connect) / max(span, 1e-9):,.0f}/s), "
+          f"login p50 {percentile(connect, 0.5) * 1e3:.1f} ms "
+          f"p99 {percentile(connect, 0.99) * 1e3:.1f} ms")
+    print(f"messages:      {messages:,} ({messages / elapsed:,.0f}/s sent+received)")
+    print(f"games:         {sum(s['games'] for s in all_stats):,}")
+    print(f"move latency:  p50 {percentile(latencies, 0.5) * 1e3:.2f} ms "
+          f"p99 {percentile(latencies, 0.99) * 1e3:.2f} ms ({len(latencies):,} samples)")
+    print(f"errors:        {sum(errors.values())} {errors if errors else ''}")
+
+def wait_for_port(host, port, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"no server on {host}:{port}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless load generator for server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--ramp-up", type=float, default=2.0,
+                        help="seconds over which bots connect")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="seconds of play after ramp-up")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("invite=1"),
+                        help="share of bots per kind, e.g. invite=0.6,queue=0.3,idle=0.1")
+    parser.add_argument("--procs", type=int, default=os.cpu_count() or 1,
+                        help="load processes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--server-mode", default=None,
+                        help="start server.py in this mode (e.g. asyncio) for the run")
+    parser.add_argument("--server-args", default="",
+                        help="extra arguments for the spawned server, e.g. '--workers 4'")
+    args = parser.parse_args(argv)
+
+    server_proc = None
+    if args.server_mode:
+        here = os.path.dirname(os.path.abspath(__file__))
+        server_proc = subprocess.Popen(
+            # Bots move as fast as the server answers, far above a person's rate.
+            [sys.executable, os.path.join(here, "server.py"), "--quiet", "--no-rate-limit",
+             "--mode", args.server_mode, "--host", args.host, "--port", str(args.port)]
+            + args.server_args.split(), stdout=subprocess.DEVNULL)
+    try:
+        wait_for_port(args.host, args.port)
+        plans = build_plans(args.clients, args.mix, args.procs)
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=process_main,
+                                         args=(i, args.host, args.port, plan, args.ramp_up,
+                                               args.duration, args.seed + i, results))
+                 for i, plan in enumerate(plans) if plan]
+        for proc in procs:
+            proc.start()
+        all_stats = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+        report(all_stats)
+    finally:
+        if server_proc is not None:
+            server_proc.terminate()
+            server_proc.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Append-only binary log of finished games, with an index for REPLAY and HISTORY.
+
+One record per game, little-endian:
+    u32 length (whole record)  u32 crc32 (of everything after it)
+    u64 match id  f64 start time (unix)  u8 result  u8 len(x)  u8 len(o)  u16 moves
+    x name, o name (utf-8), then per move: u8 index (| 0x80 when O moved),
+    u16 milliseconds since the previous move (saturating)
+
+The game loop only appends to an in-memory list. A background thread writes
+what has accumulated every GROUP_COMMIT seconds with one write() and one
+fsync() for the whole group. After that it appends one 16-byte entry per
+record to "<log>.idx": u64 offset, u32 crc32(x), u32 crc32(o). Match ids
+count up from 0 per log, so id -> offset is a direct lookup in the mmapped
+index. The name hashes are loaded into {hash: [id]} for HISTORY.
+
+The index can always be rebuilt from the log: on open, records beyond the
+index are re-indexed and a torn tail from a crash is truncated.
+
+Cluster workers each write "<log>.<worker>" and put the worker number in
+the top bits of their match ids, so any worker can serve REPLAY for any game.
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+GROUP_COMMIT = 0.05  # seconds of finished games written and fsynced together
+RESULTS = ('X', 'O', "Draw", "abandoned")
+WORKER_SHIFT = 40    # match id = worker << WORKER_SHIFT | sequence number
+MAX_MOVES = 0xFFFF
+
+_HEAD = struct.Struct("<II")        # length, crc32
+_BODY = struct.Struct("<QdBBBH")    # match id, started, result, len(x), len(o), moves
+_MOVE = struct.Struct("<BH")
+_INDEX = struct.Struct("<QII")      # offset, crc32(x), crc32(o)
+
+def name_hash(name):
+    return zlib.crc32(name.encode("utf-8"))
+
+def _name_bytes(name):
+    return name.encode("utf-8")[:255]
+
+class Match:
+    """A game being recorded, or one read back from the log."""
+
+    def __init__(self, x_player, o_player, started=None, match_id=None, result=None):
+        self.match_id = match_id
+        self.x_player = x_player
+        self.o_player = o_player
+        self.started = time.time() if started is None else started
+        self.result = result
+        self.moves = []  # [(symbol, index, ms since the previous move)]
+        self._last = time.monotonic()
+
+    def add_move(self, symbol, index):
+        now = time.monotonic()
+        if len(self.moves) < MAX_MOVES:
+            self.moves.append((symbol, index, min(int((now - self._last) * 1000), 0xFFFF)))
+        self._last = now
+
+    def encode(self):
+        x, o = _name_bytes(self.x_player), _name_bytes(self.o_player)
+        body = bytearray(_BODY.pack(self.match_id, self.started, RESULTS.index(self.result),
+                                    len(x), len(o), len(self.moves)))
+        body += x + o
+        for symbol, index, delay in self.moves:
+            body += _MOVE.pack(index | (0x80 if symbol == 'O' else 0), delay)
+        return _HEAD.pack(_HEAD.size + len(body), zlib.crc32(body)) + body
+
+    @classmethod
+    def decode(cls, data, offset=0):
+        """Returns (Match, next offset), or (None, offset) for a torn or corrupt record."""
+        if offset + _HEAD.size > len(data):
+            return None, offset
+        length, crc = _HEAD.unpack_from(data, offset)
+        end = offset + length
+        if length < _HEAD.size + _BODY.size or end > len(data) \
+                or zlib.crc32(data[offset + _HEAD.size:end]) != crc:
+            return None, offset
+        match_id, started, result, x_len, o_len, count = _BODY.unpack_from(data, offset + _HEAD.size)
+        pos = offset + _HEAD.size + _BODY.size
+        x = bytes(data[pos:pos + x_len]).decode("utf-8", "replace")
+        o = bytes(data[pos + x_len:pos + x_len + o_len]).decode("utf-8", "replace")
+        match = cls(x, o, started, match_id, RESULTS[result])
+        pos += x_len + o_len
+        for packed, delay in _MOVE.iter_unpack(data[pos:pos + count * _MOVE.size]):
+            match.moves.append(('O' if packed & 0x80 else 'X', packed & 0x7F, delay))
+        return match, end
+
+class MatchLogReader:
+    """Read side of one log file (also used for other cluster workers' logs)."""
+
+    def __init__(self, path, worker=0):
+        self.path = path
+        self.worker = worker
+        self.count = 0      # indexed records
+        self.by_user = {}   # {crc32(name): [sequence numbers]}
+        self._log = self._idx = None  # (mmap, size) of each file, remapped as they grow
+
+    def _map(self, path, current):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        if current is not None and current[1] == size:
+            return current
+        if size == 0:
+            return None
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), size
+
+    def refresh(self):
+        """Picks up index entries appended since the last call."""
+        self._idx = self._map(self.path + ".idx", self._idx)
+        if self._idx is None:
+            return
+        data, size = self._idx
+        total = size // _INDEX.size
+        for seq in range(self.count, total):
+            _, x_hash, o_hash = _INDEX.unpack_from(data, seq * _INDEX.size)
+            self.by_user.setdefault(x_hash, []).append(seq)
+            if o_hash != x_hash:
+                self.by_user.setdefault(o_hash, []).append(seq)
+        self.count = total
+
+    def get(self, seq):
+        if seq >= self.count:
+            self.refresh()
+        if not 0 <= seq < self.count:
+            return None
+        offset = _INDEX.unpack_from(self._idx[0], seq * _INDEX.size)[0]
+        self._log = self._map(self.path, self._log)
+        if self._log is None:
+            return None
+        match, _ = Match.decode(self._log[0], offset)
+        return match
+
+    def user_matches(self, username, limit=None):
+        """Matches involving `username`, newest first."""
+        self.refresh()
+        found = []
+        for seq in reversed(self.by_user.get(name_hash(username), ())):
+            match = self.get(seq)  # the hash can collide: check the names
+            if match is not None and username in (match.x_player, match.o_player):
+                found.append(match)
+                if limit is not None and len(found) == limit:
+                    break
+        return found
+
+class MatchLog:
+    def __init__(self, path, worker=None, workers=1):
+        """worker/workers: this cluster worker's number and the worker count (None if not clustered)."""
+        self.worker = worker or 0
+        self.path = path if worker is None else f"{path}.{worker}"
+        self.readers = {w: MatchLogReader(path if worker is None else f"{path}.{w}", w)
+                        for w in (range(workers) if worker is not None else [0])}
+        self.reader = self.readers[self.worker]
+        self.next_seq = self._recover()
+        self.games = {}     # {x_player: Match in progress}
+        self.pending = []   # finished games not yet written
+        self.written = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name="match-log")
+        self._writer.start()
+
+    def _recover(self):
+        """Truncates a torn tail and indexes records the index missed; returns the next sequence."""
+        with open(self.path, "ab") as log, open(self.path + ".idx", "ab") as idx:
+            indexed = idx.tell() // _INDEX.size
+            idx.truncate(indexed * _INDEX.size)
+            end = 0
+            if indexed:
+                with open(self.path + ".idx", "rb") as f:
+                    f.seek((indexed - 1) * _INDEX.size)
+                    offset = _INDEX.unpack(f.read(_INDEX.size))[0]
+                with open(self.path, "rb") as f:
+                    f.seek(offset)
+                    length = _HEAD.unpack(f.read(_HEAD.size))[0]
+                end = offset + length
+            with open(self.path, "rb") as f:
+                f.seek(end)
+                tail = f.read()
+            pos, seq = 0, indexed
+            while True:
+                match, next_pos = Match.decode(tail, pos)
+                if match is None:
+                    break
+                idx.write(_INDEX.pack(end + pos, name_hash(match.x_player), name_hash(match.o_player)))
+                pos, seq = next_pos, seq + 1
+            if pos < len(tail):
+                log.truncate(end + pos)
+        self.reader.refresh()
+        return seq
+
+    # --- recording (called from the game loop; never touches the disk) ---
+    def begin(self, x_player, o_player):
+        with self._lock:
+            self.games[x_player] = Match(x_player, o_player)
+
+    def move(self, x_player, o_player, symbol, index):
+        """Records a move in x_player's current game, starting one if there is none."""
+        with self._lock:
+            match = self.games.get(x_player)
+            if match is None or match.o_player != o_player:
+                match = self.games[x_player] = Match(x_player, o_player)
+            match.add_move(symbol, index)
+
+    def finish(self, x_player, result):
+        """Closes x_player's game with `result` ('X', 'O', 'Draw' or 'abandoned')."""
+        with self._lock:
+            match = self.games.pop(x_player, None)
+            if match is None or (result == "abandoned" and not match.moves):
+                return None
+            match.result = result
+            match.match_id = (self.worker << WORKER_SHIFT) | self.next_seq
+            self.next_seq += 1
+            self.pending.append(match)
+            self._wake.notify()
+            return match.match_id
+
+    # --- background writer ---
+    def _write_loop(self):
+        with open(self.path, "ab") as log, open(self.path + ".idx", "ab") as idx:
+            while True:
+                with self._lock:
+                    while not self.pending and not self._closed:
+                        self._wake.wait()
+                    if not self.pending:
+                        return
+                # Let more games finish so they share the fsync below.
+                if not self._closed:
+                    time.sleep(GROUP_COMMIT)
+                with self._lock:
+                    batch, self.pending = self.pending, []
+                offset = log.tell()
+                records, entries = [], []
+                for match in batch:
+                    record = match.encode()
+                    records.append(record)
+                    entries.append(_INDEX.pack(offset, name_hash(match.x_player),
+                                               name_hash(match.o_player)))
+                    offset += len(record)
+                log.write(b"".join(records))
+                log.flush()
+                os.fsync(log.fileno())
+                idx.write(b"".join(entries))  # rebuilt from the log after a crash, so no fsync
+                idx.flush()
+                self.written += len(batch)
+
+    def close(self):
+        """Writes everything still pending and stops the writer."""
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._writer.join()
+
+    # --- lookups ---
+    def lookup(self, match_id):
+        reader = self.readers.get(match_id >> WORKER_SHIFT)
+        if reader is None:
+            return None
+        return reader.get(match_id & ((1 << WORKER_SHIFT) - 1))
+
+    def history(self, username, limit=20):
+        """Newest-first match ids for `username`, across every worker's log."""
+        found = []
+        for reader in self.readers.values():
+            found += reader.user_matches(username, limit)
+        found.sort(key=lambda m: m.started, reverse=True)
+        return [m.match_id for m in found[:limit]]
@@ -0,0 +1,125 @@
+"""Rating-based matchmaking queue for the QUEUE command.
+
+Waiting players are grouped into fixed-width rating buckets, so finding an
+opponent only looks at the few buckets inside the player's search window,
+never at the whole lobby. The window widens the longer a player waits.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_RATING = 1200
+ELO_K = 32
+
+class Ratings:
+    """Elo ratings by username, kept in memory for the life of the server."""
+
+    def __init__(self, k=ELO_K):
+        self.k = k
+        self.ratings = {}
+        self._lock = threading.Lock()
+
+    def get(self, username):
+        return self.ratings.get(username, DEFAULT_RATING)
+
+    def record(self, x_player, o_player, result):
+        """Updates both ratings for a finished game. `result` is 'X', 'O' or 'Draw'.
+
+        Returns the new (x_rating, o_rating).
+        """
+        with self._lock:
+            rx, ro = self.get(x_player), self.get(o_player)
+            expected_x = 1 / (1 + 10 ** ((ro - rx) / 400))
+            score_x = {'X': 1.0, 'O': 0.0}.get(result, 0.5)
+            delta = self.k * (score_x - expected_x)
+            self.ratings[x_player] = round(rx + delta)
+            self.ratings[o_player] = round(ro - delta)
+            return self.ratings[x_player], self.ratings[o_player]
+
+class MatchQueue:
+    def __init__(self, bucket_width=50, base_window=50, widen_per_second=25,
+                 max_window=400, clock=time.monotonic):
+        """A player waiting t seconds accepts opponents within
+        min(base_window + widen_per_second * t, max_window) rating points."""
+        self.bucket_width = bucket_width
+        self.base_window = base_window
+        self.widen_per_second = widen_per_second
+        self.max_window = max_window
+        self.clock = clock
+        self.buckets = {}  # {bucket: OrderedDict{username: (rating, joined_at)}}, oldest first
+        self.entries = {}  # {username: bucket}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, username):
+        return username in self.entries
+
+    def join(self, username, rating):
+        """Queues `username`, or returns the waiting opponent it was paired with."""
+        with self._lock:
+            if username in self.entries:
+                return None
+            opponent = self._find(rating, self.base_window, username)
+            if opponent is not None:
+                self._remove(opponent)
+                return opponent
+            bucket = rating // self.bucket_width
+            self.buckets.setdefault(bucket, OrderedDict())[username] = (rating, self.clock())
+            self.entries[username] = bucket
+            return None
+
+    def leave(self, username):
+        with self._lock:
+            if username in self.entries:
+                self._remove(username)
+
+    def tick(self):
+        """Retries the longest waiter of every bucket with its widened window.
+
+        Costs O(non-empty buckets x window); with realistic ratings the
+        bucket count is bounded by the rating range, not the queue length.
+        Returns the new [(older_player, newer_player)] pairs.
+        """
+        pairs = []
+        with self._lock:
+            now = self.clock()
+            heads = [next(iter(q.items())) for q in self.buckets.values()]
+            for username, (rating, joined_at) in heads:
+                if username not in self.entries:
+                    continue  # already paired earlier in this tick
+                window = min(self.base_window + self.widen_per_second * (now - joined_at),
+                             self.max_window)
+                opponent = self._find(rating, window, username)
+                if opponent is not None:
+                    older, newer = sorted((username, opponent),
+                                          key=lambda u: self._joined_at(u))
+                    self._remove(username)
+                    self._remove(opponent)
+                    pairs.append((older, newer))
+        return pairs
+
+    def _joined_at(self, username):
+        return self.buckets[self.entries[username]][username][1]
+
+    def _find(self, rating, window, exclude):
+        """Longest-waiting player within `window` points, nearest buckets first."""
+        home = rating // self.bucket_width
+        reach = int(window // self.bucket_width) + 1
+        for step in range(reach + 1):
+            for bucket in ((home,) if step == 0 else (home - step, home + step)):
+                queue = self.buckets.get(bucket)
+                if not queue:
+                    continue
+                for username, (other, _) in queue.items():
+                    if username != exclude and abs(other - rating) <= window:
+                        return username
+        return None
+
+    def _remove(self, username):
+        bucket = self.entries.pop(username)
+        queue = self.buckets[bucket]
+        del queue[username]
+        if not queue:
+            del self.buckets[bucket]
@@ -0,0 +1,102 @@
+"""Decoded popup videos, so showing one again costs no video decoding.
+
+A clip is read once with OpenCV, scaled to the popup size and kept as a
+list of small GIF frames (256 colours, ~30 KB at 320x240 instead of 225 KB
+of raw RGB). Tk's PhotoImage reads GIF data natively, so playback is one
+image update per frame with no cv2/PIL work. MediaCache holds clips under a
+byte budget and drops the least recently used one when it is exceeded.
+"""
+import base64
+import io
+import threading
+from collections import OrderedDict
+
+FRAME_SIZE = (320, 240)
+DEFAULT_BUDGET = 32 * 1024 * 1024  # bytes of encoded frames across all clips
+
+class Clip:
+    def __init__(self, frames, fps, mapped=False):
+        self.frames = frames  # base64 GIF data (bytes, or memoryviews into an asset bundle)
+        self.fps = fps
+        # Frames in a mapped bundle live in the page cache, not in the cache budget.
+        self.nbytes = 0 if mapped else sum(len(f) for f in frames)
+
+    def __len__(self):
+        return len(self.frames)
+
+def decode_clip(path, size=FRAME_SIZE):
+    """Decodes and scales every frame of `path`. Needs cv2 and PIL; returns None if unreadable."""
+    import cv2
+    from PIL import Image
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        cap.release()
+        return None
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = []
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok: break
+            frame = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), size,
+                               interpolation=cv2.INTER_AREA)
+            buf = io.BytesIO()
+            Image.fromarray(frame).quantize(256, method=Image.Quantize.FASTOCTREE).save(buf, "GIF")
+            frames.append(base64.b64encode(buf.getvalue()))
+    finally:
+        cap.release()
+    return Clip(frames, fps) if frames else None
+
+class MediaCache:
+    def __init__(self, budget=DEFAULT_BUDGET, decoder=decode_clip):
+        self.budget = budget
+        self.decoder = decoder
+        self.clips = OrderedDict()  # {path: Clip}, least recently used first
+        self.failed = set()
+        self._loading = set()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """The decoded clip, or None if it is not (yet) in the cache."""
+        with self._lock:
+            clip = self.clips.get(path)
+            if clip is not None:
+                self.clips.move_to_end(path)
+            return clip
+
+    def status(self, path):
+        """'ready', 'loading', 'failed' or 'missing'."""
+        with self._lock:
+            if path in self.clips: return "ready"
+            if path in self._loading: return "loading"
+            return "failed" if path in self.failed else "missing"
+
+    def load(self, path):
+        """Decodes `path` on the calling thread (no-op if cached or already loading)."""
+        with self._lock:
+            if path in self.clips or path in self._loading:
+                return
+            self._loading.add(path)
+        try:
+            clip = self.decoder(path)
+        except Exception as e:
+            print(f"Video decode error ({path}): {e}")
+            clip = None
+        with self._lock:
+            self._loading.discard(path)
+            if clip is None:
+                self.failed.add(path)
+                return
+            self.clips[path] = clip
+            used = sum(c.nbytes for c in self.clips.values())
+            while used > self.budget and len(self.clips) > 1:
+                _, evicted = self.clips.popitem(last=False)
+                used -= evicted.nbytes
+
+    def load_async(self, *paths):
+        """Decodes `paths` one after another on a daemon thread."""
+        def run():
+            for path in paths:
+                self.load(path)
+        threading.Thread(target=run, daemon=True, name="media-cache").start()
@@ -0,0 +1,204 @@
+"""Server metrics: counters, latency histograms and an optional stack sampler.
+
+Everything is plain attribute and dict updates so recording stays in the
+low microseconds. Reading happens off the hot path: render() produces the
+Prometheus text format, served by serve_metrics() or dumped on SIGUSR1.
+Under the threaded server a rare increment can be lost to a race; the
+numbers are for monitoring, not accounting.
+"""
+import collections
+import http.server
+import signal
+import sys
+import threading
+import time
+
+def label(value):
+    """Escapes a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Histogram:
+    """Latency histogram with power-of-two microsecond buckets."""
+    BUCKETS = 25  # 1 us .. ~16.8 s, plus overflow in the last bucket
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.counts = [0] * self.BUCKETS
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        micros = int(seconds * 1e6)
+        self.counts[min(micros.bit_length(), self.BUCKETS - 1)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound (seconds) of the bucket holding the q-th quantile."""
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return (1 << i) / 1e6
+        return (1 << (self.BUCKETS - 1)) / 1e6
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for i, n in enumerate(self.counts[:-1]):
+            cumulative += n
+            lines.append(f'{self.name}_bucket{{le="{(1 << i) / 1e6:g}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {self.total:.6f}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+class Metrics:
+    MAX_PENDING_INVITES = 10000
+
+    def __init__(self):
+        self.started = time.time()
+        self.connections_total = 0
+        self.connections_active = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.messages_in = collections.Counter()  # {message type: count}
+        self.moves_rejected = 0
+        self.connections_reaped = 0  # closed by heartbeat.Heartbeats: the peer stopped answering
+        self.messages_limited = 0    # dropped by ratelimit.RateLimiter
+        self.connections_flooded = 0 # closed for sending too many messages
+        self.connections_slow = 0    # closed for not reading what they were sent
+        self.invite_to_start = Histogram(
+            "tictactoe_invite_to_game_start_seconds", "Time from INVITE to GAME_START.")
+        self.move_forward = Histogram(
+            "tictactoe_move_forward_seconds", "Time from reading a MOVE to sending OPPONENT_MOVE.")
+        self._invites = collections.OrderedDict()  # {(challenger, target): perf_counter}
+        self.active_games = lambda: 0  # set by the server
+        self.sampler = None
+
+    def connection_opened(self):
+        self.connections_total += 1
+        self.connections_active += 1
+
+    def connection_closed(self):
+        self.connections_active -= 1
+
+    def invite_sent(self, challenger, target):
+        self._invites[(challenger, target)] = time.perf_counter()
+        if len(self._invites) > self.MAX_PENDING_INVITES:
+            self._invites.popitem(last=False)
+
+    def invite_accepted(self, challenger, accepter):
+        sent = self._invites.pop((challenger, accepter), None)
+        if sent is not None:
+            self.invite_to_start.observe(time.perf_counter() - sent)
+
+    def counted(self, send):
+        """Wraps a socket write function so its bytes land in bytes_out."""
+        def send_counted(data):
+            self.bytes_out += len(data)
+            return send(data)
+        return send_counted
+
+    def render(self):
+        lines = [
+            "# TYPE tictactoe_uptime_seconds gauge",
+            f"tictactoe_uptime_seconds {time.time() - self.started:.0f}",
+            "# TYPE tictactoe_connections_total counter",
+            f"tictactoe_connections_total {self.connections_total}",
+            "# TYPE tictactoe_connections_active gauge",
+            f"tictactoe_connections_active {self.connections_active}",
+            "# TYPE tictactoe_connections_reaped_total counter",
+            f"tictactoe_connections_reaped_total {self.connections_reaped}",
+            "# TYPE tictactoe_games_active gauge",
+            f"tictactoe_games_active {self.active_games()}",
+            "# TYPE tictactoe_bytes_in_total counter",
+            f"tictactoe_bytes_in_total {self.bytes_in}",
+            "# TYPE tictactoe_bytes_out_total counter",
+            f"tictactoe_bytes_out_total {self.bytes_out}",
+            "# TYPE tictactoe_moves_rejected_total counter",
+            f"tictactoe_moves_rejected_total {self.moves_rejected}",
+            "# TYPE tictactoe_messages_limited_total counter",
+            f"tictactoe_messages_limited_total {self.messages_limited}",
+            "# TYPE tictactoe_connections_flooded_total counter",
+            f"tictactoe_connections_flooded_total {self.connections_flooded}",
+            "# TYPE tictactoe_connections_slow_total counter",
+            f"tictactoe_connections_slow_total {self.connections_slow}",
+            "# TYPE tictactoe_messages_in_total counter",
+        ]
+        for kind, n in sorted(self.messages_in.items()):
+            lines.append(f'tictactoe_messages_in_total{{type="{label(kind)}"}} {n}')
+        lines += self.invite_to_start.render()
+        lines += self.move_forward.render()
+        return "\n".join(lines) + "\n"
+
+class StackSampler:
+    """Samples every thread's current frame on a timer (a poor man's profiler).
+
+    Off by default; enable with the server's --profile-interval.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = collections.Counter()  # {"file:line function": hits}
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True, name="stack-sampler").start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    code = frame.f_code
+                    self.samples[f"{code.co_filename}:{frame.f_lineno} {code.co_name}"] += 1
+
+    def render(self, top=40):
+        total = sum(self.samples.values()) or 1
+        return "".join(f"{n:8d} {100 * n / total:5.1f}%  {where}\n"
+                       for where, n in self.samples.most_common(top))
+
+def serve_metrics(metrics, host="127.0.0.1", port=9100):
+    """Serves /metrics (and /profile when sampling) from a daemon thread."""
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = metrics.render()
+            elif self.path == "/profile" and metrics.sampler is not None:
+                body = metrics.sampler.render()
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True, name="metrics-http").start()
+    return httpd
+
+def dump_on_signal(metrics, signum=getattr(signal, "SIGUSR1", None), stream=sys.stderr):
+    """Writes render() to `stream` whenever `signum` arrives (Unix only)."""
+    if signum is None:
+        return
+
+    def dump(*_):
+        stream.write(metrics.render())
+        if metrics.sampler is not None:
+            stream.write(metrics.sampler.render())
+        stream.flush()
+
+    signal.signal(signum, dump)
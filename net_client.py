@@ -0,0 +1,359 @@
+"""Protocol client for server.py, usable without Tk (bots, tests, scripts).
+
+parse_server_message() turns a server message into an (event, payload)
+pair. GameClient runs a receiver thread and calls on_event(event, payload)
+from it; the GUI hops back onto the Tk thread itself. AsyncGameClient is
+the same client for asyncio code. Both take binary=True to use the
+compact binproto encoding (the server must support it); events are the
+same either way.
+
+    event            payload
+    list             [name, ...]             full roster, sent at login
+    join / leave     [name, ...]             roster deltas
+    invite           challenger name
+    game_start       ('X' or 'O', opponent)
+    opponent_move    board index
+    game_over        ('X', 'O' or 'Draw', [winning indices])  decided by the server
+    move_rejected    cells, like "X---O----": the board as the server has it
+    opponent_left    None
+    opponent_away    seconds its seat is held; opponent_back (None) if it returns
+    session          token for resume(); the client keeps it
+    resumed          ([board index, ...], seq): the current game's moves, in play order
+                     None: no longer in a game
+    resume_failed    None (log in again with connect())
+    queued / rating  rating (int)
+    roster           (total, offset, [name, ...])
+    watching         (x name, o name, cells)  spectator snapshot, cells like "X---O----"
+    watch_move       ('X' or 'O', board index)
+    watch_end        X, O, Draw, left or dropped
+    watch_error      the player who is not in a game
+    error            error text
+    unknown          the raw message
+    disconnected     None (connection closed; GameClient only); resume() may get it back
+
+The server PINGs a connection that has been quiet for a while and closes
+it if nothing comes back; both clients answer PONG themselves, so "ping"
+never reaches on_event() or events().
+"""
+import asyncio
+import collections
+import socket
+import threading
+
+import binproto
+from binproto import NameTable, read_id, read_ids, read_int, read_names
+from codec import DELIMITER, Decoder, encode
+
+DEFAULT_PORT = 5555
+
+def parse_server_message(msg):
+    kind, sep, rest = msg.partition(",")
+    if sep:
+        names = [n for n in rest.split(",") if n]
+        if kind == "LIST":
+            return "list", names
+        if kind == "JOIN":
+            return "join", names
+        if kind == "LEAVE":
+            return "leave", names
+        if kind == "ROSTER":
+            total, offset, *page = rest.split(",")
+            return "roster", (int(total), int(offset), [n for n in page if n])
+    if msg == "LIST":
+        return "list", []
+    if msg == "OPPONENT_LEFT":
+        return "opponent_left", None
+    if msg == "OPPONENT_BACK":
+        return "opponent_back", None
+    if msg == "RESUMED":
+        return "resumed", None
+    if msg == "RESUME_FAILED":
+        return "resume_failed", None
+    if msg == "PING":
+        return "ping", None
+    kind, _, rest = msg.partition(":")
+    if kind == "INVITE_FROM":
+        return "invite", rest
+    if kind == "GAME_START":
+        role, _, opponent = rest.partition(":")
+        return "game_start", ('X' if role == "YOU_X" else 'O', opponent)
+    if kind == "OPPONENT_MOVE":
+        return "opponent_move", int(rest.partition(":")[0])
+    if kind == "GAME_OVER":
+        result, _, line = rest.partition(":")
+        return "game_over", (result, [int(i) for i in line.split(",") if i])
+    if kind == "MOVE_REJECTED":
+        return "move_rejected", rest
+    if kind == "QUEUED":
+        return "queued", int(rest)
+    if kind == "RATING":
+        return "rating", int(rest)
+    if kind == "ERROR":
+        return "error", rest
+    if kind == "OPPONENT_AWAY":
+        return "opponent_away", float(rest)
+    if kind == "SESSION":
+        return "session", rest
+    if kind == "RESUMED":
+        seq, _, moves = rest.split(":")
+        return "resumed", ([int(c) for c in moves], int(seq))
+    if kind == "WATCHING":
+        x_player, o_player, cells = rest.split(":")
+        return "watching", (x_player, o_player, cells)
+    if kind == "WATCH_MOVE":
+        symbol, _, index = rest.partition(":")
+        return "watch_move", (symbol, int(index))
+    if kind == "WATCH_END":
+        return "watch_end", rest
+    if kind == "WATCH_ERROR":
+        return "watch_error", rest
+    return "unknown", msg
+
+def _leave(f, names):
+    by_id = names.names
+    left = [by_id[i] for i in read_ids(f, 1) if i in by_id]
+    for name in left:
+        names.forget(name)
+    return "leave", left
+
+# Handlers take the whole frame: f[0] is the opcode, the payload starts at f[1].
+_BINARY_EVENTS = {
+    binproto.OPPONENT_MOVE: lambda f, names: ("opponent_move", f[1]),
+    binproto.GAME_OVER: lambda f, names: ("game_over", (binproto.RESULTS[f[1]], list(f[2:]))),
+    binproto.MOVE_REJECTED: lambda f, names: ("move_rejected", f[1:].decode("ascii")),
+    binproto.LIST: lambda f, names: ("list", read_names(f, names, 1)),
+    binproto.JOIN: lambda f, names: ("join", read_names(f, names, 1)),
+    binproto.LEAVE: _leave,
+    binproto.INVITE_FROM: lambda f, names: ("invite", names.names.get(read_id(f, 1), "")),
+    binproto.GAME_START: lambda f, names: ("game_start", (binproto.SYMBOLS[f[1]],
+                                                          names.names.get(read_id(f, 2), ""))),
+    binproto.OPPONENT_LEFT: lambda f, names: ("opponent_left", None),
+    binproto.QUEUED: lambda f, names: ("queued", read_int(f, 1)),
+    binproto.RATING: lambda f, names: ("rating", read_int(f, 1)),
+    binproto.ERROR: lambda f, names: ("error", f[1:].decode("utf-8", "replace")),
+    binproto.ROSTER: lambda f, names: ("roster", (read_id(f, 1), read_id(f, 5),
+                                                  read_names(f, names, 9))),
+    binproto.WATCHING: lambda f, names: ("watching", (names.names.get(read_id(f, 1), ""),
+                                                      names.names.get(read_id(f, 5), ""),
+                                                      f[9:].decode("ascii"))),
+    binproto.WATCH_MOVE: lambda f, names: ("watch_move", (binproto.SYMBOLS[f[1]], f[2])),
+    binproto.TEXT: lambda f, names: parse_server_message(f[1:].decode("utf-8", "replace")),
+}
+
+def parse_binary_message(frame, names):
+    """parse_server_message() for a binproto frame; `names` learns player ids as they arrive."""
+    handler = _BINARY_EVENTS.get(frame[0])
+    if handler is None:
+        return "unknown", frame
+    return handler(frame, names)
+
+_TRACKED = {"session", "game_start", "resumed"}
+
+class _Session:
+    """Wire format of one connection: text, or binproto once the server acknowledges it.
+
+    Also remembers what resume() needs: the session token and the last move number seen.
+    """
+
+    def __init__(self, binary):
+        self.binary = binary
+        self.names = NameTable()
+        self.decoder = Decoder() if not binary else None  # binary: set by the server's first line
+        self._login = b""
+        self.token = ""
+        self.seq = 0
+
+    def login(self, username):
+        return encode(binproto.LOGIN_PREFIX + username if self.binary else username)
+
+    def resume(self):
+        """The first line of a new connection that takes the session back."""
+        self.decoder = Decoder() if not self.binary else None
+        self._login = b""
+        return self.login(f"RESUME:{self.token}:{self.seq}")
+
+    def _track(self, event, payload):
+        if event == "session":
+            self.token = payload
+        elif event == "game_start":
+            self.seq = 0
+        elif event == "resumed" and payload is not None:
+            self.seq = payload[1]
+
+    def encode(self, msg):
+        return binproto.to_binary(msg, self.names) if self.binary else encode(msg)
+
+    def feed(self, data):
+        """Returns the (event, payload) pairs completed by `data`."""
+        events = []
+        if self.decoder is None:
+            self._login += data
+            if DELIMITER not in self._login:
+                return events
+            line, _, data = self._login.partition(DELIMITER)
+            self._login = b""
+            line = line.decode("utf-8", "replace")
+            if line == binproto.ACK:
+                self.decoder = binproto.Decoder()
+            else:  # a server without binproto answered in text
+                self.binary = False
+                self.decoder = Decoder()
+                events.append(parse_server_message(line))
+        if self.binary:
+            names = self.names
+            for f in self.decoder.feed(data):
+                event = parse_binary_message(f, names)
+                if f[0] == binproto.OPPONENT_MOVE:
+                    self.seq = read_id(f, 2)
+                elif event[0] in _TRACKED:
+                    self._track(*event)
+                events.append(event)
+        else:
+            for msg in self.decoder.feed(data):
+                event = parse_server_message(msg)
+                if event[0] == "opponent_move":
+                    self.seq = int(msg.rpartition(":")[2])
+                elif event[0] in _TRACKED:
+                    self._track(*event)
+                events.append(event)
+        return events
+
+class _Commands:
+    """Client -> server messages; subclasses provide send(msg)."""
+
+    def invite(self, target):
+        self.send(f"INVITE:{target}")
+
+    def accept(self, challenger):
+        self.send(f"ACCEPT:{challenger}")
+
+    def move(self, index):
+        self.send(f"MOVE:{index}")
+
+    def queue(self):
+        self.send("QUEUE")
+
+    def cancel_queue(self):
+        self.send("QUEUE_CANCEL")
+
+    def watch(self, player):
+        self.send(f"WATCH:{player}")
+
+    def unwatch(self):
+        self.send("UNWATCH")
+
+    def roster(self, offset, limit, prefix=""):
+        self.send(f"ROSTER:{offset}:{limit}" + (f":{prefix}" if prefix else ""))
+
+class GameClient(_Commands):
+    def __init__(self, on_event, binary=False):
+        self.on_event = on_event
+        self.sock = None
+        self.address = None
+        self.username = None
+        self.session = _Session(binary)
+        self._send_lock = threading.Lock()
+
+    def connect(self, host, username, port=DEFAULT_PORT):
+        self.sock = socket.create_connection((host, port))
+        self.address = (host, port)
+        self.username = username
+        # Start the receiver first to avoid missing any immediate broadcasts
+        threading.Thread(target=self._receive, daemon=True, name="net-client").start()
+        self._sendall(self.session.login(username))
+
+    def resume(self):
+        """Connects again after "disconnected" and takes the session back (see sessions.py)."""
+        self.sock = socket.create_connection(self.address, timeout=5)
+        self.sock.settimeout(None)
+        threading.Thread(target=self._receive, daemon=True, name="net-client").start()
+        self._sendall(self.session.resume())
+
+    def send(self, msg):
+        """Sends one message; returns False if the connection is gone."""
+        return self._sendall(self.session.encode(msg))
+
+    def _sendall(self, data):
+        if self.sock is None:
+            return False
+        try:
+            with self._send_lock:
+                self.sock.sendall(data)
+            return True
+        except OSError:
+            return False
+
+    def _receive(self):
+        try:
+            while True:
+                data = self.sock.recv(4096)
+                if not data: break
+                for event, payload in self.session.feed(data):
+                    if event == "ping":
+                        self.send("PONG")
+                    else:
+                        self.on_event(event, payload)
+        except (OSError, ValueError):
+            pass
+        self.on_event("disconnected", None)
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                # close() alone leaves the receiver blocked in recv() and sends no FIN.
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+
+class AsyncGameClient(_Commands):
+    """asyncio flavour: `async for event, payload in client.events()`."""
+
+    def __init__(self, binary=False):
+        self.reader = self.writer = None
+        self.address = None
+        self.username = None
+        self.session = _Session(binary)
+        self.inbox = collections.deque()  # (event, payload) decoded but not yet consumed
+
+    async def connect(self, host, username, port=DEFAULT_PORT):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.address = (host, port)
+        self.username = username
+        self.writer.write(self.session.login(username))
+
+    async def resume(self):
+        """Connects again after the connection dropped and takes the session back."""
+        self.reader, self.writer = await asyncio.open_connection(*self.address)
+        self.inbox.clear()
+        self.writer.write(self.session.resume())
+
+    def send(self, msg):
+        self.writer.write(self.session.encode(msg))
+
+    async def events(self):
+        """Yields (event, payload) until the server closes the connection."""
+        while True:
+            while self.inbox:
+                yield self.inbox.popleft()
+            data = await self.reader.read(65536)
+            if not data:
+                return
+            for event, payload in self.session.feed(data):
+                if event == "ping":
+                    self.send("PONG")
+                else:
+                    self.inbox.append((event, payload))
+
+    async def expect(self, *events, timeout=None):
+        """Returns the payload of the next event in `events`, skipping others."""
+        async def wait():
+            async for event, payload in self.events():
+                if event in events:
+                    return payload
+            raise ConnectionError("server closed connection")
+        return await asyncio.wait_for(wait(), timeout)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
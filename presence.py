@@ -0,0 +1,78 @@
+"""Lobby presence: coalesced JOIN/LEAVE deltas instead of full roster broadcasts.
+
+A client gets the whole roster once, at login (LIST,<name>,...). After that
+the server collects joins and leaves for PRESENCE_WINDOW seconds and sends
+each client the window's JOIN,<name>,... and LEAVE,<name>,... messages, in
+the order the changes happened. A join and a leave inside one window are
+both sent: a client that logged in between them has the player in its LIST.
+
+Names are at most MAX_NAME_BYTES of utf-8 without ':', ',' or control
+characters (valid_name), and every roster message stays under CHUNK_BYTES,
+well below codec.MAX_FRAME.
+"""
+import threading
+
+PRESENCE_WINDOW = 0.1  # seconds of roster changes folded into one update
+MAX_NAME_BYTES = 64    # utf-8; binproto sends name lengths in one byte
+CHUNK_BYTES = 16 * 1024  # longest JOIN/LEAVE/LIST/ROSTER message, in utf-8 bytes
+
+class PresenceBatcher:
+    def __init__(self):
+        self._events = []  # (True if joined / False if left, username), in order
+        self._lock = threading.Lock()
+
+    def joined(self, username):
+        with self._lock:
+            self._events.append((True, username))
+
+    def left(self, username):
+        with self._lock:
+            self._events.append((False, username))
+
+    def drain(self):
+        """Returns the messages for everything since the last drain, in order."""
+        with self._lock:
+            events, self._events = self._events, []
+        updates = []
+        run = []
+        for i, (joined, username) in enumerate(events):
+            run.append(username)
+            if i + 1 == len(events) or events[i + 1][0] != joined:
+                updates += chunked("JOIN" if joined else "LEAVE", run)
+                run = []
+        return updates
+
+def valid_name(name):
+    """True if `name` can go in the roster: the separators would split it, the length byte cut it."""
+    return (0 < len(name.encode("utf-8")) <= MAX_NAME_BYTES
+            and not any(c in ":," or c < " " or c == "\x7f" for c in name))
+
+def fitting(names, budget, start=0):
+    """End index of the names from `start` that fit in `budget` utf-8 bytes as ,<name>,... (at least one)."""
+    used = 0
+    for i in range(start, len(names)):
+        used += len(names[i].encode("utf-8")) + 1
+        if used > budget and i > start:
+            return i
+    return len(names)
+
+def chunked(kind, names):
+    messages = []
+    start = 0
+    while start < len(names):
+        end = fitting(names, CHUNK_BYTES - len(kind), start)
+        messages.append(f"{kind}," + ",".join(names[start:end]))
+        start = end
+    return messages
+
+def roster_page(players, offset, limit, prefix=""):
+    """Reply to ROSTER:<offset>:<limit>[:<prefix>]: ROSTER,<total>,<offset>,<name>,...
+
+    The page may hold fewer than `limit` names to stay under CHUNK_BYTES;
+    the client asks again from offset + the names it got.
+    """
+    if prefix:
+        players = [p for p in players if p.startswith(prefix)]
+    page = players[offset:offset + limit]
+    page = page[:fitting(page, CHUNK_BYTES - 32)]  # 32: "ROSTER,<total>,<offset>"
+    return f"ROSTER,{len(players)},{offset}," + ",".join(page)
@@ -0,0 +1,127 @@
+"""Flood protection: token buckets per connection and per message type, and invite de-duplication.
+
+Every connection gets a RateLimiter. Each message first takes a token from
+the connection's overall bucket ("*"), then from its type's bucket if the
+type has one in LIMITS. A message without a token is dropped unanswered
+(the sender is muted until its buckets refill). Dropped messages take from
+a third bucket, FLOOD; once that is empty too the sender is not a player
+clicking fast but a flood, and the server closes the connection.
+Buckets refill on use from the time elapsed, so there are no timers, and a
+normal message costs two dict lookups and a little arithmetic.
+
+InviteFilter forwards an INVITE only once per (sender, target) pair until
+the target answers or INVITE_TTL passes, so repeating an invite (or
+spamming one) reaches the target once. It is also what ACCEPT is checked
+against: only a pending, unexpired invite starts a game.
+"""
+import threading
+
+# {message type: (tokens per second, burst)}; "*" is every message of the connection.
+LIMITS = {
+    "*": (50.0, 200),
+    "INVITE": (2.0, 10),
+    "ACCEPT": (2.0, 10),
+    "QUEUE": (2.0, 10),
+    "QUEUE_CANCEL": (2.0, 10),
+    "MOVE": (10.0, 20),
+    "WATCH": (2.0, 10),
+    "UNWATCH": (2.0, 10),
+    "ROSTER": (10.0, 50),
+    "HISTORY": (2.0, 10),
+    "REPLAY": (1.0, 5),
+}
+FLOOD = (10.0, 100)  # dropped messages a connection may send before it is closed
+INVITE_TTL = 30.0    # seconds an unanswered invite blocks repeats to the same target
+
+class RateLimiter:
+    __slots__ = ("limits", "rate", "burst", "tokens", "stamp", "buckets", "dropped")
+
+    def __init__(self, limits=LIMITS):
+        self.limits = limits
+        self.rate, self.burst = limits["*"]
+        self.tokens = self.burst  # the "*" bucket, kept in slots: every message takes from it
+        self.stamp = None         # monotonic time of its last refill
+        self.buckets = {}         # {type: [tokens, monotonic time of the last refill]}
+        self.dropped = 0
+
+    def _take(self, kind, limit, now):
+        bucket = self.buckets.get(kind)
+        if bucket is None:
+            bucket = self.buckets[kind] = [limit[1], now]
+        else:
+            rate, burst = limit
+            tokens = bucket[0] + (now - bucket[1]) * rate
+            bucket[0] = tokens if tokens < burst else burst
+            bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def allow(self, kind, now):
+        """True if a `kind` message may be handled now; False: drop it."""
+        tokens = self.tokens
+        if self.stamp is not None:
+            tokens += (now - self.stamp) * self.rate
+            if tokens > self.burst:
+                tokens = self.burst
+        self.stamp = now
+        if tokens >= 1:
+            self.tokens = tokens - 1
+            limit = self.limits.get(kind)
+            if limit is None or self._take(kind, limit, now):
+                return True
+        else:
+            self.tokens = tokens
+        self.dropped += 1
+        return False
+
+    def flooding(self, now):
+        """Takes a flood token for a dropped message; True once there are none left."""
+        return not self._take("flood", FLOOD, now)
+
+class InviteFilter:
+    def __init__(self, ttl=INVITE_TTL):
+        self.ttl = ttl
+        self.pending = {}  # {(sender, target): monotonic expiry}, soonest first
+        self.repeats = 0   # invites not delivered because one was pending
+        self._lock = threading.Lock()  # players' threads share this in threaded mode
+
+    def first(self, sender, target, now):
+        """True if this invite should be delivered: no unanswered one for the pair."""
+        key = (sender, target)
+        with self._lock:
+            expiry = self.pending.get(key)
+            if expiry is not None and expiry > now:
+                self.repeats += 1
+                return False
+            self.pending.pop(key, None)  # re-insert so the dict stays in expiry order
+            self.pending[key] = now + self.ttl
+            return True
+
+    def delivered(self, sender, target, now):
+        """Records an invite filtered elsewhere (on the sender's cluster worker) and delivered here."""
+        with self._lock:
+            self.pending.pop((sender, target), None)
+            self.pending[(sender, target)] = now + self.ttl
+
+    def take(self, sender, target, now):
+        """True if `target` may accept: `sender`'s invite is pending and unexpired. Settles it."""
+        with self._lock:
+            expiry = self.pending.pop((sender, target), None)
+            return expiry is not None and expiry > now
+
+    def answered(self, sender, target):
+        """The invite is settled (or was never delivered): the next one goes through."""
+        with self._lock:
+            self.pending.pop((sender, target), None)
+
+    def expire(self, now):
+        """Forgets invites older than the TTL; costs the number forgotten."""
+        with self._lock:
+            pending = self.pending
+            while pending:
+                key = next(iter(pending))
+                if pending[key] > now:
+                    break
+                del pending[key]
@@ -1,22 +1,28 @@
+import argparse
+import threading
 import tkinter as tk
 from tkinter import simpledialog, messagebox
-import socket
-import threading
 
+from dispatch import EventQueue
 from game_engine import GameEngine
+from net_client import GameClient
 from ui_layout import GameUI
 
+RESUME_ATTEMPTS = 10  # one a second, within the server's grace period
+DEBUG = False        # print every server event; --debug turns it on
+
 class MainController:
     def __init__(self, root):
         self.root = root
         self.engine = GameEngine()
-        self.ui = GameUI(root, self.handle_click, self.send_invite, self.connect_mode)
+        self.ui = GameUI(root, self.handle_click, self.send_invite, self.connect_mode,
+                         on_queue_callback=self.join_queue)
         
-        self.client_socket = None
+        self.client = None
+        self.events = EventQueue()  # server events waiting for the Tk thread
         self.mode = "LOCAL" 
         self.username = ""
         self.my_symbol = 'X'
-        self.running = True
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
@@ -27,6 +33,13 @@ class MainController:
             self.ui.reset_board_visuals()
             self.ui.show_game()
             self.ui.status_label.config(text="Local Game: X's Turn")
+        elif mode == "COMPUTER":
+            self.mode = "COMPUTER"
+            self.my_symbol = 'X'
+            self.engine.reset()
+            self.ui.reset_board_visuals()
+            self.ui.show_game()
+            self.ui.status_label.config(text="Vs Computer: Your Turn")
         else:
             self.setup_network()
 
@@ -40,13 +53,9 @@ class MainController:
         def on_ip_entered(ip):
             if not ip: ip = "localhost"
             try:
-                self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.client_socket.connect((ip, 5555))
-                # Start the receiver first to avoid missing any immediate broadcasts
-                threading.Thread(target=self.receive_messages, daemon=True).start()
-                # Use sendall to ensure full data is sent
-                self.client_socket.sendall(self.username.encode('utf-8'))
-                
+                self.client = GameClient(self.on_server_event)
+                self.client.connect(ip, self.username)
+
                 self.ui.show_lobby()
                 self.ui.status_label.config(text=f"Connected as {self.username}")
             except Exception as e:
@@ -55,103 +64,228 @@ class MainController:
         self.ui.create_popup("Login", "Choose a Username:", mode="INPUT", callback=on_user_entered)
 
     def send_invite(self, target_name):
-        if self.client_socket:
-            try:
-                self.client_socket.sendall(f"INVITE:{target_name}".encode('utf-8'))
-            except Exception:
-                pass
+        if self.client:
+            self.client.invite(target_name)
+
+    def join_queue(self):
+        if self.client:
+            self.client.queue()
 
     def handle_click(self, index, is_remote=False):
             # 1. Validation
-            if self.mode == "ONLINE" and not is_remote and self.engine.turn != self.my_symbol:
+            if self.mode in ("ONLINE", "COMPUTER") and not is_remote and self.engine.turn != self.my_symbol:
                 return 
             
             # 2. Make Move
             if self.engine.make_move(index, self.engine.turn):
                 self.ui.update_board(index, self.engine.turn)
                 
-                if self.mode == "ONLINE" and not is_remote:
-                    try:
-                        self.client_socket.sendall(f"MOVE:{index}".encode('utf-8'))
-                    except Exception:
-                        pass
+                if self.mode == "ONLINE":
+                    # The server keeps the real board and sends GAME_OVER (see game_over).
+                    if not is_remote:
+                        self.client.move(index)
+                    self.engine.switch_turn()
+                    return
 
                 # 3. Check Win
                 winner, indices = self.engine.check_winner()
                 
                 if winner:
-                    # --- GAME OVER ---
-                    video_to_play = None
-                    message_text = ""
-                    
-                    if winner == "Draw":
-                        message_text = "It's a Draw!"
-                        video_to_play = "draw"  # Will play 'draw.mp4' + 'draw.wav'
-                    else:
-                        self.ui.highlight_win(indices)
-                        message_text = f"The winner is {winner}!"
-                        
-                        # Play 'win' only if the winner matches this client's symbol.
-                        # Otherwise play 'lose' (for online games where opponent won).
-                        if winner == self.my_symbol:
-                            video_to_play = "win" # Will play 'win.mp4' + 'win.wav'
-                        else:
-                            video_to_play = "lose" # Will play 'lose.mp4' + 'lose.wav'
-
-                    # Just ask for the popup. The UI handles the video/sound sync.
-                    self.ui.create_popup(
-                        title="Game Over", 
-                        message=message_text, 
-                        mode="INFO", 
-                        video_file=video_to_play,
-                        callback=lambda: [self.engine.reset(), self.ui.reset_board_visuals()]
-                    )
+                    self.show_result(winner, indices,
+                                     lambda: [self.engine.reset(), self.ui.reset_board_visuals()])
                 
                 else:
                     self.engine.switch_turn()
                     if self.mode == "LOCAL":
                         self.ui.status_label.config(text=f"Local Game: {self.engine.turn}'s Turn")
+                    elif self.mode == "COMPUTER" and self.engine.turn != self.my_symbol:
+                        self.ui.status_label.config(text="Vs Computer: Thinking...")
+                        self.root.after(400, self.computer_move)
+                    elif self.mode == "COMPUTER":
+                        self.ui.status_label.config(text="Vs Computer: Your Turn")
+
+    def show_result(self, winner, indices, on_close):
+        video_to_play = None
+        message_text = ""
+        
+        if winner == "Draw":
+            message_text = "It's a Draw!"
+            video_to_play = "draw"  # Will play 'draw.mp4' + 'draw.wav'
+        else:
+            self.ui.highlight_win(indices)
+            message_text = f"The winner is {winner}!"
+            
+            # Play 'win' only if the winner matches this client's symbol.
+            # Otherwise play 'lose' (for online games where opponent won).
+            if winner == self.my_symbol:
+                video_to_play = "win" # Will play 'win.mp4' + 'win.wav'
+            else:
+                video_to_play = "lose" # Will play 'lose.mp4' + 'lose.wav'
+
+        # Just ask for the popup. The UI handles the video/sound sync.
+        self.ui.create_popup(
+            title="Game Over", 
+            message=message_text, 
+            mode="INFO", 
+            video_file=video_to_play,
+            callback=on_close
+        )
+
+    def game_over(self, winner, indices):
+        # The server has already started the next game; moves in it may arrive
+        # while the popup is up, so they go on the fresh engine and are drawn on close.
+        self.engine.reset()
+        self.show_result(winner, indices, self.redraw_board)
+
+    def sync_board(self, cells):
+        """Takes the server's board after MOVE_REJECTED."""
+        self.engine.reset()
+        for i, symbol in enumerate(cells):
+            if symbol != '-':
+                self.engine.make_move(i, symbol)
+        if cells.count('X') > cells.count('O'):
+            self.engine.switch_turn()
+        self.redraw_board()
+
+    def redraw_board(self):
+        self.ui.reset_board_visuals()
+        for i, symbol in enumerate(self.engine.board):
+            if symbol:
+                self.ui.update_board(i, symbol)
+
+    def computer_move(self):
+        # The game may have ended or the mode changed while we were waiting.
+        if self.mode != "COMPUTER" or self.engine.turn == self.my_symbol:
+            return
+        from ai_player import best_move  # builds its table on first use; keep startup fast
+        index = best_move(self.engine, self.engine.turn)
+        if index is not None:
+            self.handle_click(index, is_remote=True)
+
+    def on_server_event(self, event, payload):
+        # Runs on the network thread: queue it; the first event of a batch
+        # schedules one drain on the Tk thread.
+        if DEBUG:
+            print(f"Client DEBUG: event received: {event} {payload!r}")
+        if event in ("disconnected", "resume_error") and self.client is None:
+            return  # on_close(): the window may already be gone
+        if event in ("list", "join"):
+            payload = [p for p in payload if p != self.username]
+        if self.events.put(event, payload):
+            self.root.after(0, self.drain_events)
+
+    def drain_events(self):
+        for event, payload in self.events.drain():
+            self.handle_event(event, payload)
+
+    def handle_event(self, event, payload):
+        if event == "list":
+            self.ui.update_list(payload)
+
+        elif event == "join":
+            self.ui.add_players(payload)
+
+        elif event == "leave":
+            self.ui.remove_players(payload)
+
+        elif event == "invite":
+            self.ask_accept(payload)
 
-    def receive_messages(self):
-        while self.running:
+        elif event == "game_start":
+            self.my_symbol, opponent = payload
+            self.mode = "ONLINE"
+            self.engine.reset()
+            self.start_online_game(opponent)
+
+        elif event == "opponent_move":
+            self.handle_click(payload, is_remote=True)
+
+        elif event == "game_over":
+            self.game_over(*payload)
+
+        elif event == "move_rejected":
+            self.sync_board(payload)
+
+        elif event == "queued":
+            self.ui.status_label.config(text=f"Searching for an opponent... (rating {payload})")
+
+        elif event == "rating":
+            self.ui.status_label.config(text=f"{self.username} | Rating {payload}")
+
+        elif event == "error":
+            self.ui.create_popup("Error", payload, mode="INFO")
+
+        elif event == "opponent_left":
+            messagebox.showinfo("Info", "Opponent disconnected.")
+            self.ui.show_lobby()
+
+        elif event == "opponent_away":
+            self.ui.status_label.config(
+                text=f"Opponent lost connection, waiting up to {payload:g}s...")
+
+        elif event == "opponent_back":
+            self.ui.status_label.config(text="Opponent is back")
+
+        elif event == "disconnected":
+            if self.client is not None:  # not on_close()
+                self.reconnect()
+
+        elif event == "resumed":
+            self.resume_game(payload)
+
+        elif event == "resume_failed":
+            self.connection_lost()
+
+        elif event == "resume_error":  # attempt `payload` could not connect
+            if payload < RESUME_ATTEMPTS:
+                self.root.after(1000, lambda: self.reconnect(payload + 1))
+            else:
+                self.connection_lost()
+
+    def reconnect(self, attempt=1):
+        client = self.client
+        if client is None:  # gave up, or the window is closing
+            return
+        self.ui.status_label.config(text="Connection lost, reconnecting...")
+
+        def resume():
+            # Off the Tk thread: connecting can block for resume()'s whole timeout.
             try:
-                msg = self.client_socket.recv(1024).decode('utf-8')
-                print(f"Client DEBUG: raw message received: {repr(msg)}")
-                if not msg: break
-                
-                # [CHANGE] Using root.after() for thread safety
-                if msg.startswith("LIST"):
-                    players = msg.split(",")[1:]
-                    players = [p for p in players if p != self.username]
-                    self.root.after(0, lambda: self.ui.update_list(players))
-                
-                elif msg.startswith("INVITE_FROM"):
-                    sender = msg.split(":")[1]
-                    self.root.after(0, lambda s=sender: self.ask_accept(s))
-
-                elif msg.startswith("GAME_START"):
-                    parts = msg.split(":")
-                    self.my_symbol = 'X' if parts[1] == 'YOU_X' else 'O'
-                    self.mode = "ONLINE"
-                    self.engine.reset()
-                    self.root.after(0, lambda: self.start_online_game(parts[2]))
-
-                elif msg.startswith("OPPONENT_MOVE"):
-                    idx = int(msg.split(":")[1])
-                    self.root.after(0, lambda: self.handle_click(idx, is_remote=True))
-                
-                elif msg == "OPPONENT_LEFT":
-                    self.root.after(0, lambda: messagebox.showinfo("Info", "Opponent disconnected."))
-                    self.root.after(0, self.ui.show_lobby)
+                client.resume()
+            except OSError:
+                self.on_server_event("resume_error", attempt)
+
+        threading.Thread(target=resume, daemon=True, name="net-resume").start()
+
+    def resume_game(self, payload):
+        self.ui.status_label.config(text=f"Reconnected as {self.username}")
+        if payload is None:  # not in a game, or the opponent gave up on us
+            if self.mode == "ONLINE":
+                self.ui.show_lobby()
+            return
+        moves, _ = payload
+        # Keep our moves only while they match the server's, in order: our last
+        # one may never have arrived, a game may have ended meanwhile, and after
+        # a MOVE_REJECTED our order is a guess. Then play the rest.
+        played = [i for i, _ in self.engine.moves]
+        if played != moves[:len(played)]:
+            self.engine.reset()
+            self.ui.reset_board_visuals()
+            played = []
+        for i in moves[len(played):]:
+            self.handle_click(i, is_remote=True)
+
+    def connection_lost(self):
+        self.client = None
+        self.mode = "LOCAL"
+        self.ui.create_popup("Error", "Connection to the server was lost.", mode="INFO")
+        self.ui.show_menu()
 
-            except:
-                break
-    
     # [CHANGE] Replaced system dialog with Custom Yes/No Popup
     def ask_accept(self, sender):
         def on_decision(accepted):
             if accepted:
-                self.client_socket.send(f"ACCEPT:{sender}".encode('utf-8'))
+                self.client.accept(sender)
         
         self.ui.create_popup("Challenge!", f"{sender} wants to play!", mode="YESNO", callback=on_decision)
 
@@ -161,11 +295,14 @@ class MainController:
         self.ui.status_label.config(text=f"Vs {opponent} | You are {self.my_symbol}")
 
     def on_close(self):
-        self.running = False
-        if self.client_socket: self.client_socket.close()
+        client, self.client = self.client, None
+        if client: client.close()
         self.root.destroy()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tic Tac Toe client")
+    parser.add_argument("--debug", action="store_true", help="print every server event")
+    DEBUG = parser.parse_args().debug
     root = tk.Tk()
     app = MainController(root)
     root.mainloop()
@@ -1,82 +1,783 @@
+import argparse
+import asyncio
 import socket
 import threading
+import time
+
+from binproto import (ACK, LOGIN_PREFIX, BinaryFrameWriter, MessageDecoder, NameTable,
+                      opponent_move, to_binary)
+from codec import DELIMITER, MAX_FRAME, Decoder, FrameWriter, encode
+from game_engine import BitboardEngine
+from heartbeat import Heartbeats
+from matchlog import MatchLog
+from matchmaking import MatchQueue, Ratings
+from metrics import Metrics, StackSampler, dump_on_signal, serve_metrics
+from presence import PRESENCE_WINDOW, PresenceBatcher, chunked, roster_page, valid_name
+from ratelimit import LIMITS, InviteFilter, RateLimiter
+from sessions import RESUME_PREFIX, MatchHistory, Sessions
+from spectate import BOARD_CELLS, Spectators
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 HOST = '0.0.0.0'
 PORT = 5555
 
-clients = {}       # {username: client_socket}
+clients = {}       # {username: FrameWriter} for players connected to this process
 client_games = {}  # {username: opponent_username}
+broker = None      # cluster.BrokerLink when running as a cluster worker
+presence = PresenceBatcher()
+matchmaker = MatchQueue()
+ratings = Ratings()
+game_roles = {}       # {username: 'X' | 'O'} for players in a game on this process
+engines = {}          # {username: BitboardEngine}, the board as the server has it; a local pair shares one
+histories = {}        # {username: sessions.MatchHistory}, shared like engines
+sessions = Sessions()
+heartbeats = Heartbeats()  # idle deadlines per connection (socket or StreamWriter)
+invites = InviteFilter()   # one pending INVITE per (sender, target)
+rate_limits = LIMITS       # per-connection token buckets; None with --no-rate-limit
+match_log = None      # matchlog.MatchLog when --match-log is given
+HISTORY_LIMIT = 20
+names = NameTable()   # player ids for binary-protocol clients
+spectators = Spectators(binary_encoder=lambda msg: to_binary(msg, names))
+remote_watches = {}   # {spectator here: player on another cluster worker}
+
+MATCH_TICK = 1.0  # seconds between widened matchmaking retries
+next_match_tick = 0.0
+
+# Housekeeping never waits on a socket: a connection that does not take what
+# it is sent keeps it queued, and one over OUTBOX_LIMIT for SLOW_READER_LIMIT
+# seconds is closed (its seat is held as for any drop).
+OUTBOX_LIMIT = 256 * 1024  # unsent bytes per connection
+SLOW_READER_LIMIT = 10.0   # seconds over OUTBOX_LIMIT before the connection is closed
+connections = {}  # {FrameWriter: (heartbeat key, close() that ends its read loop)}
+lagging = {}      # {FrameWriter with unsent bytes: monotonic time it went over OUTBOX_LIMIT, or None}
+
+metrics = Metrics()
+metrics.active_games = lambda: len(client_games) // 2
+VERBOSE = True  # connect/error logging; --quiet turns it off
+
+def log(text):
+    if VERBOSE:
+        print(text)
+
+def is_online(username):
+    return username in clients or (broker is not None and username in broker.roster)
+
+def online_players():
+    """The roster for LIST and ROSTER: held (away) players stay in it until released."""
+    return list(broker.roster) if broker is not None else list(clients) + sessions.held()
+
+def deliver(username, msg, outbox):
+    """Queues `msg` for `username`; the writer is flushed with the rest of `outbox`.
+
+    Players on other cluster workers are reached through the broker.
+    """
+    writer = clients.get(username)
+    if writer is None:
+        if broker is not None and username in broker.roster:
+            broker.route(username, msg, outbox)
+            return True
+        return False
+    writer.write(msg)
+    outbox.add(writer)
+    return True
+
+def set_opponent(username, opponent, outbox, symbol=None):
+    """Records the pairing on whichever process `username` is connected to."""
+    if username in clients:
+        client_games[username] = opponent
+        if symbol:
+            game_roles[username] = symbol
+            shared = symbol == 'O' and client_games.get(opponent) == username and opponent in engines
+            engines[username] = engines[opponent] if shared else BitboardEngine()
+            histories[username] = histories[opponent] if shared else MatchHistory()
+            spectators.pair(username, opponent, symbol)
+            invites.answered(username, opponent)  # a rematch invite goes through again
+            if symbol == 'X' and match_log is not None:
+                match_log.begin(username, opponent)  # X's process records the game
+    elif broker is not None:
+        broker.pair(username, opponent, outbox, symbol)
+
+def clear_opponent(username, outbox):
+    if username in clients or sessions.is_away(username):
+        client_games.pop(username, None)
+        engines.pop(username, None)
+        histories.pop(username, None)
+        spectators.unpair(username)
+        if game_roles.pop(username, None) == 'X' and match_log is not None:
+            match_log.finish(username, "abandoned")
+    elif broker is not None:
+        broker.unpair(username, outbox)
 
-def broadcast_player_list():
-    """Sends the list of active players to everyone."""
-    active_players = [u for u in clients.keys()]
-    player_list = "LIST," + ",".join(active_players)
-    print(f"Server: broadcasting players -> {active_players}")
-    for client_sock in list(clients.values()):
+def record_move(mover, opponent, index):
+    """Shows a move to spectators, and logs it if this process owns the game's X player."""
+    if not index.isdigit() or int(index) > 0x7F:
+        return
+    if mover in game_roles:
+        spectators.move(mover, game_roles[mover], int(index))
+    elif opponent in game_roles:
+        spectators.move(opponent, 'X' if game_roles[opponent] == 'O' else 'O', int(index))
+    if match_log is None:
+        return
+    if game_roles.get(mover) == 'X':
+        match_log.move(mover, opponent, 'X', int(index))
+    elif game_roles.get(opponent) == 'X':
+        match_log.move(opponent, mover, 'O', int(index))
+
+def flush_outbox(outbox, wait=True):
+    """Sends everything queued during one batch of messages, one write per client.
+
+    Housekeeping passes wait=False: what a connection does not take right
+    away stays queued, and pump_lagging() retries it.
+    """
+    for writer in outbox:
         try:
-            client_sock.sendall(player_list.encode('utf-8'))
+            if wait:
+                writer.flush()
+            elif writer.flush_nowait() or writer.backlog():
+                lagging.setdefault(writer, None)
         except Exception as e:
-            print(f"Server: failed to send player list to a client: {e}")
+            log(f"Server: failed to flush to a client: {e}")
+    outbox.clear()
 
-def handle_client(client_socket):
-    username = None
-    try:
-        username = client_socket.recv(1024).decode('utf-8')
+def pump_lagging(now):
+    """Retries connections with unsent bytes; closes the ones that stay over OUTBOX_LIMIT."""
+    for writer, since in list(lagging.items()):
+        if writer not in connections:  # closed meanwhile
+            del lagging[writer]
+            continue
+        writer.flush_nowait()
+        waiting = writer.backlog()
+        if not waiting:
+            del lagging[writer]
+        elif waiting <= OUTBOX_LIMIT:
+            lagging[writer] = None
+        elif since is None:
+            lagging[writer] = now
+        elif now - since > SLOW_READER_LIMIT:
+            del lagging[writer]
+            metrics.connections_slow += 1
+            log(f"Server: closing a connection {waiting} bytes behind.")
+            close_connection(writer)
+
+def close_connection(writer):
+    """Ends `writer`'s connection from outside its read loop; that loop then cleans up."""
+    entry = connections.pop(writer, None)
+    if entry is not None:
+        key, close = entry
+        heartbeats.remove(key)
+        close()
+
+def send_player_list(username, outbox):
+    """Sends the full roster to one player (at login and resume).
+
+    Large rosters go as a LIST with the first names and JOINs with the rest,
+    so no frame comes near codec.MAX_FRAME.
+    """
+    messages = chunked("JOIN", online_players()) or ["LIST,"]
+    messages[0] = "LIST," + messages[0][len("JOIN,"):]
+    for msg in messages:
+        deliver(username, msg, outbox)
+
+def flush_presence():
+    """Sends the coalesced JOIN/LEAVE deltas to everyone connected here."""
+    updates = presence.drain()
+    if not updates:
+        return
+    text, binary = b"".join(encode(m) for m in updates), None
+    outbox = set()
+    for writer in list(clients.values()):
+        if writer.binary and binary is None:
+            binary = b"".join(to_binary(m, names) for m in updates)
+        writer.write_encoded(binary if writer.binary else text)
+        outbox.add(writer)
+    flush_outbox(outbox, wait=False)
+    for msg in updates:
+        if msg.startswith("LEAVE,"):
+            for name in msg.split(",")[1:]:
+                if not is_online(name):  # not back again later in the same window
+                    names.forget(name)  # a later login under this name gets a new id
+
+# What handle_message() understands; metrics count anything else as "other",
+# so a client cannot add label values.
+MESSAGE_TYPES = frozenset(("INVITE", "ACCEPT", "QUEUE", "QUEUE_CANCEL", "MOVE", "WATCH", "UNWATCH",
+                           "REPLAY", "HISTORY", "PONG", "ROSTER"))
+
+def handle_message(username, msg, outbox):
+    """Applies one protocol message from `username`. Shared by every server mode."""
+    if msg.startswith("INVITE:"):
+        target = msg.split(":")[1]
+        if not invites.first(username, target, time.monotonic()):
+            return  # the target has this invite already
+        if deliver(target, f"INVITE_FROM:{username}", outbox):
+            metrics.invite_sent(username, target)
+        else:
+            invites.answered(username, target)
+
+    elif msg.startswith("ACCEPT:"):
+        challenger = msg.split(":")[1]
+        if username in client_games or challenger in client_games:
+            return
+        if not invites.take(challenger, username, time.monotonic()) or not is_online(challenger):
+            return  # never invited, or the invite expired
+        # Start Game (Challenger is X, Accepter is O)
+        start_game(challenger, username, outbox)
+        metrics.invite_accepted(challenger, username)
+
+    elif msg == "QUEUE":
+        if username in client_games:
+            return
+        opponent = matchmaker.join(username, ratings.get(username))
+        if opponent is None:
+            deliver(username, f"QUEUED:{ratings.get(username)}", outbox)
+        else:
+            start_game(opponent, username, outbox)  # whoever waited plays X
+
+    elif msg == "QUEUE_CANCEL":
+        matchmaker.leave(username)
+
+    elif msg.startswith("MOVE:"):
+        opponent = client_games.get(username)
+        if opponent:
+            play_move(username, opponent, msg.split(":")[1], outbox)
+
+    elif msg.startswith("WATCH:"):
+        watch_game(username, msg.split(":")[1], outbox)
+
+    elif msg == "UNWATCH":
+        unwatch_game(username, outbox)
+
+    elif msg.startswith("REPLAY:"):
+        replay_match(username, msg.split(":")[1], outbox)
+
+    elif msg == "HISTORY" or msg.startswith("HISTORY:"):
+        player = msg.partition(":")[2] or username
+        ids = match_log.history(player, HISTORY_LIMIT) if match_log is not None else []
+        deliver(username, ",".join(["HISTORY", player] + [str(i) for i in ids]), outbox)
+
+    elif msg == "PONG":
+        pass  # reading it already counted as a sign of life (heartbeats.touch)
+
+    elif msg.startswith("ROSTER:"):
+        parts = msg.split(":", 3)
+        try:
+            offset, limit = max(0, int(parts[1])), max(0, int(parts[2]))
+        except (IndexError, ValueError):
+            return
+        prefix = parts[3] if len(parts) > 3 else ""
+        deliver(username, roster_page(online_players(), offset, limit, prefix), outbox)
+
+def start_game(x_player, o_player, outbox):
+    for username in (x_player, o_player):
+        matchmaker.leave(username)
+    set_opponent(x_player, o_player, outbox, 'X')
+    set_opponent(o_player, x_player, outbox, 'O')
+    deliver(o_player, f"GAME_START:YOU_O:{x_player}", outbox)
+    deliver(x_player, f"GAME_START:YOU_X:{o_player}", outbox)
+
+def play_move(mover, opponent, index, outbox):
+    """MOVE:<index> from `mover`, checked against the server's board before it is forwarded.
+
+    Out-of-turn moves and moves onto a taken cell get MOVE_REJECTED with the
+    board as the server has it, so the client can put its own back in step.
+    """
+    engine = engines.get(mover)
+    if engine is None:
+        return
+    cell = int(index) if index.isdigit() else -1
+    if not (0 <= cell < BOARD_CELLS and game_roles[mover] == engine.turn
+            and engine.make_move(cell, engine.turn)):
+        metrics.moves_rejected += 1
+        deliver(mover, f"MOVE_REJECTED:{board_cells(engine)}", outbox)
+        return
+    seq = histories[mover].add(cell)
+    writer = clients.get(opponent)
+    if writer is not None and writer.binary:
+        writer.write_encoded(opponent_move(cell, seq))  # no text to build and parse again
+        outbox.add(writer)
+    else:
+        deliver(opponent, f"OPPONENT_MOVE:{cell}:{seq}", outbox)
+    record_move(mover, opponent, str(cell))
+    advance(mover, opponent, engine, outbox)
+
+def follow_move(player, mover, index, outbox):
+    """Cluster: `mover`'s worker accepted this move; keeps `player`'s copy of the board in step."""
+    engine = engines.get(player)
+    if engine is not None and index.isdigit() and engine.make_move(int(index), engine.turn):
+        histories[player].add(int(index))
+        record_move(mover, player, index)
+        advance(player, mover, engine, outbox)
+
+def advance(player, opponent, engine, outbox):
+    """After a move: the other player's turn, or GAME_OVER and a fresh board for the next game.
+
+    Each process tells its own players; the one with X updates the ratings.
+    """
+    winner, line = engine.check_winner()
+    if winner is None:
+        engine.switch_turn()
+        return
+    engine.reset()  # the pair plays on, X first again
+    histories[player].new_game()
+    over = f"GAME_OVER:{winner}" + (":" + ",".join(map(str, line)) if line else "")
+    for username in (player, opponent):
+        if username in game_roles:  # here, or away with its seat held
+            spectators.result(username, winner)
         if username in clients:
-            client_socket.send("ERROR:Name taken".encode('utf-8'))
-            client_socket.close()
+            deliver(username, over, outbox)
+    x_player, o_player = (player, opponent) if game_roles.get(player) == 'X' else (opponent, player)
+    if game_roles.get(x_player) != 'X':
+        return
+    if match_log is not None:
+        match_log.finish(x_player, winner)
+        match_log.begin(x_player, o_player)
+    x_rating, o_rating = ratings.record(x_player, o_player, winner)
+    deliver(x_player, f"RATING:{x_rating}", outbox)
+    deliver(o_player, f"RATING:{o_rating}", outbox)
+
+def board_cells(engine):
+    return "".join(c or '-' for c in engine.board)
+
+def watch_game(spectator, player, outbox):
+    """WATCH:<player>. The game is followed on the process `player` is connected to."""
+    unwatch_game(spectator, outbox)
+    if player in clients:
+        frames = clients.get(spectator) or broker.feed(spectator)
+        if spectators.watch(spectator, frames, player):
             return
+    elif broker is not None and player in broker.roster and spectator in clients:
+        remote_watches[spectator] = player
+        broker.watch(spectator, player, outbox)
+        return
+    deliver(spectator, f"WATCH_ERROR:{player}", outbox)
+
+def unwatch_game(spectator, outbox):
+    spectators.unwatch(spectator)
+    player = remote_watches.pop(spectator, None)
+    if player is not None:
+        broker.unwatch(spectator, player, outbox)
 
-        clients[username] = client_socket
-        print(f"Server: {username} connected.")
-        broadcast_player_list()
-
-        while True:
-            msg = client_socket.recv(1024).decode('utf-8')
-            if not msg: break
-
-            if msg.startswith("INVITE:"):
-                target = msg.split(":")[1]
-                if target in clients:
-                    clients[target].send(f"INVITE_FROM:{username}".encode('utf-8'))
-            
-            elif msg.startswith("ACCEPT:"):
-                challenger = msg.split(":")[1]
-                client_games[username] = challenger
-                client_games[challenger] = username
-                # Start Game (Challenger is X, Accepter is O)
-                clients[username].send(f"GAME_START:YOU_O:{challenger}".encode('utf-8'))
-                clients[challenger].send(f"GAME_START:YOU_X:{username}".encode('utf-8'))
-
-            elif msg.startswith("MOVE:"):
-                move_idx = msg.split(":")[1]
-                opponent = client_games.get(username)
-                if opponent:
-                    clients[opponent].send(f"OPPONENT_MOVE:{move_idx}".encode('utf-8'))
+def replay_match(username, match_id, outbox):
+    """Streams a logged game: REPLAY_START, one REPLAY_MOVE per move, REPLAY_END."""
+    match = None
+    if match_log is not None and match_id.isdigit():
+        match = match_log.lookup(int(match_id))
+    if match is None:
+        deliver(username, f"REPLAY_ERROR:{match_id}", outbox)
+        return
+    deliver(username, f"REPLAY_START:{match.match_id}:{match.x_player}:{match.o_player}:"
+                      f"{int(match.started)}:{match.result}", outbox)
+    for symbol, index, delay_ms in match.moves:
+        deliver(username, f"REPLAY_MOVE:{symbol}:{index}:{delay_ms}", outbox)
+    deliver(username, f"REPLAY_END:{match.match_id}", outbox)
+
+def run_matchmaking():
+    """Pairs queued players whose widened search windows now overlap (from housekeeping)."""
+    pairs = matchmaker.tick()
+    if not pairs:
+        return
+    outbox = set()
+    for x_player, o_player in pairs:
+        start_game(x_player, o_player, outbox)
+    flush_outbox(outbox, wait=False)
+
+def open_session(line, send, send_nowait=None, buffered=None):
+    """Reads the login line: returns (username, FrameWriter, Decoder) for the protocol it picks."""
+    username = line.decode('utf-8', 'replace')
+    if username.startswith(LOGIN_PREFIX):
+        send(encode(ACK))  # the last text the client gets
+        return (username[len(LOGIN_PREFIX):], BinaryFrameWriter(send, names, send_nowait, buffered),
+                MessageDecoder(names))
+    return username, FrameWriter(send, send_nowait, buffered), Decoder()
+
+def login_client(name, writer):
+    """Logs in, or takes a held seat back with RESUME:<token>:<seq>; returns the player or None."""
+    if name.startswith(RESUME_PREFIX):
+        return resume_client(name, writer)
+    if not valid_name(name):
+        writer.send("ERROR:Invalid name")
+        return None
+    return name if register_client(name, writer) else None
+
+def register_client(username, writer):
+    """Returns False (and tells the client) if the name is already taken."""
+    if username in clients or sessions.is_away(username):
+        writer.send("ERROR:Name taken")
+        return False
+    clients[username] = writer
+    log(f"Server: {username} connected.")
+    if broker is None:  # clustered: the broker's JOINED reaches every worker
+        presence.joined(username)
+    outbox = set()
+    send_player_list(username, outbox)
+    deliver(username, f"SESSION:{sessions.issue(username)}", outbox)
+    flush_outbox(outbox)
+    return True
+
+def resume_client(line, writer):
+    """RESUME:<token>:<seq>: the player is back on `writer` and gets what it missed."""
+    token = (line.split(":") + [""])[1]
+    username = sessions.resume(token)
+    if username is None:
+        writer.send("RESUME_FAILED")
+        return None
+    replaced = clients.get(username)
+    clients[username] = writer
+    if replaced is not None and replaced is not writer:
+        # A connection that still looked alive: closed, and its read loop
+        # stops acting for the player as soon as it sees the new writer.
+        close_connection(replaced)
+    log(f"Server: {username} resumed.")
+    outbox = set()
+    opponent = client_games.get(username)
+    history = histories.get(username)
+    if opponent is None or history is None:
+        deliver(username, "RESUMED", outbox)
+    else:
+        deliver(username, history.resume_reply(), outbox)
+        if replaced is None:  # the opponent was told OPPONENT_AWAY
+            deliver(opponent, "OPPONENT_BACK", outbox)
+    send_player_list(username, outbox)  # the lobby changed while it was away
+    flush_outbox(outbox)
+    return username
+
+def process_batch(username, msgs, outbox, received_at, limiter=None):
+    """Handles the messages from one read and flushes their replies together.
+
+    Messages over the connection's rate limits are dropped; returns False
+    once `username` is flooding, and the caller closes the connection.
+    """
+    moved = False
+    keep = True
+    now = time.monotonic() if limiter is not None else 0.0
+    for msg in msgs:
+        kind = msg.partition(":")[0]
+        if limiter is not None and not limiter.allow(kind, now):
+            metrics.messages_limited += 1
+            if limiter.flooding(now):
+                metrics.connections_flooded += 1
+                log(f"Server: {username} is flooding, disconnecting.")
+                sessions.forget(username)  # no seat held for it, no RESUME
+                keep = False
+                break
+            continue
+        metrics.messages_in[kind if kind in MESSAGE_TYPES else "other"] += 1
+        moved = moved or kind == "MOVE"
+        handle_message(username, msg, outbox)
+    flush_outbox(outbox)
+    spectators.flush()  # after the players' own replies
+    if moved:
+        metrics.move_forward.observe(time.perf_counter() - received_at)
+    return keep
+
+def disconnect_client(username, writer):
+    """`username`'s connection (if still `writer`) closed: its seat is held, then given up.
+
+    Cluster workers give it up at once, since a reconnect may land on another worker.
+    """
+    if username is None or clients.get(username) is not writer:
+        return
+    del clients[username]
+    matchmaker.leave(username)
+    outbox = set()
+    unwatch_game(username, outbox)
+    if broker is None and sessions.hold(username):
+        opponent = client_games.get(username)
+        if opponent:
+            deliver(opponent, f"OPPONENT_AWAY:{sessions.grace:g}", outbox)
+        flush_outbox(outbox)
+        return
+    flush_outbox(outbox)
+    release_client(username)
+
+def release_client(username, wait=True):
+    """Gives up `username`'s seat: its game ends and it leaves the roster.
+
+    wait=False (housekeeping): see flush_outbox().
+    """
+    sessions.forget(username)
+    spectators.unpair(username)
+    engines.pop(username, None)
+    histories.pop(username, None)
+    if game_roles.pop(username, None) == 'X' and match_log is not None:
+        match_log.finish(username, "abandoned")
+    outbox = set()
+    opponent = client_games.pop(username, None)
+    if opponent:
+        clear_opponent(opponent, outbox)
+        deliver(opponent, "OPPONENT_LEFT", outbox)
+    if broker is None:
+        presence.left(username)
+    else:
+        broker.release(username, outbox)
+    flush_outbox(outbox, wait)
+
+# --- THREADED MODE (one thread per connection) ---
+def send_nowait(sock):
+    """sock.send that returns 0 instead of waiting when the socket buffer is full."""
+    flags = getattr(socket, "MSG_DONTWAIT", 0)
+    def send(data):
+        try:
+            sent = sock.send(data, flags)
+        except OSError:  # full, or closing: the connection's own thread sees the error
+            return 0
+        metrics.bytes_out += sent
+        return sent
+    return send
+
+def shutdown(sock):
+    """Ends the connection's recv() from another thread (heartbeats reaping it)."""
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+def send_ping(writer):
+    writer.write("PING")
+    writer.flush_nowait()  # never wait on a peer that may be gone
+
+def handle_client(client_socket):
+    username = writer = None
+    login = b""
+    outbox = set()
+    metrics.connection_opened()
+    heartbeats.add(client_socket, lambda: shutdown(client_socket))
+    try:
+        while writer is None:
+            data = client_socket.recv(4096)
+            if not data: return
+            metrics.bytes_in += len(data)
+            login += data
+            if DELIMITER not in login:
+                if len(login) > MAX_FRAME: return
+                continue
+            line, _, rest = login.partition(DELIMITER)
+            username, writer, decoder = open_session(
+                line, metrics.counted(client_socket.sendall), send_nowait(client_socket))
+            connections[writer] = (client_socket, lambda: shutdown(client_socket))
+            msgs = decoder.feed(rest)
+            username = login_client(username, writer)
+            if username is None:
+                return
+            heartbeats.logged_in(client_socket, lambda: send_ping(writer))
+
+        limiter = RateLimiter(rate_limits) if rate_limits else None
+        received_at = time.perf_counter()
+        while (clients.get(username) is writer  # not replaced by a RESUME
+               and process_batch(username, msgs, outbox, received_at, limiter)):
+            data = client_socket.recv(4096)
+            if not data: break
+            heartbeats.touch(client_socket)
+            received_at = time.perf_counter()
+            metrics.bytes_in += len(data)
+            msgs = decoder.feed(data)
 
     except Exception as e:
-        print(f"Error ({username}): {e}")
+        log(f"Error ({username}): {e}")
     finally:
-        if username in clients:
-            del clients[username]
-            opponent = client_games.get(username)
-            if opponent and opponent in clients:
-                clients[opponent].send("OPPONENT_LEFT".encode('utf-8'))
-                del client_games[username]
-                if opponent in client_games: del client_games[opponent]
-            broadcast_player_list()
+        heartbeats.remove(client_socket)
+        connections.pop(writer, None)
+        metrics.connection_closed()
+        disconnect_client(username, writer)
         client_socket.close()
 
-def start_server():
+def housekeeping():
+    """Periodic server work, run every PRESENCE_WINDOW seconds in every mode."""
+    global next_match_tick
+    flush_presence()
+    now = time.monotonic()
+    if now >= next_match_tick:
+        next_match_tick = now + MATCH_TICK
+        run_matchmaking()
+    spectators.pump()
+    for username in sessions.expired(now):
+        release_client(username, wait=False)
+    pump_lagging(now)
+    metrics.connections_reaped += heartbeats.sweep(now)
+    invites.expire(now)
+
+def housekeeping_thread():
+    while True:
+        time.sleep(PRESENCE_WINDOW)
+        housekeeping()
+
+def start_server(host=HOST, port=PORT):
+    raise_fd_limit()
     server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.bind((HOST, PORT))
-    server.listen()
-    print(f"--- Server Running on {HOST}:{PORT} ---")
-    
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen(socket.SOMAXCONN)
+    print(f"--- Server Running on {host}:{port} (threaded) ---")
+    threading.Thread(target=housekeeping_thread, daemon=True).start()
+
     while True:
         client_sock, addr = server.accept()
-        thread = threading.Thread(target=handle_client, args=(client_sock,))
+        thread = threading.Thread(target=handle_client, args=(client_sock,), daemon=True)
         thread.start()
 
+# --- ASYNCIO MODE (one event loop for every connection) ---
+async def login_async(name, frames):
+    """login_client, after reserving the name cluster-wide when clustered.
+
+    Only valid names are claimed (RESUME:... is not one); login_client turns
+    the rest away.
+    """
+    if broker is not None and valid_name(name) and not await broker.claim(name):
+        frames.send("ERROR:Name taken")
+        return None
+    return login_client(name, frames)
+
+async def handle_client_async(reader, writer):
+    username = frames = None
+    login = b""
+    outbox = set()
+    metrics.connection_opened()
+    heartbeats.add(writer, writer.transport.abort)
+    try:
+        while frames is None:
+            data = await reader.read(4096)
+            if not data: return
+            metrics.bytes_in += len(data)
+            login += data
+            if DELIMITER not in login:
+                if len(login) > MAX_FRAME: return
+                continue
+            line, _, rest = login.partition(DELIMITER)
+            username, frames, decoder = open_session(
+                line, metrics.counted(writer.write), buffered=writer.transport.get_write_buffer_size)
+            connections[frames] = (writer, writer.transport.abort)
+            msgs = decoder.feed(rest)
+            username = await login_async(username, frames)
+            if username is None:
+                return
+            heartbeats.logged_in(writer, lambda: send_ping(frames))
+
+        limiter = RateLimiter(rate_limits) if rate_limits else None
+        received_at = time.perf_counter()
+        while (clients.get(username) is frames  # not replaced by a RESUME
+               and process_batch(username, msgs, outbox, received_at, limiter)):
+            data = await reader.read(4096)
+            if not data: break
+            heartbeats.touch(writer)
+            received_at = time.perf_counter()
+            metrics.bytes_in += len(data)
+            msgs = decoder.feed(data)
+
+    except Exception as e:
+        log(f"Error ({username}): {e}")
+    finally:
+        heartbeats.remove(writer)
+        connections.pop(frames, None)
+        metrics.connection_closed()
+        disconnect_client(username, frames)
+        writer.close()
+
+async def housekeeping_task():
+    while True:
+        await asyncio.sleep(PRESENCE_WINDOW)
+        housekeeping()
+
+async def serve_async(host=HOST, port=PORT):
+    server = await asyncio.start_server(handle_client_async, host, port,
+                                        reuse_address=True, backlog=socket.SOMAXCONN)
+    print(f"--- Server Running on {host}:{port} (asyncio) ---")
+    housekeeper = asyncio.create_task(housekeeping_task())  # keep a reference
+    async with server:
+        await server.serve_forever()
+
+def start_async_server(host=HOST, port=PORT):
+    raise_fd_limit()
+    asyncio.run(serve_async(host, port))
+
+def raise_fd_limit():
+    """Lifts the open-file soft limit to the hard limit so many sockets fit."""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+def enable_metrics(metrics_port=None, profile_interval=None):
+    """Starts the optional metrics endpoint and stack sampler; SIGUSR1 dumps both."""
+    if profile_interval:
+        metrics.sampler = StackSampler(profile_interval)
+        metrics.sampler.start()
+    if metrics_port:
+        serve_metrics(metrics, port=metrics_port)
+        log(f"--- Metrics on http://127.0.0.1:{metrics_port}/metrics ---")
+    dump_on_signal(metrics)
+
+def enable_match_log(path=None, worker=None, workers=1):
+    """Starts recording finished games to `path` (per-worker files when clustered)."""
+    global match_log
+    if path:
+        match_log = MatchLog(path, worker, workers)
+
+def configure(verbose=True, rate_limited=True, resume_grace=None, ping_interval=None):
+    """Applies the command-line settings to this module (each cluster worker calls it too)."""
+    global VERBOSE, rate_limits
+    VERBOSE = verbose
+    rate_limits = LIMITS if rate_limited else None
+    if resume_grace is not None:
+        sessions.grace = resume_grace
+    if ping_interval is not None:
+        heartbeats.interval = ping_interval
+
+def start_cluster_server(host=HOST, port=PORT, workers=None, **options):
+    from cluster import start_cluster
+    start_cluster(host, port, workers, **options)
+
+SERVER_MODES = {
+    "threaded": start_server,
+    "asyncio": start_async_server,
+    "cluster": start_cluster_server,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tic Tac Toe game server")
+    parser.add_argument("--mode", choices=sorted(SERVER_MODES), default="threaded",
+                        help="connection handling model (default: threaded)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes for --mode cluster (default: CPU count)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus-style metrics on 127.0.0.1:PORT/metrics "
+                             "(cluster worker i uses PORT + i)")
+    parser.add_argument("--profile-interval", type=float, default=None,
+                        help="sample thread stacks every N seconds; see /profile or SIGUSR1")
+    parser.add_argument("--match-log", default=None, metavar="PATH",
+                        help="record every game to this append-only log (enables REPLAY/HISTORY)")
+    parser.add_argument("--resume-grace", type=float, default=sessions.grace, metavar="SECONDS",
+                        help="how long a dropped player's seat is held for RESUME (0: not at all)")
+    parser.add_argument("--ping-interval", type=float, default=heartbeats.interval,
+                        metavar="SECONDS",
+                        help="PING a connection silent this long, close it if it stays silent "
+                             f"{heartbeats.timeout:g}s more (0: never)")
+    parser.add_argument("--no-rate-limit", action="store_true",
+                        help="no per-connection message limits (load tests from few connections)")
+    parser.add_argument("--quiet", action="store_true", help="no per-connection logging")
+    args = parser.parse_args(argv)
+    settings = dict(verbose=not args.quiet, rate_limited=not args.no_rate_limit,
+                    resume_grace=args.resume_grace, ping_interval=args.ping_interval)
+    if args.mode == "cluster":
+        # Workers import a fresh `server`, so the settings travel with them.
+        start_cluster_server(args.host, args.port, args.workers,
+                             metrics_port=args.metrics_port,
+                             profile_interval=args.profile_interval,
+                             match_log_path=args.match_log, settings=settings)
+    else:
+        configure(**settings)
+        enable_metrics(args.metrics_port, args.profile_interval)
+        enable_match_log(args.match_log)
+        try:
+            SERVER_MODES[args.mode](args.host, args.port)
+        finally:
+            if match_log is not None:
+                match_log.close()  # write the games still waiting for their group commit
+
 if __name__ == "__main__":
-    start_server()
+    main()
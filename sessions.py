@@ -0,0 +1,107 @@
+"""Session resume: a dropped connection keeps its player's seat for a grace period.
+
+Every login is answered with SESSION:<token>. Moves in a match are
+numbered from 1 (GAME_START is 0), on through the pair's later games, and
+OPPONENT_MOVE:<index>:<seq> carries the number. A client whose connection
+dropped connects again and sends, in place of its username,
+    RESUME:<token>:<seq>            <seq>: the last OPPONENT_MOVE it saw
+and gets one reply (the whole game rather than what came after <seq>,
+so the client never has to guess the order of the moves it already has):
+    RESUMED:<seq>:GAME:<cells>      the current game's moves so far, in the
+                                    order they were played, one digit each
+                                    (the next game's, if one ended meanwhile)
+    RESUMED                         not in a game (any more)
+    RESUME_FAILED                   unknown token: log in again
+followed, unless it failed, by the roster (LIST and JOINs) as at login.
+While the seat is held the player stays in the roster and its opponent
+gets OPPONENT_AWAY:<seconds>, then OPPONENT_BACK; a seat nobody takes back
+within GRACE_PERIOD is given up like a closed connection (OPPONENT_LEFT,
+LEAVE). Resuming a session that still looks connected takes it over.
+"""
+import secrets
+import threading
+import time
+
+GRACE_PERIOD = 30.0  # seconds a dropped player's seat is held
+RESUME_PREFIX = "RESUME:"
+
+class MatchHistory:
+    """The numbered moves of one pairing: what a resuming player gets back."""
+    __slots__ = ("seq", "cells")
+
+    def __init__(self):
+        self.seq = 0     # moves accepted since GAME_START, across the pair's games
+        self.cells = []  # the current game's moves, in order
+
+    def add(self, cell):
+        self.seq += 1
+        self.cells.append(cell)
+        return self.seq
+
+    def new_game(self):
+        self.cells = []
+
+    def resume_reply(self):
+        """RESUMED with the current game's moves, in order."""
+        return f"RESUMED:{self.seq}:GAME:{''.join(map(str, self.cells))}"
+
+class Sessions:
+    def __init__(self, grace=GRACE_PERIOD):
+        self.grace = grace
+        self.tokens = {}    # {token: username}
+        self.token_of = {}  # {username: token}
+        self.away = {}      # {username: monotonic deadline}, soonest first
+        self._lock = threading.Lock()
+
+    def issue(self, username):
+        token = secrets.token_urlsafe(12)
+        with self._lock:
+            self.tokens.pop(self.token_of.get(username), None)
+            self.tokens[token] = username
+            self.token_of[username] = token
+        return token
+
+    def hold(self, username):
+        """Keeps `username`'s seat for `grace` seconds; False if it should be given up now."""
+        if self.grace <= 0:
+            return False
+        with self._lock:
+            if username not in self.token_of:
+                return False
+            self.away.pop(username, None)  # re-insert so the dict stays in deadline order
+            self.away[username] = time.monotonic() + self.grace
+            return True
+
+    def resume(self, token):
+        """The player `token` belongs to, now back (None for an unknown token)."""
+        with self._lock:
+            username = self.tokens.get(token)
+            if username is not None:
+                self.away.pop(username, None)
+            return username
+
+    def is_away(self, username):
+        return username in self.away
+
+    def held(self):
+        """Players whose seats are held, soonest deadline first."""
+        with self._lock:
+            return list(self.away)
+
+    def expired(self, now=None):
+        """Players whose grace period ran out; they are no longer held."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            names = []
+            for username, deadline in self.away.items():
+                if deadline > now:
+                    break
+                names.append(username)
+            for username in names:
+                del self.away[username]
+        return names
+
+    def forget(self, username):
+        with self._lock:
+            self.tokens.pop(self.token_of.pop(username, None), None)
+            self.away.pop(username, None)
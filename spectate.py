@@ -0,0 +1,200 @@
+"""Spectators: WATCH a game and receive its moves as they are played.
+
+client -> server:
+    WATCH:<player>            watch the game <player> is in (as X or O)
+    UNWATCH                   stop watching
+server -> spectator:
+    WATCHING:<x>:<o>:<cells>  board snapshot, one X/O/- per cell; sent on WATCH,
+                              at each new game and after skipping ahead
+    WATCH_MOVE:<X|O>:<index>  a move in the watched game
+    WATCH_END:<result>        X, O or Draw: the pair's next game follows;
+                              left or dropped: watching stops
+    WATCH_ERROR:<player>      <player> is not in a game
+
+A move is encoded once per protocol (text, and binary when binproto
+clients are watching) and the same bytes are queued on every watcher's
+FrameWriter. flush() pushes them with flush_nowait() once the players'
+own replies are out, so a player never waits on a spectator's socket. A
+watcher more than MAX_BACKLOG bytes behind stops getting moves; when it
+has caught up (checked every housekeeping tick) it is sent one snapshot
+instead of what it missed. A watcher still behind after STALE_LIMIT
+seconds is dropped.
+"""
+import threading
+import time
+
+from codec import encode
+
+MAX_BACKLOG = 16 * 1024  # unsent bytes per watcher before it skips to a snapshot
+STALE_LIMIT = 10.0       # seconds a watcher may stay behind before it is dropped
+BOARD_CELLS = 9
+
+class Watcher:
+    __slots__ = ("name", "frames", "game", "behind_since")
+
+    def __init__(self, name, frames, game):
+        self.name = name
+        self.frames = frames      # codec.FrameWriter (or cluster.RouteFeed)
+        self.game = game
+        self.behind_since = None  # monotonic time it started skipping moves
+
+class Game:
+    """The board of one pairing and the spectators following it."""
+    __slots__ = ("x_player", "o_player", "cells", "watchers")
+
+    def __init__(self, x_player, o_player):
+        self.x_player = x_player
+        self.o_player = o_player
+        self.cells = ['-'] * BOARD_CELLS
+        self.watchers = {}  # {spectator name: Watcher}
+
+    def snapshot(self):
+        return f"WATCHING:{self.x_player}:{self.o_player}:{''.join(self.cells)}"
+
+    def other(self, player):
+        return self.o_player if player == self.x_player else self.x_player
+
+class Spectators:
+    def __init__(self, max_backlog=MAX_BACKLOG, stale_limit=STALE_LIMIT, binary_encoder=None):
+        self.max_backlog = max_backlog
+        self.binary_encoder = binary_encoder  # msg -> binary frame, for binproto connections
+        self.stale_limit = stale_limit
+        self.games = {}      # {player on this process: Game}; a local pair shares one
+        self.watching = {}   # {spectator name: Watcher}
+        self.lagging = set() # watchers with unsent bytes or skipped moves
+        self.ready = []      # watchers with frames queued since the last flush()
+        self.skipped = 0     # moves not sent to a watcher that was behind
+        self.dropped = 0
+        self._lock = threading.Lock()  # players' threads share this in threaded mode
+
+    # --- players ---
+    def pair(self, player, opponent, symbol):
+        """A new game for `player`; whoever watched its last game follows this one."""
+        x, o = (player, opponent) if symbol == 'X' else (opponent, player)
+        with self._lock:
+            old = self.games.get(player)
+            game = self.games.get(opponent)
+            if game is None or game is old or (game.x_player, game.o_player) != (x, o):
+                game = Game(x, o)  # the opponent's side, if it is here, shares it on its pair()
+            self.games[player] = game
+            if old is None or old is game or self.games.get(old.other(player)) is old:
+                return  # no previous game, or the opponent still holds it and moves it over
+            snapshot = self._encode(game.snapshot())
+            for watcher in old.watchers.values():
+                watcher.game = game
+                game.watchers[watcher.name] = watcher
+                self._push(watcher, snapshot)
+            old.watchers.clear()
+
+    def unpair(self, player):
+        """`player` left its game; once neither player is here, its watchers are let go."""
+        with self._lock:
+            game = self.games.pop(player, None)
+            if game is None or self.games.get(game.other(player)) is game:
+                return
+            self._end(game, self._encode("WATCH_END:left"))
+            for watcher in game.watchers.values():
+                del self.watching[watcher.name]
+                self.lagging.discard(watcher)
+            game.watchers.clear()
+
+    def move(self, player, symbol, index):
+        with self._lock:
+            game = self.games.get(player)
+            if game is None:
+                return
+            if index >= len(game.cells):
+                game.cells += ['-'] * (index + 1 - len(game.cells))
+            game.cells[index] = symbol
+            self._fan_out(game, self._encode(f"WATCH_MOVE:{symbol}:{index}"))
+
+    def result(self, player, result):
+        """The game ended; the board is cleared for the pair's next game."""
+        with self._lock:
+            game = self.games.get(player)
+            if game is None or all(c == '-' for c in game.cells):
+                return  # the other player already reported it
+            game.cells = ['-'] * BOARD_CELLS
+            self._end(game, self._encode(f"WATCH_END:{result}"))
+
+    # --- spectators ---
+    def watch(self, name, frames, player):
+        """Starts sending `player`'s game to `name`; False if `player` is not in one here."""
+        with self._lock:
+            self._unwatch(name)
+            game = self.games.get(player)
+            if game is None:
+                return False
+            watcher = self.watching[name] = game.watchers[name] = Watcher(name, frames, game)
+            self._push(watcher, self._encode(game.snapshot()))
+            return True
+
+    def unwatch(self, name):
+        with self._lock:
+            self._unwatch(name)
+
+    def _unwatch(self, name):
+        watcher = self.watching.pop(name, None)
+        if watcher is not None:
+            watcher.game.watchers.pop(name, None)
+            self.lagging.discard(watcher)
+
+    # --- fan-out ---
+    def _encode(self, msg):
+        """(text frame, binary frame) for `msg`; _push() picks the one each watcher speaks."""
+        return encode(msg), (self.binary_encoder(msg) if self.binary_encoder else None)
+
+    def _push(self, watcher, data):
+        watcher.frames.write_encoded(data[watcher.frames.binary])
+        self.ready.append(watcher)
+
+    def flush(self):
+        """Sends what the last moves queued, without blocking; call it after the players' flush."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        ready, self.ready = self.ready, []
+        for watcher in ready:
+            if watcher.frames.flush_nowait():
+                self.lagging.add(watcher)
+
+    def _fan_out(self, game, data):
+        """Queues the same `data` frames for every watcher that is keeping up."""
+        now = time.monotonic()
+        for watcher in game.watchers.values():
+            if watcher.behind_since is not None:
+                self.skipped += 1
+            elif watcher.frames.backlog() > self.max_backlog:
+                watcher.behind_since = now
+                self.lagging.add(watcher)
+                self.skipped += 1
+            else:
+                self._push(watcher, data)
+
+    def _end(self, game, data):
+        """Like _fan_out, but watchers that are behind get it too: it ends what they missed."""
+        for watcher in game.watchers.values():
+            self._push(watcher, data)
+
+    def pump(self):
+        """Pushes unsent bytes and re-syncs watchers that caught up; call it periodically."""
+        with self._lock:
+            self._flush()
+            now = time.monotonic()
+            for watcher in list(self.lagging):
+                frames = watcher.frames
+                frames.flush_nowait()
+                waiting = frames.backlog()
+                if watcher.behind_since is None:
+                    if not waiting:
+                        self.lagging.discard(watcher)
+                elif waiting <= self.max_backlog // 4:
+                    watcher.behind_since = None
+                    self.lagging.discard(watcher)
+                    self._push(watcher, self._encode(watcher.game.snapshot()))
+                elif now - watcher.behind_since > self.stale_limit:
+                    self._unwatch(watcher.name)
+                    frames.write_encoded(self._encode("WATCH_END:dropped")[frames.binary])
+                    self.dropped += 1
+            self._flush()
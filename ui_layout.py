@@ -6,17 +6,60 @@ import subprocess
 import shutil
 import sys
 import os
-import platform
-import cv2
-
-
-# --- TRY IMPORTING VIDEO LIBRARIES ---
-try:
-    from PIL import Image, ImageTk
-    VIDEO_AVAILABLE = True
-except ImportError:
-    VIDEO_AVAILABLE = False
-    print("Warning: Libraries missing. Video will be skipped.")
+import time
+
+from animation import FrameScheduler
+from assets import ASSET_DIR, asset_path, default_bundle
+from audio_mixer import Mixer
+from board_canvas import BoardCanvas
+from media_cache import MediaCache, decode_clip
+
+
+# --- VIDEO LIBRARIES (imported on the first popup that shows a video) ---
+_video_libs = None
+
+def load_video_libs():
+    """Returns (cv2, Image), or None if they are not installed."""
+    global _video_libs
+    if _video_libs is None:
+        try:
+            import cv2
+            from PIL import Image
+            _video_libs = (cv2, Image)
+        except ImportError:
+            print("Warning: Libraries missing. Video will be skipped.")
+            _video_libs = False
+    return _video_libs or None
+
+# Media comes from assets.bundle when it has been built (see assets.py), else loose files.
+asset_bundle = default_bundle()
+
+def bundled(name):
+    return asset_bundle is not None and name in asset_bundle
+
+# One playback thread mixes every sound; WAVs are parsed once and kept or mmapped.
+sound_mixer = Mixer(ASSET_DIR, bundle=asset_bundle)
+
+def load_clip(path):
+    """Pre-decoded frames from the bundle, or a fresh decode of the video file."""
+    if asset_bundle is not None:
+        clip = asset_bundle.clip(os.path.basename(path))
+        if clip is not None:
+            return clip
+    return decode_clip(path)
+
+# Game-over clips, decoded once and replayed from memory (see media_cache.py)
+POPUP_VIDEOS = ("win", "lose")
+video_cache = MediaCache(decoder=load_clip)
+
+def preload_videos(names=POPUP_VIDEOS):
+    """Decodes the popup videos on a background thread so the first popup starts at once."""
+    def run():
+        for name in names:
+            path = asset_path(f"{name}.mp4")
+            if bundled(f"{name}.frames") or (os.path.exists(path) and load_video_libs()):
+                video_cache.load(path)
+    threading.Thread(target=run, daemon=True, name="video-preload").start()
 
 # --- LIGHT THEME ---
 THEME = {
@@ -26,30 +69,28 @@ THEME = {
 }
 
 class GameUI:
-    def __init__(self, root, on_click_callback, on_invite_callback, on_connect_callback):
+    def __init__(self, root, on_click_callback, on_invite_callback, on_connect_callback,
+                 on_queue_callback=None):
         self.root = root
         self.on_click_callback = on_click_callback
         self.on_invite_callback = on_invite_callback
+        self.on_queue_callback = on_queue_callback
         self.on_connect_callback = on_connect_callback
         
         self.root.title("Tic Tac Toe")
         self.root.geometry("400x700")
         self.root.configure(bg=THEME["bg"])
+        # Every animation (status rainbow, popup videos) runs off this one timer.
+        self.frames = FrameScheduler(self.root)
         
         self.setup_layout()
         self.play_sound("welcome")
+        # Once the window is up, so startup never waits on OpenCV.
+        self.root.after(2000, preload_videos)
 
     def play_sound(self, sound_name):
-        def _run():
-            file_name = f"{sound_name}.wav"
-            if platform.system() == "Linux":
-                if os.path.exists(file_name): os.system(f"aplay -q {file_name}")
-            elif platform.system() == "Windows":
-                try:
-                    import winsound
-                    if os.path.exists(file_name): winsound.PlaySound(file_name, winsound.SND_FILENAME)
-                except: pass
-        threading.Thread(target=_run, daemon=True).start()
+        # Queued for the shared mixer thread (see audio_mixer.py); never blocks the UI.
+        sound_mixer.play(sound_name)
 
     def setup_layout(self):
         tk.Label(self.root, text="TIC TAC TOE", font=("Montserrat", 28, "bold"), 
@@ -75,6 +116,7 @@ class GameUI:
             return btn
 
         make_btn("Local Game", lambda: self.on_connect_callback("LOCAL"))
+        make_btn("Vs Computer", lambda: self.on_connect_callback("COMPUTER"))
         make_btn("Connect Online", lambda: self.on_connect_callback("ONLINE"))
 
         self.lobby_frame = tk.Frame(self.root, bg=THEME["bg"])
@@ -83,33 +125,31 @@ class GameUI:
                                   borderwidth=0, highlightthickness=0,
                                   selectbackground=THEME["x_color"])
         self.listbox.pack(pady=20)
+        self.listed_players = []  # mirrors the Listbox rows, for in-place diffs
         
         tk.Button(self.lobby_frame, text="Invite Selected", 
                   command=lambda: [self.play_sound("click"), self.trigger_invite()], 
                   bg=THEME["fg"], fg="white", font=("Segoe UI", 10, "bold"),
                   padx=20, pady=10, borderwidth=0).pack(pady=20)
 
+        if self.on_queue_callback:
+            tk.Button(self.lobby_frame, text="Quick Match",
+                      command=lambda: [self.play_sound("click"), self.on_queue_callback()],
+                      bg=THEME["x_color"], fg="white", font=("Segoe UI", 10, "bold"),
+                      padx=20, pady=10, borderwidth=0).pack()
+
         self.board_frame = tk.Frame(self.root, bg=THEME["bg"])
-        self.buttons = []
-        for i in range(9):
-            def on_board_click(idx=i):
-                self.play_sound("click")
-                self.on_click_callback(idx)
+        def on_board_click(idx):
+            self.play_sound("click")
+            self.on_click_callback(idx)
 
-            btn = tk.Button(self.board_frame, text="", font=("Verdana", 24, "bold"), 
-                            width=4, height=2, bg=THEME["btn_bg"], fg="black",
-                            borderwidth=0, 
-                            command=on_board_click)
-            btn.grid(row=i//3, column=i%3, padx=10, pady=10) 
-            self.buttons.append(btn)
+        self.board = BoardCanvas(self.board_frame, on_board_click, THEME)
+        self.board.pack()
 
     def animate_rainbow(self):
         colors = ["#e74c3c", "#e67e22", "#f1c40f", "#2ecc71", "#3498db", "#9b59b6"]
-        if not hasattr(self, 'rainbow_cycle'):
-            self.rainbow_cycle = itertools.cycle(colors)
-        next_color = next(self.rainbow_cycle)
-        self.status_label.config(fg=next_color)
-        self.root.after(200, self.animate_rainbow)
+        rainbow_cycle = itertools.cycle(colors)
+        self.frames.add("rainbow", 200, lambda: self.status_label.config(fg=next(rainbow_cycle)))
 
     def trigger_invite(self):
         selection = self.listbox.curselection()
@@ -118,40 +158,105 @@ class GameUI:
             self.on_invite_callback(target)
 
     def update_board(self, index, symbol):
-        color = THEME["x_color"] if symbol == "X" else THEME["o_color"]
-        self.buttons[index].config(text=symbol, fg=color)
+        self.board.update_board(index, symbol)
 
     def highlight_win(self, indices):
-        for idx in indices:
-            self.buttons[idx].config(bg=THEME["win_bg"], fg="white")
+        self.board.highlight_win(indices)
 
     def reset_board_visuals(self):
-        for btn in self.buttons:
-            btn.config(text="", bg=THEME["btn_bg"], state=tk.NORMAL)
+        self.board.reset()
 
     def show_lobby(self):
         self.menu_frame.pack_forget()
         self.lobby_frame.pack(pady=10)
         self.board_frame.pack_forget()
 
+    def show_menu(self):
+        self.lobby_frame.pack_forget()
+        self.board_frame.pack_forget()
+        self.menu_frame.pack(pady=20, padx=60, fill="x")
+
     def show_game(self):
         self.menu_frame.pack_forget()
         self.lobby_frame.pack_forget()
         self.board_frame.pack()
 
     def update_list(self, players):
+        """Replaces the whole lobby list (login snapshot)."""
         self.listbox.delete(0, tk.END)
-        for p in players:
-            self.listbox.insert(tk.END, p)
+        self.listed_players = list(dict.fromkeys(players))
+        if self.listed_players:
+            self.listbox.insert(tk.END, *self.listed_players)
+
+    def add_players(self, players):
+        """Appends JOIN-ed players; names already listed are ignored."""
+        listed = set(self.listed_players)
+        new = [p for p in dict.fromkeys(players) if p not in listed]
+        if new:
+            self.listed_players.extend(new)
+            self.listbox.insert(tk.END, *new)
+
+    def remove_players(self, players):
+        """Deletes LEAVE-ing players in place, keeping the current selection."""
+        gone = set(players)
+        for i in range(len(self.listed_players) - 1, -1, -1):
+            if self.listed_players[i] in gone:
+                del self.listed_players[i]
+                self.listbox.delete(i)
     
         # [UPDATED] POPUP WITH EMBEDDED VIDEO SUPPORT
     # [UPDATED] POPUP: Handles Video + Audio Sync Internally
+    def play_video(self, label, path):
+        """Loops `path` in `label` at the clip's frame rate from the decoded cache.
+
+        Decodes the clip in the background first if it is not cached yet.
+        """
+        def wait_for_clip():
+            if not label.winfo_exists():
+                return
+            clip = video_cache.get(path)
+            if clip is not None:
+                play(clip)
+                return
+            status = video_cache.status(path)
+            if status == "failed":
+                label.config(text=f"Unable to open video: {path}")
+                return
+            if status == "missing":
+                video_cache.load_async(path)
+            label.after(50, wait_for_clip)
+
+        def play(clip):
+            # Tk wants bytes; bundled frames are memoryviews (a ~30 KB copy per frame shown).
+            photo = tk.PhotoImage(format="gif", data=bytes(clip.frames[0]))
+            label.config(image=photo)
+            label.image = photo
+            start = time.perf_counter()
+            delay = max(1, int(1000 / clip.fps))
+            shown = {"index": 0}
+
+            def next_frame():
+                if not label.winfo_exists():
+                    return False
+                # Pick the frame from the wall clock so slow ticks drop frames instead of drifting.
+                index = int((time.perf_counter() - start) * clip.fps) % len(clip)
+                if index != shown["index"]:
+                    photo.configure(data=bytes(clip.frames[index]))
+                    shown["index"] = index
+
+            self.frames.add(("video", str(label)), delay, next_frame)
+
+        wait_for_clip()
+
     def create_popup(self, title, message, mode="INFO", callback=None, video_file=None):
         popup = tk.Toplevel(self.root)
         popup.title(title)
-        
+        # Bundled clips are already decoded; loose .mp4 files need cv2 and PIL.
+        has_frames = bool(video_file) and bundled(f"{video_file}.frames")
+        can_play_video = bool(video_file) and (has_frames or load_video_libs() is not None)
+
         # Increase height if showing video
-        if video_file and VIDEO_AVAILABLE:
+        if can_play_video:
             popup.geometry("350x500") 
         else:
             popup.geometry("350x250")
@@ -167,11 +272,11 @@ class GameUI:
         # Helper: Play wav or fall back to external players for mp4 audio
         def play_media_audio(video_file):
             def _run():
-                wav_path = f"{video_file}.wav"
-                mp4_path = f"{video_file}.mp4"
+                wav_path = asset_path(f"{video_file}.wav")
+                mp4_path = asset_path(f"{video_file}.mp4")
 
                 # 1) Prefer a separate wav file (keeps existing behavior)
-                if os.path.exists(wav_path):
+                if bundled(f"{video_file}.wav") or os.path.exists(wav_path):
                     try:
                         self.play_sound(video_file)
                         return
@@ -215,8 +320,8 @@ class GameUI:
                 print(f"play_media_audio error: {e}")
 
             # B. Play the Video (Visual Track) or show helpful diagnostics
-            vid_path = f"{video_file}.mp4"
-            if not VIDEO_AVAILABLE:
+            vid_path = asset_path(f"{video_file}.mp4")
+            if not can_play_video:
                 tk.Label(popup, text="Video libraries not installed.", bg=THEME["bg"], fg="#a00").pack(pady=10)
                 tk.Label(popup, text="Install: pip install opencv-python Pillow", bg=THEME["bg"], fg="#555").pack(pady=(0,6))
 
@@ -243,41 +348,12 @@ class GameUI:
                     pass
             else:
                 try:
-                    if not os.path.exists(vid_path):
+                    if not (has_frames or os.path.exists(vid_path)):
                         tk.Label(popup, text=f"Video file not found: {vid_path}", bg=THEME["bg"], fg="#a00").pack(pady=10)
                     else:
-                        video_lbl = tk.Label(popup, bg="black")
+                        video_lbl = tk.Label(popup, bg="black", fg="white")
                         video_lbl.pack(pady=10, fill="both", expand=True)
-
-                        cap = cv2.VideoCapture(vid_path)
-                        if not cap.isOpened():
-                            cap.release()
-                            tk.Label(popup, text=f"Unable to open video: {vid_path}", bg=THEME["bg"], fg="#a00").pack(pady=10)
-                        else:
-                            def stream_video():
-                                try:
-                                    ret, frame = cap.read()
-                                    if ret:
-                                        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                                        frame = cv2.resize(frame, (320, 240))
-                                        img = Image.fromarray(frame)
-                                        imgtk = ImageTk.PhotoImage(image=img)
-
-                                        if video_lbl.winfo_exists():
-                                            video_lbl.config(image=imgtk)
-                                            video_lbl.image = imgtk
-                                            video_lbl.after(30, stream_video)
-                                        else:
-                                            cap.release()
-                                    else:
-                                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0) # Loop video
-                                        stream_video()
-                                except Exception as e:
-                                    print(f"Video stream error: {e}")
-                                    try: cap.release()
-                                    except: pass
-
-                            stream_video()
+                        self.play_video(video_lbl, vid_path)
                 except Exception as e:
                     print(f"Video playback setup error: {e}")
                     tk.Label(popup, text="Video playback failed (check console).", bg=THEME["bg"], fg="#a00").pack(pady=10)